@@ -30,6 +30,11 @@ if 'otp_generated' not in st.session_state:
 if 'otp_email' not in st.session_state:
     st.session_state['otp_email'] = None
 
+# --- RETURNING SESSION (opaque token in a cookie, checked against the session store) ---
+if not st.session_state['logged_in']:
+    auth.restore_session()
+auth.sync_session_cookie()
+
 # --- APP FLOW CONTROL ---
 if st.session_state['logged_in']:
     # If logged in, load the Dashboard (which now contains the Prediction Page)
@@ -1,9 +1,78 @@
 # auth.py
 import streamlit as st
+import json
 import random
 import database as db
 import utils
 import config
+import security
+
+def start_session(user, remember=True):
+    """Fills the session from a user dict; remember=True also opens a server-side session for the cookie."""
+    st.session_state['logged_in'] = True
+    st.session_state['user_role'] = user['role']
+    st.session_state['user_email'] = user['email']
+    st.session_state['user_name'] = user['name']
+    st.session_state['user_id'] = utils.generate_user_id(user['email'])
+    if remember:
+        st.session_state['session_token'] = security.issue_token(user)
+
+def _cookie_token():
+    """The session token the page was loaded with, or None."""
+    token = st.context.cookies.get(config.SESSION_COOKIE)
+    return token if isinstance(token, str) and token else None
+
+def restore_session():
+    """
+    Restores a returning browser's session from its cookie. The token must still be live
+    in the session store, which also holds the name and role given at login.
+    """
+    if config.SESSION_PARAM in st.query_params:
+        del st.query_params[config.SESSION_PARAM]  # Tokens no longer travel in URLs
+    token = _cookie_token()
+    if token is None:
+        return False
+    user = security.verify_token(token)
+    if user is None:
+        return False
+    start_session(user, remember=False)
+    st.session_state['session_token'] = token
+    st.session_state['session_cookie'] = token  # The browser already holds it
+    return True
+
+def end_session():
+    """Logs out: the server-side session is revoked and the cookie is cleared."""
+    token = st.session_state.get('session_token')
+    security.revoke_token(token)
+    st.session_state['session_token'] = None
+    st.session_state['logged_in'] = False
+    st.session_state['user_email'] = None
+
+def sync_session_cookie():
+    """
+    Writes or clears the session cookie in the browser when the token changes (login,
+    logout). The last value written is kept in the session, so the script is sent once
+    per change rather than on every rerun.
+
+    Streamlit cannot set cookies on its responses, so an empty same-origin iframe sets it
+    on the top-level document (SameSite=Strict; Secure). A cookie written from a script
+    cannot be HttpOnly: the token is readable by scripts on the portal's origin. It is an
+    opaque random value that carries no user data, only its hash is stored server-side,
+    and it stops working at logout (revoked) or after SESSION_TTL.
+    """
+    wanted = st.session_state.get('session_token')
+    if 'session_cookie' not in st.session_state:
+        st.session_state['session_cookie'] = _cookie_token()
+    if wanted == st.session_state['session_cookie']:
+        return
+    max_age = config.SESSION_TTL if wanted else 0
+    st.iframe(f"""
+    <script>
+        window.parent.document.cookie = {json.dumps(config.SESSION_COOKIE)} + "=" + {json.dumps(wanted or "")}
+            + "; Max-Age={max_age}; Path=/; SameSite=Strict; Secure";
+    </script>
+    """, height="content")
+    st.session_state['session_cookie'] = wanted
 
 def login_page():
     # --- SESSION STATE FOR AUTH MODE ---
@@ -159,11 +228,7 @@ def login_page():
                         user, msg = db.login_user(email, password)
                         if user and user['role'] == 'Admin':
                             # Success
-                            st.session_state['logged_in'] = True
-                            st.session_state['user_role'] = 'Admin'
-                            st.session_state['user_email'] = user['email']
-                            st.session_state['user_name'] = user['name']
-                            st.session_state['user_id'] = utils.generate_user_id(user['email'])
+                            start_session(user)
                             st.rerun()
                         elif user and user['role'] != 'Admin':
                             st.error("⛔ Access Denied: You are not an Admin.")
@@ -191,11 +256,7 @@ def login_page():
                             # Allow any role to login here? Or strictly non-admins?
                             # Usually better to allow anyone, but redirect Admins if they login here?
                             # For now, simple login.
-                            st.session_state['logged_in'] = True
-                            st.session_state['user_role'] = user['role']
-                            st.session_state['user_email'] = user['email']
-                            st.session_state['user_name'] = user['name']
-                            st.session_state['user_id'] = utils.generate_user_id(user['email'])
+                            start_session(user)
                             st.rerun()
                         else:
                             st.error(msg)
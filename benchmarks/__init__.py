@@ -0,0 +1,10 @@
+# benchmarks/__init__.py
+"""
+Scaling benchmarks for the portal's hot paths.
+
+    python -m benchmarks.run --sizes 10000 100000 1000000
+
+synthetic.py generates marine_data with the shape of Chennai_Small_Data.csv across
+every region in config.COASTAL_DATA; run.py times the hot paths on it and appends the
+results to benchmarks/history.json, compared against the previous run.
+"""
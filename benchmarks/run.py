@@ -0,0 +1,200 @@
+# benchmarks/run.py
+"""
+Times the portal's hot paths on synthetic data and records the results.
+
+    python -m benchmarks.run                          # 10k and 100k rows
+    python -m benchmarks.run --sizes 10000 10000000   # up to 10M rows (needs several GB of RAM)
+    python -m benchmarks.run --cases map_prep export.csv --repeat 5
+
+Each run is appended to benchmarks/history.json with the git commit, and every case is
+compared with the latest earlier run of the same case and size; anything slower than
+--threshold is reported as a regression (exit code 1 with --fail-on-regression).
+"""
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tempfile
+import statistics
+from datetime import datetime
+
+# Benchmarks never touch Supabase: database.py runs on a throwaway embedded store
+BENCH_DIR = tempfile.mkdtemp(prefix="nccr-bench-")
+os.environ.setdefault("NCCR_STORAGE_BACKEND", "local")
+os.environ.setdefault("NCCR_STORAGE_PATH", os.path.join(BENCH_DIR, "bench.db"))
+
+import pandas as pd
+import database as db
+import schema
+import config
+import exports
+import spatial
+import payload
+import picker
+import ingest
+from benchmarks import synthetic
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+DEFAULT_SIZES = [10_000, 100_000]
+
+BATCH = {
+    "Contributor": "Bench", "Email": "bench@nccr.example", "Main_Location": "Tamil Nadu - Chennai Coast",
+    "Location": "Station 1", "Latitude": 13.0827, "Longitude": 80.2707, "Profession": "Researcher", "Designation": "Bench",
+}
+
+# --- CASES ---
+# Each case: setup(n_rows, data) -> argument, run(argument). Only run() is timed.
+def _packets(n, data):
+    return schema.to_db_records(ingest.transform_upload(synthetic.generate_upload(n), BATCH))
+
+def _db_rows(n, data):
+    return schema.to_db_records(data)
+
+# Export cases read from the embedded store: each size's rows are inserted once, under
+# a region of their own, and every timed run rebuilds the file (no disk cache hits)
+exports.EXPORT_DIR = os.path.join(BENCH_DIR, "exports")
+config.EXPORT_CACHE_MAX_AGE = 0
+_EXPORT_REGIONS = {}
+
+def _export_region(n, data):
+    if n not in _EXPORT_REGIONS:
+        region = f"Bench Export {n}"
+        rows = data.drop(columns=["id", "created_at"], errors="ignore").assign(Main_Location=region)
+        ok, msg = db.save_bulk_data(rows)
+        if not ok:
+            raise RuntimeError(f"Could not load export rows: {msg}")
+        columns = [c for c in data.columns if c not in ("id", "created_at")]
+        _EXPORT_REGIONS[n] = (region, columns)
+    return _EXPORT_REGIONS[n]
+
+def _export_case(fmt):
+    return (_export_region, lambda arg: exports.build(arg[0], arg[1], fmt))
+
+def _map_points(n, data):
+    return spatial.point_layer_frame(spatial.points_frame(data))
+
+MAP_TOOLTIP = "{location} {count} {latest} {water_temp} {salinity} {contributor}"
+
+def _build_frame(rows):
+    """fetch_all_data without the network: one DataFrame per 1000-row page, then concat."""
+    chunks = [db._to_chunk(rows[i : i + db.MAX_PAGE_SIZE]) for i in range(0, len(rows), db.MAX_PAGE_SIZE)]
+    return pd.concat(chunks, ignore_index=True)
+
+CASES = {
+    "key_mapping.per_row": (_packets, lambda packets: [db.map_keys_to_db(p) for p in packets]),
+    "key_mapping.frame": (lambda n, data: data, lambda df: schema.to_db_records(df)),
+    "bulk_packets": (lambda n, data: synthetic.generate_upload(n), lambda sheet: ingest.transform_upload(sheet, BATCH)),
+    "frame_construction": (_db_rows, _build_frame),
+    "map_prep": (lambda n, data: data, lambda df: spatial.aggregate(spatial.points_frame(df), config.MAP_DEFAULT_ZOOM)),
+    "map_payload": (_map_points, lambda points: payload.layer(
+        "ScatterplotLayer", points, tooltip=MAP_TOOLTIP, get_position='[lon, lat]').to_json()),
+    "export.csv": _export_case("csv"),
+    "export.parquet": _export_case("parquet"),
+    "export.xlsx": _export_case("xlsx"),
+    "delete_picker": (lambda n, data: data, lambda df: picker.RecordIndex(df).filter("2020 coast")),
+}
+
+# --- TIMING ---
+def time_case(name, n_rows, data, repeat):
+    setup, run = CASES[name]
+    arg = setup(n_rows, data)
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run(arg)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        "case": name, "rows": n_rows, "best_s": round(best, 6),
+        "median_s": round(statistics.median(timings), 6),
+        "rows_per_s": round(n_rows / best) if best > 0 else None,
+    }
+
+# --- HISTORY ---
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+def load_history(path=HISTORY_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def save_history(history, path=HISTORY_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, path)
+
+def previous_result(history, case, rows):
+    for run in reversed(history):
+        for r in run["results"]:
+            if r["case"] == case and r["rows"] == rows:
+                return r, run
+    return None, None
+
+# --- MAIN ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the portal's hot paths on synthetic marine_data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Row counts to test.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES), help="Cases to run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best and median are kept).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression.")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    results, regressions = [], []
+    for n_rows in args.sizes:
+        print(f"📦 Generating {n_rows:,} rows...")
+        data = synthetic.generate_marine_data(n_rows, seed=args.seed)
+        for name in args.cases:
+            r = time_case(name, n_rows, data, args.repeat)
+            results.append(r)
+            prev, prev_run = previous_result(history, name, n_rows)
+            note = ""
+            if prev and prev["best_s"]:
+                ratio = r["best_s"] / prev["best_s"]
+                note = f"  ({ratio:.2f}x vs {prev_run.get('commit') or 'previous'})"
+                if ratio > args.threshold:
+                    regressions.append((name, n_rows, ratio))
+                    note += "  ⚠️ REGRESSION"
+            print(f"  {name:<22} {r['best_s'] * 1000:>10.1f} ms  {r['rows_per_s'] or 0:>12,} rows/s{note}")
+        del data
+        gc.collect()
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if not args.no_save:
+        history.append(run)
+        save_history(history, args.history)
+        print(f"📝 Saved to {args.history}")
+
+    if regressions:
+        print(f"⚠️ {len(regressions)} regression(s): " + ", ".join(f"{c} @ {n:,} ({x:.2f}x)" for c, n, x in regressions))
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# benchmarks/synthetic.py
+"""
+Synthetic marine_data seeded from Chennai_Small_Data.csv.
+
+Rows are built by resampling whole days (144 ten-minute readings) of the seed sheet,
+so the 10-minute cadence, the correlation between consecutive readings and the
+missing-value runs of its 15 parameters carry over. A small per-region offset and
+per-reading jitter keep regions and days distinct. Everything is vectorized, so
+millions of rows take seconds; generate in chunks (iter_marine_data) when memory is tight.
+"""
+import os
+import numpy as np
+import pandas as pd
+import config
+import regions
+
+SEED_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Chennai_Small_Data.csv")
+TIMESTAMP = "Date and Time"
+
+# Seed sheet header -> Dashboard column
+SEED_COLUMNS = {
+    "Wind Speed (m/s)": "Wind_Speed",
+    "Wind Dir (Deg)": "Wind_Direction",
+    "Total Precipitation (mm)": "Precipitation",
+    "WQ Temp (°C)": "Water_Temp",
+    "pH": "pH",
+    "Turbidity (NTU)": "Turbidity",
+    "TDS (g/L)": "TDS",
+    "Chl(ug/l)": "Chlorophyll",
+    "TSS (mg/L)": "TSS",
+    "BGA (mg/L)": "BGA",
+    "Dissolved Oxygen (mg/L)": "DO",
+    "Sal (psu)": "Salinity",
+    "Rel.Hum (%)": "Humidity",
+    "Air Temp (°C)": "Air_Temp",
+}
+
+CADENCE = pd.Timedelta(minutes=10)
+BLOCK = 144                # One day of readings
+REGION_SHIFT = 0.10        # Per-region offset, in seed standard deviations
+JITTER = 0.02              # Per-reading noise, in seed standard deviations
+COORD_JITTER = 0.02        # Degrees around the region's reference point
+START = pd.Timestamp("2020-01-01")
+
+PROFESSIONS = ["Student", "Researcher", "Official", "Fisherman", "Other"]
+CONTRIBUTORS = [f"Field Team {i}" for i in range(1, 21)]
+
+# --- SEED ---
+_seed_cache = {}
+
+def load_seed(path=SEED_CSV):
+    """(values [rows x params] float64 with NaNs, header list) of the seed sheet."""
+    if path not in _seed_cache:
+        seed = pd.read_csv(path)
+        headers = [h for h in SEED_COLUMNS if h in seed.columns]
+        values = seed[headers].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+        _seed_cache[path] = (values, headers)
+    return _seed_cache[path]
+
+def seed_profile(path=SEED_CSV):
+    """Per-parameter mean, std and missing fraction of the seed (what the generator preserves)."""
+    values, headers = load_seed(path)
+    return pd.DataFrame({
+        "mean": np.nanmean(values, axis=0),
+        "std": np.nanstd(values, axis=0),
+        "missing": np.isnan(values).mean(axis=0),
+    }, index=headers)
+
+def all_regions():
+    """Every named region in config.COASTAL_DATA as (state, region)."""
+    return [(state, region) for state, coasts in config.COASTAL_DATA.items() for region in coasts if region != "Other"]
+
+# --- GENERATOR CORE ---
+def _readings(rng, n_rows, region_codes, n_regions):
+    """Seed-shaped parameter matrix for n_rows; region_codes[i] is the region of row i."""
+    values, headers = load_seed()
+    std = np.nan_to_num(np.nanstd(values, axis=0))
+    n_blocks = -(-n_rows // BLOCK)
+    starts = rng.integers(0, len(values) - BLOCK, size=n_blocks)
+    idx = (starts[:, None] + np.arange(BLOCK)).ravel()[:n_rows]
+    out = values[idx]
+    shift = rng.normal(0.0, REGION_SHIFT, size=(n_regions, len(headers))) * std
+    out += shift[region_codes]
+    out += rng.normal(0.0, JITTER, size=out.shape) * std
+    # Quantities that cannot go negative in the seed stay non-negative; directions wrap
+    lower = np.where(np.nanmin(values, axis=0) >= 0, 0.0, -np.inf)
+    out = np.maximum(out, lower)
+    if "Wind Dir (Deg)" in headers:
+        j = headers.index("Wind Dir (Deg)")
+        out[:, j] %= 360
+    return np.round(out, 3), headers
+
+def _layout(n_rows, n_regions):
+    """Region code of each row (contiguous runs) and its position within its region."""
+    codes = (np.arange(n_rows, dtype="int64") * n_regions) // max(n_rows, 1)
+    first = np.searchsorted(codes, np.arange(n_regions))
+    return codes, np.arange(n_rows) - first[codes]
+
+# --- PUBLIC GENERATORS ---
+def generate_upload(n_rows, seed=0, start=START):
+    """One region's sheet as field teams upload it: seed headers plus 'Date and Time'."""
+    rng = np.random.default_rng(seed)
+    values, headers = _readings(rng, n_rows, np.zeros(n_rows, dtype="int64"), 1)
+    df = pd.DataFrame(values, columns=headers)
+    df.insert(0, TIMESTAMP, pd.date_range(start, periods=n_rows, freq=CADENCE).strftime("%Y-%m-%d %H:%M:%S"))
+    return df
+
+def generate_marine_data(n_rows, seed=0, first_id=1):
+    """
+    marine_data as fetch_all_data returns it (Dashboard column names, id first),
+    spread over every region in config.COASTAL_DATA.
+    """
+    rng = np.random.default_rng(seed)
+    names = all_regions()
+    codes, position = _layout(n_rows, len(names))
+    values, headers = _readings(rng, n_rows, codes, len(names))
+
+    stamps = (START + pd.to_timedelta(position * CADENCE.value, unit="ns")).to_numpy()
+    iso = pd.Series(np.datetime_as_string(stamps, unit="s"))
+    region_names = np.array([r for _, r in names], dtype=object)
+    coords = np.array([regions.coords_for(r, (13.0827, 80.2707)) for _, r in names], dtype="float64")
+    contributor = rng.integers(0, len(CONTRIBUTORS), size=n_rows)
+
+    df = pd.DataFrame({
+        "id": np.arange(first_id, first_id + n_rows, dtype="int64"),
+        "created_at": iso.str.replace("T", " ", regex=False).to_numpy(),
+        "Date": iso.str[:10].to_numpy(),
+        "Time": iso.str[11:].to_numpy(),
+        "Main_Location": region_names[codes],
+        "Location": np.array([f"Station {i}" for i in range(1, 6)], dtype=object)[(position // BLOCK) % 5],
+        "Latitude": np.round(coords[codes, 0] + rng.uniform(-COORD_JITTER, COORD_JITTER, n_rows), 6),
+        "Longitude": np.round(coords[codes, 1] + rng.uniform(-COORD_JITTER, COORD_JITTER, n_rows), 6),
+        "Contributor": np.array(CONTRIBUTORS, dtype=object)[contributor],
+        "Email": np.array([f"team{i + 1}@nccr.example" for i in range(len(CONTRIBUTORS))], dtype=object)[contributor],
+        "Profession": np.array(PROFESSIONS, dtype=object)[rng.integers(0, len(PROFESSIONS), size=n_rows)],
+        "Designation": "Field Officer",
+    })
+    for j, header in enumerate(headers):
+        df[SEED_COLUMNS[header]] = values[:, j]
+    return df
+
+def iter_marine_data(n_rows, chunk_rows=1_000_000, seed=0):
+    """generate_marine_data in chunks with continuing ids (for 10M-row runs)."""
+    for k, lo in enumerate(range(0, n_rows, chunk_rows)):
+        yield generate_marine_data(min(chunk_rows, n_rows - lo), seed=seed + k, first_id=lo + 1)
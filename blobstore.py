@@ -0,0 +1,90 @@
+# blobstore.py
+"""
+Content-addressed, chunked blob store for research-paper attachments.
+
+A file is split into fixed-size chunks, each stored under its SHA-256, plus a small
+manifest stored under the SHA-256 of the whole file. Identical files and chunks are
+stored once. Rows in research_papers only keep the file hash, so listing papers never
+moves attachment bytes; they are fetched on demand with get().
+
+Chunks live in the Supabase Storage bucket config.BLOB_BUCKET, or in a local directory
+(config.CACHE_DIR/blobs) when the embedded local backend is in use.
+"""
+import os
+import json
+import hashlib
+import config
+
+LOCAL_BLOB_DIR = os.path.join(config.CACHE_DIR, "blobs")
+
+# --- STORAGE TARGETS ---
+class _LocalDir:
+    """Directory stand-in for a storage bucket."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        if os.path.exists(path):
+            return  # Content addressed: same key, same bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        with open(os.path.join(self.root, key), "rb") as f:
+            return f.read()
+
+class _Bucket:
+    """Supabase Storage bucket."""
+
+    def __init__(self, client, bucket):
+        self.bucket = client.storage.from_(bucket)
+
+    def put(self, key, data):
+        self.bucket.upload(key, data, {"content-type": "application/octet-stream", "upsert": "true"})
+
+    def get(self, key):
+        return self.bucket.download(key)
+
+def _target(client):
+    """Bucket for the Supabase client; local directory for the embedded backend."""
+    if client is not None and hasattr(client, "storage"):
+        return _Bucket(client, config.BLOB_BUCKET)
+    return _LocalDir(LOCAL_BLOB_DIR)
+
+# --- PUBLIC API ---
+def put(client, data):
+    """Stores bytes and returns (file_hash, size). client is database.supabase."""
+    target = _target(client)
+    chunk_size = config.BLOB_CHUNK_SIZE
+    chunks = []
+    for i in range(0, len(data), chunk_size):
+        piece = data[i : i + chunk_size]
+        digest = hashlib.sha256(piece).hexdigest()
+        target.put(f"chunks/{digest[:2]}/{digest}", piece)
+        chunks.append(digest)
+
+    file_hash = hashlib.sha256(data).hexdigest()
+    manifest = {"size": len(data), "chunks": chunks}
+    # The manifest is written last, so a hash only resolves once all its chunks exist
+    target.put(f"manifests/{file_hash}.json", json.dumps(manifest).encode("utf-8"))
+    return file_hash, len(data)
+
+def get(client, file_hash):
+    """Returns the bytes for a file hash, verifying every chunk and the whole file."""
+    target = _target(client)
+    manifest = json.loads(target.get(f"manifests/{file_hash}.json"))
+    parts = []
+    for digest in manifest["chunks"]:
+        piece = target.get(f"chunks/{digest[:2]}/{digest}")
+        if hashlib.sha256(piece).hexdigest() != digest:
+            raise ValueError(f"Corrupt chunk {digest}")
+        parts.append(piece)
+    data = b"".join(parts)
+    if hashlib.sha256(data).hexdigest() != file_hash:
+        raise ValueError(f"Corrupt file {file_hash}")
+    return data
@@ -0,0 +1,217 @@
+# bulk_insert.py
+"""
+Concurrent, retrying, resumable insert engine used by database.save_bulk_data.
+
+Batches are sent through a bounded worker pool. Each batch is retried with exponential
+backoff, and the batch size adapts to observed latency. Finished row ranges are
+written to a per-upload checkpoint, so re-running the same upload only sends the rows
+that are still missing instead of duplicating the ones already committed.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import config
+
+CHECKPOINT_DIR = os.path.join(config.CACHE_DIR, "uploads")
+
+# --- UPLOAD IDENTITY ---
+def upload_id_for(*parts):
+    """
+    Stable id for an upload, e.g. upload_id_for(uploaded_file, region, spot, email).
+    File objects are hashed in 1 MiB blocks and rewound, so the file is never copied.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if hasattr(part, "read"):
+            part.seek(0)
+            for block in iter(lambda: part.read(1024 * 1024), b""):
+                h.update(block)
+            part.seek(0)
+        else:
+            h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:32]
+
+# --- CHECKPOINTS ---
+def _checkpoint_path(upload_id):
+    return os.path.join(CHECKPOINT_DIR, f"{upload_id}.json")
+
+def load_checkpoint(upload_id, total):
+    """
+    Returns the list of committed [start, end) row ranges for this upload.
+    total identifies the upload's size (rows here, file bytes for streamed uploads).
+    """
+    if not upload_id:
+        return []
+    try:
+        with open(_checkpoint_path(upload_id)) as f:
+            data = json.load(f)
+        # A different row count means a different upload that happens to share the id
+        return data["done"] if data.get("total") == total else []
+    except (OSError, ValueError, KeyError):
+        return []
+
+def save_checkpoint(upload_id, total, done):
+    if not upload_id:
+        return
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = _checkpoint_path(upload_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"total": total, "done": done, "updated_at": time.time()}, f)
+    os.replace(tmp, path)
+
+def clear_checkpoint(upload_id):
+    try:
+        os.remove(_checkpoint_path(upload_id))
+    except OSError:
+        pass
+
+def merge_ranges(ranges):
+    """Merges overlapping / touching [start, end) ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _gaps(done, total):
+    """Row ranges still to be inserted."""
+    gaps, cursor = [], 0
+    for start, end in merge_ranges(done):
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < total:
+        gaps.append((cursor, total))
+    return gaps
+
+# --- ADAPTIVE BATCH SIZE ---
+class BatchSizer:
+    """Grows the batch while inserts are fast, halves it when they are slow or fail."""
+
+    def __init__(self, initial, minimum, maximum, target_latency):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def observe(self, rows, seconds):
+        with self._lock:
+            if seconds > self.target_latency:
+                self.size = max(self.minimum, self.size // 2)
+            elif seconds < self.target_latency / 2 and rows >= self.size:
+                self.size = min(self.maximum, int(self.size * 1.25))
+
+    def failed(self):
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+# --- ENGINE ---
+def _send_with_retry(insert_fn, batch, sizer, max_retries, base_delay):
+    """
+    Runs insert_fn(batch), retrying with exponential backoff.
+    Returns (latency in seconds, insert_fn's result).
+    """
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            result = insert_fn(batch)
+            return time.perf_counter() - started, result
+        except Exception:
+            sizer.failed()
+            if attempt >= max_retries:
+                raise
+            # Full jitter keeps parallel workers from retrying in lockstep
+            time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
+            attempt += 1
+
+def _carve(gaps, sizer):
+    """Yields (start, end) batches over the gaps, sized at the moment each is requested."""
+    for start, end in gaps:
+        cursor = start
+        while cursor < end:
+            stop = min(end, cursor + sizer.size)
+            yield cursor, stop
+            cursor = stop
+
+def insert_records(records, insert_fn, upload_id=None, progress=None, on_batch=None,
+                   workers=None, batch_size=None, max_retries=None, base_delay=0.5):
+    """
+    Inserts records (list of DB-keyed dicts) with insert_fn(batch). insert_fn may
+    return the inserted rows as stored (with their ids).
+
+    upload_id:  enables the checkpoint; rows committed by an earlier run are skipped.
+    progress:   progress(done_rows, total_rows), called on the calling thread.
+    on_batch:   on_batch(rows) after each committed batch, on the calling thread; rows
+                are insert_fn's result when it returned a list, else the batch sent.
+    Returns (ok, message, inserted_rows).
+    """
+    workers = workers or config.BULK_INSERT_WORKERS
+    max_retries = config.BULK_MAX_RETRIES if max_retries is None else max_retries
+    sizer = BatchSizer(batch_size or config.BULK_BATCH_SIZE, config.BULK_MIN_BATCH,
+                       config.BULK_MAX_BATCH, config.BULK_TARGET_LATENCY)
+
+    total = len(records)
+    done = load_checkpoint(upload_id, total)
+    done_rows = sum(end - start for start, end in merge_ranges(done))
+    already = done_rows
+    if progress:
+        progress(done_rows, total)
+
+    batches = _carve(_gaps(done, total), sizer)
+    error = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit_next():
+            span = next(batches, None)
+            if span is not None:
+                batch = records[span[0]:span[1]]
+                future = pool.submit(_send_with_retry, insert_fn, batch, sizer, max_retries, base_delay)
+                in_flight[future] = (span, batch)
+            return span is not None
+
+        while len(in_flight) < workers and submit_next():
+            pass
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                span, batch = in_flight.pop(future)
+                try:
+                    latency, stored = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                sizer.observe(len(batch), latency)
+                done = merge_ranges(done + [list(span)])
+                done_rows += len(batch)
+                save_checkpoint(upload_id, total, done)
+                if on_batch:
+                    on_batch(stored if isinstance(stored, list) else batch)
+                if progress:
+                    progress(done_rows, total)
+            # Stop feeding new batches after a failure; in-flight ones are allowed to finish
+            while error is None and len(in_flight) < workers and submit_next():
+                pass
+
+    inserted = done_rows - already
+    if error is not None:
+        msg = f"Stopped after {done_rows}/{total} rows: {error}."
+        if upload_id:
+            msg += " Upload the same file again to resume from here."
+        return False, msg, inserted
+    if upload_id:
+        clear_checkpoint(upload_id)
+    if already:
+        return True, f"Resumed upload: {inserted} remaining rows inserted ({already} were already saved).", inserted
+    return True, "Success", inserted
@@ -119,4 +119,103 @@ COLUMN_CONFIG = {
     "Population": "Coastal Population",
     "Tourist_Inflow": "Annual Tourist Inflow",
     "Shoreline_Status": "Shoreline Status"
-}
\ No newline at end of file
+}
+
+# --- HEADER ALIASES FOR BULK UPLOADS ---
+# Sheet headers accepted for each parameter, in priority order (headers.py also accepts
+# the Dashboard name and the export label above, and suggests close misspellings of
+# any of these when the unit matches). Other units of a parameter must be listed here.
+# A new instrument export format only needs its headers added here.
+HEADER_ALIASES = {
+    "Date and Time": ["Date and Time", "Date Time", "DateTime", "Date/Time", "Timestamp"],
+    "Water_Temp": ["WQ Temp (°C)", "Temp (°C)", "Water Temp (°C)"],
+    "Salinity": ["Sal (psu)", "Salinity (PSU)", "Sal psu"],
+    "DO": ["Dissolved Oxygen (mg/L)", "ODO (mg/L)", "ODO mg/L"],
+    "pH": ["pH"],
+    "Turbidity": ["Turbidity (NTU)", "Turbididt y (NTU)", "Turbidity NTU"],
+    "TSS": ["TSS (mg/L)"],
+    "TDS": ["TDS (g/L)"],
+    "Chlorophyll": ["Chl(ug/l)", "Chlorophy (mg/L)", "Chlorophy_RFU (ug/L)", "Chlorophyll (ug/L)"],
+    "BGA": ["BGA (mg/l)"],
+    "Wind_Speed": ["Wind Speed (m/s)"],
+    "Wind_Direction": ["Wind Dir (Deg)", "Wind Direction (Deg)"],
+    "Precipitation": ["Total Precipitation (mm)", "Rain (mm)"],
+    "Humidity": ["Rel.Hum (%)", "RH (%)"],
+    "Air_Temp": ["Air Temp (°C)"],
+}
+HEADER_FUZZY_CUTOFF = 0.88  # Name similarity (0-1) needed to suggest a misspelled header (units must agree; the uploader confirms)
+
+# --- LOCAL CACHE SETTINGS ---
+# Everything the portal keeps on local disk (replica, summaries, caches) lives here
+CACHE_DIR = ".nccr_cache"
+
+# Local replica of marine_data
+REPLICA_SYNC_INTERVAL = 30        # Seconds between incremental syncs from Supabase
+REPLICA_RECONCILE_INTERVAL = 3600 # Seconds between full id reconciliations (remote deletes / late commits)
+
+# Admin sidebar counters
+COUNTERS_RECONCILE_INTERVAL = 6 * 3600 # Seconds between full recounts of the summary store
+
+# Bulk upload engine
+BULK_INSERT_WORKERS = 4    # Parallel insert requests per upload
+BULK_BATCH_SIZE = 1000     # Starting rows per insert
+BULK_MIN_BATCH = 100
+BULK_MAX_BATCH = 5000
+BULK_TARGET_LATENCY = 2.0  # Seconds; slower batches shrink the batch size
+BULK_MAX_RETRIES = 4       # Retries per batch (exponential backoff)
+
+# Research paper attachments (chunked blob store)
+BLOB_BUCKET = "research-papers"  # Supabase Storage bucket
+BLOB_CHUNK_SIZE = 1024 * 1024    # 1 MiB chunks
+PAPERS_PAGE_SIZE = 10            # Papers per page in Research & News
+
+# Login / sessions
+AUTH_HASH_WORKERS = 2          # Dedicated threads for bcrypt (bounds concurrent hashing)
+BCRYPT_ROUNDS = None           # Fixed cost factor; None = calibrate to BCRYPT_TARGET_SECONDS at startup
+BCRYPT_TARGET_SECONDS = 0.25   # Calibrated hashes take about this long on this server
+BCRYPT_MIN_ROUNDS = 12         # Current policy: no hash is made or kept below this cost
+BCRYPT_MAX_ROUNDS = 14
+SESSION_TTL = 12 * 3600        # Seconds a login session stays valid
+SESSION_COOKIE = "nccr_session"  # Browser cookie that carries the opaque session token
+SESSION_PARAM = "session"      # URL parameter older versions put the token in; removed on sight
+
+# Supabase HTTP connection pool (one keep-alive pool shared by every session)
+HTTP_MAX_CONNECTIONS = 20       # Concurrent connections to Supabase
+HTTP_MAX_KEEPALIVE = 10         # Idle connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = 30.0    # Seconds an idle connection is kept
+HTTP_TIMEOUT = 60.0             # Seconds per request
+HTTP_CONNECT_TIMEOUT = 10.0
+
+# Shared result cache for database reads (all worker processes, invalidated by table version)
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024   # Least recently used entries are evicted beyond this
+RESULT_CACHE_MAX_ENTRY = 64 * 1024 * 1024    # Larger results are not cached
+RESULT_CACHE_MAX_AGE = 3600                  # Seconds; bounds staleness from writes made outside the portal
+
+# Performance metrics (admin Performance page)
+METRICS_WINDOW = 2048  # Recent latencies kept per operation for percentiles
+
+# Streaming ingestion of uploaded sheets
+INGEST_CHUNK_ROWS = 50_000  # Rows parsed, transformed and inserted at a time
+INGEST_PREFETCH = 1         # Chunks parsed ahead while the current one is inserted
+
+# Upload validation (validation.py)
+INDIA_EEZ_BBOX = {"lat": (3.0, 24.5), "lon": (65.0, 98.0)}  # Bounding box around India's EEZ
+ROW_INDEX_RECONCILE_INTERVAL = 6 * 3600  # Seconds between full rebuilds of the duplicate index
+
+# Global Data Map level of detail (spatial.py)
+MAP_DEFAULT_ZOOM = 4     # Initial zoom (all of India)
+MAP_MAX_ZOOM = 14        # Deepest drill-down
+MAP_CELL_PIXELS = 48     # Grid cell size on screen, whatever the zoom
+MAP_POINT_LIMIT = 5000   # Individual readings are drawn only when an area holds at most this many
+
+# Master Data grid (grid.py)
+GRID_PAGE_SIZES = [50, 100, 250, 500]  # Rows per page offered in "View All Data"
+GRID_PREFETCH_WORKERS = 2              # Background threads fetching the next page
+
+# Download Center exports (exports.py)
+EXPORT_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Oldest export files are evicted beyond this
+EXPORT_CACHE_MAX_AGE = 6 * 3600         # Seconds; bounds staleness from writes made outside the portal
+
+# Manage & Delete record picker (picker.py)
+PICKER_PAGE_SIZE = 100   # Candidate records listed per page
+PICKER_PREVIEW_ROWS = 200  # Selected records shown in full before deleting
@@ -0,0 +1,231 @@
+# counters.py
+"""
+Precomputed marine_data counters for the admin sidebar.
+
+Total records, per-month counts (by created_at), per-region counts (by Main_Location)
+and per-region, per-collection-date counts (for each region's date extent) are kept in a
+small SQLite summary store under config.CACHE_DIR. get_region_index groups the regions
+by state for the cascading State -> Region filters. database.py applies
+deltas on every insert/delete, and a periodic full reconciliation from the local
+replica (replica.snapshot) corrects any drift (writes made outside the portal, failed
+partial uploads, other worker processes). The rebuild runs in a background thread
+under replica.models_lock, and records the highest id it counted: insert deltas for
+rows at or below that id are already included and are skipped.
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from collections import namedtuple
+import pandas as pd
+import config
+import regions as region_resolver
+import replica
+import database as db
+
+SUMMARY_DB = os.path.join(config.CACHE_DIR, "summary.db")
+STORE_VERSION = 2  # Bumped when a table is added; older stores are rebuilt on first read
+
+RegionInfo = namedtuple("RegionInfo", ["region", "state", "count", "first_date", "last_date"])
+
+_reconcile_lock = threading.Lock()
+
+@contextmanager
+def _connect():
+    """Opens the summary store; commits on success and always closes."""
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(SUMMARY_DB, timeout=30)
+    try:
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS month_counts (month TEXT PRIMARY KEY, n INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS region_counts (region TEXT PRIMARY KEY, n INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS region_dates (region TEXT NOT NULL, date TEXT NOT NULL, n INTEGER NOT NULL,
+                                                         PRIMARY KEY (region, date));
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL);
+            """)
+            yield conn
+    finally:
+        conn.close()
+
+# --- HELPERS ---
+def _month_keys(created_at):
+    """created_at strings -> 'YYYY-MM'. Missing values are counted in the current month (DB default now())."""
+    current_month = datetime.now().strftime("%Y-%m")
+    return created_at.astype("string").str[:7].fillna(current_month)
+
+def _region_keys(regions):
+    return regions.astype("string").fillna("")
+
+def _tally(df):
+    """
+    Returns (month, region, (region, date)) value counts for a frame with
+    created_at / Main_Location / Date.
+    """
+    n = len(df)
+    missing = pd.Series([None] * n, dtype="object", index=df.index)
+    created = df['created_at'] if 'created_at' in df.columns else missing
+    regions = _region_keys(df['Main_Location'] if 'Main_Location' in df.columns else missing)
+    dates = (df['Date'] if 'Date' in df.columns else missing).astype("string").str[:10].fillna("")
+    region_dates = pd.DataFrame({'region': regions, 'date': dates}).value_counts()
+    return _month_keys(created).value_counts(), regions.value_counts(), region_dates
+
+def _upsert(conn, table, key, counts, sign):
+    """counts: value counts indexed by key (a column name, or a tuple of them for a MultiIndex)."""
+    keys = key if isinstance(key, tuple) else (key,)
+    cols = ", ".join(keys)
+    conn.executemany(
+        f"INSERT INTO {table} ({cols}, n) VALUES ({', '.join('?' * len(keys))}, ?) "
+        f"ON CONFLICT({cols}) DO UPDATE SET n = n + excluded.n",
+        [(*(str(p) for p in (k if isinstance(k, tuple) else (k,))), sign * int(v)) for k, v in counts.items()],
+    )
+    conn.execute(f"DELETE FROM {table} WHERE n <= 0")
+
+# --- INCREMENTAL UPDATES ---
+def _watermark(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+    return row[0] if row else None
+
+def apply_delta(df, sign=1):
+    """
+    Adds (sign=1) or removes (sign=-1) the rows of df from the counters.
+    df needs created_at, Main_Location and Date columns (Dashboard names); with an
+    'id' column, inserted rows already counted by the last rebuild are skipped.
+    """
+    if df is None or df.empty:
+        return
+    try:
+        with replica.models_lock, _connect() as conn:
+            watermark = _watermark(conn)
+            if sign > 0 and watermark is not None and 'id' in df.columns:
+                df = df[pd.to_numeric(df['id'], errors='coerce').fillna(float("inf")) > watermark]
+                if df.empty:
+                    return
+            months, regions, region_dates = _tally(df)
+            _upsert(conn, "month_counts", "month", months, sign)
+            _upsert(conn, "region_counts", "region", regions, sign)
+            _upsert(conn, "region_dates", ("region", "date"), region_dates, sign)
+    except Exception as e:
+        print(f"Counters Update Error: {e}")
+
+# --- FULL RECONCILIATION ---
+def _fold_remote():
+    """Fallback when the replica cannot sync: streams the three columns from marine_data."""
+    def add_chunk(acc, chunk):
+        counts = tuple(part if total.empty else total.add(part, fill_value=0) for total, part in zip(acc[0], _tally(chunk)))
+        return counts, max(acc[1], int(chunk['id'].max()))
+
+    empty = pd.Series(dtype="int64")
+    return db.fold_marine_data(add_chunk, ((empty, empty, empty), 0), columns=["created_at", "main_location", "date"])
+
+def reconcile():
+    """Recounts everything from the local replica (or, failing that, from marine_data)."""
+    replica.sync(force=True)  # The bulk of the download happens outside the lock
+    with replica.models_lock:
+        try:
+            df, watermark = replica.snapshot(["created_at", "Main_Location", "Date"])
+            counts = _tally(df)
+        except Exception as e:
+            print(f"Counters Replica Error: {e}")
+            counts, watermark = _fold_remote()
+        _swap(*counts, watermark)
+
+def _swap(months, regions, region_dates, watermark):
+    with _connect() as conn:
+        conn.execute("DELETE FROM month_counts")
+        conn.execute("DELETE FROM region_counts")
+        conn.execute("DELETE FROM region_dates")
+        _upsert(conn, "month_counts", "month", months, 1)
+        _upsert(conn, "region_counts", "region", regions, 1)
+        _upsert(conn, "region_dates", ("region", "date"), region_dates, 1)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('reconciled_at', ?)", (time.time(),))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('store_version', ?)", (STORE_VERSION,))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (watermark,))
+
+def _reconcile_in_background():
+    if not _reconcile_lock.acquire(blocking=False):
+        return  # Already running
+    def run():
+        try:
+            reconcile()
+        except Exception as e:
+            print(f"Counters Reconcile Error: {e}")
+        finally:
+            _reconcile_lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+# --- READ ---
+def _ensure_fresh():
+    """
+    Starts a background rebuild when the store is stale, empty or from an older
+    version; reads never wait for it (see ready()).
+    """
+    with _connect() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'reconciled_at'").fetchone()
+        version = conn.execute("SELECT value FROM meta WHERE key = 'store_version'").fetchone()
+    reconciled_at = row[0] if row else 0
+    if (not reconciled_at or not version or version[0] < STORE_VERSION
+            or time.time() - reconciled_at >= config.COUNTERS_RECONCILE_INTERVAL):
+        _reconcile_in_background()
+
+def ready():
+    """False until the first rebuild of this store version has finished."""
+    try:
+        with _connect() as conn:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'store_version'").fetchone()
+        return bool(version) and version[0] >= STORE_VERSION
+    except Exception:
+        return False
+
+def get_summary():
+    """Returns {'total', 'this_month', 'top_region'} from the summary store."""
+    try:
+        _ensure_fresh()
+        with _connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(n), 0) FROM region_counts").fetchone()[0]
+            this_month = conn.execute(
+                "SELECT COALESCE(SUM(n), 0) FROM month_counts WHERE month = ?",
+                (datetime.now().strftime("%Y-%m"),),
+            ).fetchone()[0]
+            top = conn.execute(
+                "SELECT region FROM region_counts WHERE region != '' ORDER BY n DESC LIMIT 1"
+            ).fetchone()
+        return {"total": total, "this_month": this_month, "top_region": top[0] if top else "N/A"}
+    except Exception as e:
+        print(f"Counters Read Error: {e}")
+        return {"total": 0, "this_month": 0, "top_region": "N/A"}
+
+def get_region_counts():
+    """Returns {Main_Location: record count} for every region present in the database."""
+    try:
+        _ensure_fresh()
+        with _connect() as conn:
+            return dict(conn.execute("SELECT region, n FROM region_counts WHERE region != '' ORDER BY region").fetchall())
+    except Exception as e:
+        print(f"Counters Read Error: {e}")
+        return {}
+
+def get_region_index():
+    """
+    Returns {state: [RegionInfo(region, state, count, first_date, last_date), ...]} for
+    every region present in the database, states in config.COASTAL_DATA order and
+    regions alphabetical. Regions that resolve to no state are listed under None.
+    """
+    try:
+        _ensure_fresh()
+        with _connect() as conn:
+            rows = conn.execute("""
+                SELECT c.region, c.n, MIN(NULLIF(d.date, '')), MAX(NULLIF(d.date, ''))
+                FROM region_counts c LEFT JOIN region_dates d ON d.region = c.region
+                WHERE c.region != '' GROUP BY c.region ORDER BY c.region
+            """).fetchall()
+    except Exception as e:
+        print(f"Counters Read Error: {e}")
+        return {}
+    index = {state: [] for state in config.COASTAL_DATA}
+    for region, n, first, last in rows:
+        state = region_resolver.resolve(region).state
+        index.setdefault(state, []).append(RegionInfo(region, state, n, first, last))
+    return {state: infos for state, infos in index.items() if infos}
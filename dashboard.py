@@ -3,6 +3,19 @@ import streamlit as st
 import pandas as pd
 from datetime import date, datetime
 import database as db
+import auth
+import counters
+import bulk_insert
+import regions
+import spatial
+import payload
+import grid
+import exports
+import picker
+import ingest
+import headers
+import validation
+import metrics
 import utils
 import config
 import prediction # <--- IMPORT THE NEW FILE
@@ -16,8 +29,7 @@ def main_app():
     st.sidebar.badge(st.session_state['user_role'])
     
     if st.sidebar.button("Logout"):
-        st.session_state['logged_in'] = False
-        st.session_state['user_email'] = None
+        auth.end_session()
         st.rerun()
         
     st.title("🌊 NCCR Marine Data Portal")
@@ -25,44 +37,36 @@ def main_app():
     # --- DEFINE MENUS BASED ON ROLE ---
     # Added "🔮 AI Prediction Tools" to both menus
     if st.session_state['user_role'] == 'Admin':
-        options = ["📥 Contribute Data", "🔮 AI Prediction Tools", "🗺️ Global Data Map", "📰 Research & News", "👮 Data Requests (Approval)", "📂 Master Data Repository", "🗑️ Manage & Delete Data"]
+        options = ["📥 Contribute Data", "🔮 AI Prediction Tools", "🗺️ Global Data Map", "📰 Research & News", "👮 Data Requests (Approval)", "📂 Master Data Repository", "🗑️ Manage & Delete Data", "⏱️ Performance"]
     else:
         options = ["📥 Contribute Data", "🔮 AI Prediction Tools", "🗺️ Global Data Map", "📰 Research & News", "📊 Request & Download Data"]
         
     menu = st.sidebar.radio("Go to:", options)
-
+    # Times this rerun of the chosen page, including runs cut short by st.rerun() / st.stop()
+    page_timer = metrics.PageTimer(menu)
+    try:
+        _render_page(menu)
+    finally:
+        page_timer.stop()
+
+def _render_page(menu):
+    """Admin sidebar counters and the chosen page (timed by main_app)."""
     # --- ADMIN SIDEBAR ANALYTICS (NEW) ---
     if st.session_state['user_role'] == 'Admin':
         st.sidebar.markdown("---")
         st.sidebar.subheader("📊 Live Counters")
         
-        # Quick Fetch for Stats
-        stats_df = db.fetch_all_data()
+        # Precomputed counters (constant time, no table scan)
+        stats = counters.get_summary()
         
-        if not stats_df.empty:
-            total_records = len(stats_df)
-            
-            # Calculate Monthly Growth
-            try:
-                current_month = datetime.now().strftime("%Y-%m")
-                # Ensure string parsing is safe
-                stats_df['temp_month'] = stats_df['created_at'].astype(str).str[:7]
-                new_this_month = len(stats_df[stats_df['temp_month'] == current_month])
-            except:
-                new_this_month = 0
-                
+        if stats['total']:
             # Top Region Logic
-            top_loc = "N/A"
-            if 'Main_Location' in stats_df.columns:
-                try:
-                    top_loc = stats_df['Main_Location'].value_counts().idxmax()
-                    # Optional: Shorten if too long
-                    if len(top_loc) > 15: top_loc = top_loc[:12] + "..."
-                except:
-                    top_loc = "N/A"
+            top_loc = stats['top_region']
+            # Optional: Shorten if too long
+            if len(top_loc) > 15: top_loc = top_loc[:12] + "..."
 
             # Display Metrics
-            st.sidebar.metric("Total Data Points", total_records, delta=f"+{new_this_month} this month")
+            st.sidebar.metric("Total Data Points", stats['total'], delta=f"+{stats['this_month']} this month")
             st.sidebar.caption(f"🏆 Top Region: **{top_loc}**")
         else:
             st.sidebar.warning("No data found.")
@@ -80,82 +84,109 @@ def main_app():
         st.header("🌍 Global Marine Data Map")
         st.markdown("""
         **Data Visualization Console**  
-        🔴 Each point represents a verified field data report.  
-        👇 **Hover over points** to see details like Water Temperature, Salinity, and Contributor.
+        🔴 Each circle sums up the field reports in one map cell (bigger = more reports).  
+        👇 **Hover** for counts, latest entry and mean readings; **click a circle** to drill into it.
         """)
         
-        df = db.fetch_all_data()
+        # Only the columns the map draws; the grid is aggregated here, not in the browser
+        df, version = spatial.load_points()
         import pydeck as pdk # Import locally to avoid global clutter if unused elsewhere
         
         if not df.empty:
-            if 'Latitude' in df.columns and 'Longitude' in df.columns:
-                # Filter valid coordinates
-                map_df = df.dropna(subset=['Latitude', 'Longitude']) # Ensure numeric?
-                
-                # Convert coords to numeric just in case
-                map_df['latitude'] = pd.to_numeric(map_df['Latitude'], errors='coerce')
-                map_df['longitude'] = pd.to_numeric(map_df['Longitude'], errors='coerce')
-                map_df = map_df.dropna(subset=['latitude', 'longitude'])
-
-                if not map_df.empty:
-                    # --- INTERACTIVE MAP METRICS ---
-                    m1, m2, m3 = st.columns(3)
-                    m1.metric("📍 Active Locations", map_df['Main_Location'].nunique())
-                    m2.metric("📝 Total Reports", len(map_df))
-                    m3.metric("📅 Latest Entry", map_df['created_at'].max()[:10] if 'created_at' in map_df else "N/A")
-
-                    st.divider()
-
-                    # --- PYDECK LAYER ---
-                    layer = pdk.Layer(
-                        "ScatterplotLayer",
-                        data=map_df,
-                        get_position='[longitude, latitude]',
-                        get_color='[200, 30, 0, 160]', # Red with transparency
-                        get_radius=2000, # Meters
-                        pickable=True, # Enable Tooltip
-                        radius_min_pixels=8,
-                        radius_max_pixels=30,
-                    )
-
-                    # --- VIEW STATE ---
-                    # Center map on India approx
-                    view_state = pdk.ViewState(
-                        latitude=20.5937,
-                        longitude=78.9629,
-                        zoom=4,
-                        pitch=0,
-                    )
-
-                    # --- TOOLTIP CONFIG ---
-                    tooltip = {
-                        "html": "<b>Location:</b> {Main_Location} <br/>"
-                                "<b>Date:</b> {Date} <br/>"
-                                "<b>Temp:</b> {Water_Temp} °C <br/>"
-                                "<b>Salinity:</b> {Salinity} psu <br/>"
-                                "<b>Contributor:</b> {Contributor}",
-                        "style": {
-                            "backgroundColor": "steelblue",
-                            "color": "white"
-                        }
-                    }
-
-                    # Render
-                    r = pdk.Deck(
-                        layers=[layer],
-                        initial_view_state=view_state,
-                        tooltip=tooltip,
-                        # map_style=None  # Let Streamlit use default (usually CARTO)
-                    )
-                    
-                    st.pydeck_chart(r)
-                    
-                else:
-                    st.warning("No data points with valid coordinates found after verification.")
+            # --- INTERACTIVE MAP METRICS ---
+            m1, m2, m3 = st.columns(3)
+            m1.metric("📍 Active Locations", df['Main_Location'].nunique() if 'Main_Location' in df else 0)
+            m2.metric("📝 Total Reports", len(df))
+            m3.metric("📅 Latest Entry", str(df['created_at'].max())[:10] if 'created_at' in df else "N/A")
+
+            st.divider()
+
+            # --- DRILL-DOWN STATE (stack of cell bounds) ---
+            trail = st.session_state.setdefault('map_trail', [])
+            bbox = tuple(trail[-1]) if trail else None
+            kind, layer_df, zoom = spatial.view(df, bbox, version)
+
+            nav1, nav2, nav3 = st.columns([1, 1, 4])
+            if nav1.button("⬅️ Back", disabled=not trail):
+                trail.pop()
+                st.rerun()
+            if nav2.button("🌏 Reset", disabled=not trail):
+                trail.clear()
+                st.rerun()
+            if kind == "points":
+                nav3.caption(f"Showing {len(layer_df)} individual reports in this area.")
+            else:
+                nav3.caption(f"{int(layer_df['count'].sum()) if not layer_df.empty else 0} reports in "
+                             f"{len(layer_df)} cells. Click a cell to zoom in.")
+
+            # --- TOOLTIP CONFIG ---
+            html = ("<b>Location:</b> {location} <br/>"
+                    "<b>Reports:</b> {count} <br/>"
+                    "<b>Latest:</b> {latest} <br/>"
+                    "<b>Temp:</b> {water_temp} <br/>"
+                    "<b>Salinity:</b> {salinity}")
+            if kind == "points":
+                html += " <br/><b>Contributor:</b> {contributor}"
+            tooltip = {
+                "html": html,
+                "style": {
+                    "backgroundColor": "steelblue",
+                    "color": "white"
+                }
+            }
+
+            # --- PYDECK LAYER ---
+            # Only the fields used by the accessors and tooltip are sent, as float32 numbers
+            if kind == "points":
+                layer = payload.layer(
+                    "ScatterplotLayer",
+                    layer_df,
+                    tooltip=tooltip,
+                    id="points",
+                    get_position='[lon, lat]',
+                    get_color='[200, 30, 0, 160]', # Red with transparency
+                    get_radius=200, # Meters
+                    pickable=True, # Enable Tooltip
+                    radius_min_pixels=5,
+                    radius_max_pixels=15,
+                )
             else:
-                st.warning("Dataset missing Latitude/Longitude columns.")
+                layer = payload.layer(
+                    "ScatterplotLayer",
+                    layer_df,
+                    tooltip=tooltip,
+                    keep=['south', 'west', 'north', 'east'], # Read back when a cell is clicked
+                    id="cells",
+                    get_position='[lon, lat]',
+                    get_color='[200, 30, 0, 160]',
+                    get_radius='6 + 4 * Math.log2(count)', # Pixels; grows with the report count
+                    radius_units='pixels',
+                    pickable=True,
+                )
+
+            # --- VIEW STATE ---
+            # Centered on India approx, or on the drilled-into cell
+            lat0, lon0 = spatial.center(bbox) if bbox else (20.5937, 78.9629)
+            view_state = pdk.ViewState(latitude=lat0, longitude=lon0, zoom=zoom, pitch=0)
+
+            # Render
+            r = pdk.Deck(
+                layers=[layer],
+                initial_view_state=view_state,
+                tooltip=tooltip,
+                # map_style=None  # Let Streamlit use default (usually CARTO)
+            )
+            
+            event = st.pydeck_chart(r, on_select="rerun", selection_mode="single-object", key=f"map_{len(trail)}")
+
+            # Clicking a cell drills into its bounds
+            picked = (event.selection.get("objects", {}) or {}).get("cells", []) if event else []
+            if picked and len(trail) < config.MAP_MAX_ZOOM:
+                cell = picked[0]
+                trail.append([cell['south'], cell['west'], cell['north'], cell['east']])
+                st.rerun()
         else:
-            st.info("Database is empty.")
+            st.info("No data points with valid coordinates found.")
 
     # -----------------------------------------------------
     # OPTION A: CONTRIBUTE DATA
@@ -305,7 +336,7 @@ def main_app():
         with tab_bulk:
             st.subheader("Bulk Data Upload (NCCR Format)")
             st.write("Upload historical data (CSV or Excel) to train the prediction model.")
-            st.info("💡 **Format:** The system expects official NCCR headers like `WQ Temp (°C)`, `Sal (psu)`, `Dissolved Oxygen (mg/L)`, etc.")
+            st.info("💡 **Format:** The system expects official NCCR headers like `WQ Temp (°C)`, `Sal (psu)`, `Dissolved Oxygen (mg/L)`, etc. Known alternative spellings (config.HEADER_ALIASES) are matched automatically; check the column mapping before uploading.")
             
             # 1. Location Selection
             bc1, bc2 = st.columns(2)
@@ -319,7 +350,7 @@ def main_app():
                 b_def_lat, b_def_lon = 13.0827, 80.2707
             else:
                 final_bulk_loc = b_coast
-                b_def_lat, b_def_lon = config.REGION_COORDS.get(b_coast, (13.0827, 80.2707))
+                b_def_lat, b_def_lon = regions.coords_for(b_coast, (13.0827, 80.2707))
 
             # --- Details for Bulk Upload ---
             st.write("**Location & Contributor Details for this Batch:**")
@@ -341,89 +372,92 @@ def main_app():
             
             if uploaded_file is not None:
                 try:
-                    # SMART READ LOGIC
-                    if uploaded_file.name.endswith('.csv'):
-                        bulk_df = pd.read_csv(uploaded_file)
-                    else:
-                        bulk_df = pd.read_excel(uploaded_file)
+                    # SMART READ LOGIC (only the preview rows are parsed here)
+                    preview_df = ingest.preview_sheet(uploaded_file, uploaded_file.name)
 
                     st.write("📊 **Data Preview:**")
-                    st.dataframe(bulk_df.head(), use_container_width=True) # FIXED WIDTH ERROR HERE
+                    st.dataframe(preview_df, use_container_width=True) # FIXED WIDTH ERROR HERE
+                    
+                    # Column plan: the header set is resolved once (cached) and confirmed before ingest
+                    plan = headers.resolve(preview_df.columns)
+                    if plan.suggested:
+                        # Misspelled headers are only used once the uploader confirms each one
+                        st.write("🔍 **Close matches (tick each one to use it):**")
+                        confirmed = [
+                            m.header for m in plan.suggested
+                            if st.checkbox(f"'{m.header}' is {headers.target_label(m.target)} ({m.score:.0%} similar)",
+                                           key=f"fuzzy_{plan.signature}_{m.header}")
+                        ]
+                        plan = headers.confirm(plan, confirmed)
+                    st.write("🧭 **Column Mapping:**")
+                    st.dataframe(pd.DataFrame(headers.plan_table(plan)), use_container_width=True, hide_index=True)
+                    if not plan.columns:
+                        st.warning("⚠️ No known parameter headers found in this file.")
+                    if plan.timestamp is None:
+                        st.caption("No 'Date and Time' column found: rows will get today's date and time.")
+                    plan_ok = st.checkbox("✅ The column mapping above is correct", key=f"plan_ok_{plan.signature}")
+                    dup_policy = st.radio(
+                        "Duplicate rows (same location, date, time and values)",
+                        ["Skip duplicates", "Upload anyway"], horizontal=True,
+                    )
                     
-                    if st.button("🚀 Upload Bulk Data"):
-                        data_list = []
+                    if st.button("🚀 Upload Bulk Data", disabled=not plan_ok):
                         # Progress bar for large files
                         my_bar = st.progress(0)
-                        total_rows = len(bulk_df)
-
-                        for index, row in bulk_df.iterrows():
-                            # --- DATE & TIME HANDLING ---
-                            try:
-                                if "Date and Time" in row:
-                                    dt_val = row["Date and Time"]
-                                    if pd.notnull(dt_val):
-                                        dt_obj = pd.to_datetime(dt_val)
-                                        row_date = str(dt_obj.date())
-                                        row_time = str(dt_obj.time())
-                                    else:
-                                        row_date = str(date.today())
-                                        row_time = str(datetime.now().time())
-                                else:
-                                    row_date = str(date.today())
-                                    row_time = str(datetime.now().time())
-                            except:
-                                row_date = str(date.today())
-                                row_time = "00:00:00"
-                            
-                            packet = {
-                                "Contributor": st.session_state['user_name'],
-                                "Email": st.session_state['user_email'],
-                                
-                                "Main_Location": final_bulk_loc,
-                                "Location": b_spot,
-                                "Latitude": b_lat,
-                                "Longitude": b_lon,
-                                "Profession": b_prof,
-                                "Designation": b_desig,
-                                
-                                "Date": row_date,
-                                "Time": row_time,
-                                
-                                # --- MAPPING EXACT EXCEL HEADERS TO DB COLUMNS ---
-                                "Water_Temp": row.get("WQ Temp (°C)"),
-                                "Salinity": row.get("Sal (psu)"),
-                                "DO": row.get("Dissolved Oxygen (mg/L)"),
-                                "pH": row.get("pH"),
-                                "Turbidity": row.get("Turbidity (NTU)") or row.get("Turbididt y (NTU)"), # Handle Typos
-                                "TSS": row.get("TSS (mg/L)"),
-                                "TDS": row.get("TDS (g/L)"),
-                                
-                                "Chlorophyll": row.get("Chl(ug/l)") or row.get("Chlorophy (mg/L)") or row.get("Chlorophy_RFU (ug/L)"),
-                                "BGA": row.get("BGA (mg/l)"),
-                                
-                                "Wind_Speed": row.get("Wind Speed (m/s)"),
-                                "Wind_Direction": row.get("Wind Dir (Deg)"),
-                                "Precipitation": row.get("Total Precipitation (mm)"),
-                                "Humidity": row.get("Rel.Hum (%)"),
-                                "Air_Temp": row.get("Air Temp (°C)"),
-                                
-                                "created_at": str(datetime.now())
-                            }
-                            
-                            # Clean up NaNs
-                            for k, v in packet.items():
-                                if pd.isna(v) or v == "None": packet[k] = None
-                                    
-                            data_list.append(packet)
-                            
-                            if index % 50 == 0:
-                                my_bar.progress(min(index / total_rows, 1.0))
+                        batch = {
+                            "Contributor": st.session_state['user_name'],
+                            "Email": st.session_state['user_email'],
+                            "Main_Location": final_bulk_loc,
+                            "Location": b_spot,
+                            "Latitude": b_lat,
+                            "Longitude": b_lon,
+                            "Profession": b_prof,
+                            "Designation": b_desig,
+                        }
                         
-                        success, msg = db.save_bulk_data(data_list)
+                        # Same file + batch details = same upload id, so a failed upload resumes
+                        upload_id = bulk_insert.upload_id_for(
+                            uploaded_file, final_bulk_loc, b_spot, b_lat, b_lon, st.session_state['user_email']
+                        )
+                        def show_progress(done, total):
+                            if total:
+                                my_bar.progress(min(done / total, 1.0), text=f"Processed {done / 1e6:.1f} / {total / 1e6:.1f} MB...")
+
+                        # Chunks are parsed, transformed and inserted in a pipeline (bounded memory)
+                        report = validation.QCReport()
+                        success, msg, saved = ingest.stream_upload(
+                            uploaded_file, uploaded_file.name, batch, upload_id=upload_id, progress=show_progress, plan=plan,
+                            report=report, duplicates="skip" if dup_policy == "Skip duplicates" else "keep",
+                        )
                         my_bar.progress(1.0)
 
-                        if success:
-                            st.success(f"✅ Successfully uploaded {len(data_list)} records from {uploaded_file.name}!")
+                        # QUALITY REPORT
+                        qc = report.summary()
+                        if qc["rows_read"]:
+                            st.write("🧪 **Quality Check:**")
+                            c1, c2, c3, c4 = st.columns(4)
+                            c1.metric("Rows Checked", qc["rows_read"])
+                            c2.metric("Rows Accepted", qc["rows_accepted"])
+                            c3.metric("Duplicates", qc["duplicates_in_file"] + qc["duplicates_existing"])
+                            c4.metric("Values Removed", qc["values_removed"])
+                            issues = report.table()
+                            if not issues.empty:
+                                st.dataframe(issues, use_container_width=True, hide_index=True)
+                                st.download_button(
+                                    "📥 Download Quality Report", issues.to_csv(index=False).encode('utf-8'),
+                                    f"QC_{uploaded_file.name}.csv", "text/csv",
+                                )
+
+                        if qc["stored_unchecked"]:
+                            st.caption(f"ℹ️ {qc['stored_unchecked']} rows were not checked against stored rows: "
+                                       "the duplicate index is being rebuilt.")
+
+                        if success and saved == 0:
+                            if msg != "Success": st.info(msg)
+                            st.warning(f"⚠️ No records were written from {uploaded_file.name}: every row was rejected or already stored. See the quality check above.")
+                        elif success:
+                            if msg != "Success": st.info(msg)
+                            st.success(f"✅ Successfully uploaded {saved} records from {uploaded_file.name}!")
                             st.balloons()
                         else:
                             st.error(f"Failed: {msg}")
@@ -461,8 +495,11 @@ def main_app():
         st.divider()
         st.subheader("📚 Latest Updates")
         
-        # --- DISPLAY SECTION ---
-        papers = db.fetch_papers()
+        # --- DISPLAY SECTION (metadata only, one page at a time) ---
+        total_papers = db.count_papers()
+        page_count = max(1, -(-total_papers // config.PAPERS_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="papers_page") if page_count > 1 else 1
+        papers = db.fetch_papers(offset=(page - 1) * config.PAPERS_PAGE_SIZE, limit=config.PAPERS_PAGE_SIZE)
         if papers:
             for p in papers:
                 # Highlight Admin Posts
@@ -475,21 +512,25 @@ def main_app():
                             <p>{p['summary']}</p>
                         </div>
                         """, unsafe_allow_html=True)
-                        if p['file_data']:
-                            b64 = p['file_data']
-                            href = f'<a href="data:application/octet-stream;base64,{b64}" download="{p["file_name"]}">📎 Download Attached File</a>'
-                            st.markdown(href, unsafe_allow_html=True)
+                        download_label = "📎 Download Attached File"
                 else:
                     # User Posts
                     with st.container():
                         st.markdown(f"### 📄 {p['title']}")
                         st.caption(f"By: {p['author']} | 📅 {p['created_at'][:10]}")
                         st.write(p['summary'])
-                        if p['file_data']:
-                            b64 = p['file_data']
-                            href = f'<a href="data:application/octet-stream;base64,{b64}" download="{p["file_name"]}">📎 Download File</a>'
-                            st.markdown(href, unsafe_allow_html=True)
+                        download_label = "📎 Download File"
+                if p['file_name']:
+                    # Bytes are fetched from the blob store only when the button is clicked
+                    st.download_button(
+                        label=download_label,
+                        data=lambda pid=p['id']: db.fetch_paper_file(pid)[1] or b"",
+                        file_name=p['file_name'],
+                        key=f"paper_file_{p['id']}",
+                    )
                 st.divider()
+            if page_count > 1:
+                st.caption(f"Page {page} of {page_count} ({total_papers} posts)")
         else:
             st.info("No papers or news uploaded yet.")
 
@@ -529,9 +570,11 @@ def main_app():
     # -----------------------------------------------------
     elif menu == "📂 Master Data Repository":
         st.header("NCCR Master Database")
-        df = db.fetch_all_data()
+        # State -> regions present in the database, with counts and date extents (summary store, no table scan)
+        region_index = counters.get_region_index()
+        region_counts = {info.region: info.count for infos in region_index.values() for info in infos}
         
-        if not df.empty and 'Main_Location' in df.columns:
+        if region_counts:
             st.subheader("📍 View Data by Region")
             view_mode = st.radio("Select View Mode:", ["🌍 Specific Region", "📚 View All Data"], horizontal=True)
             
@@ -540,31 +583,63 @@ def main_app():
                 state_list = list(config.COASTAL_DATA.keys())
                 selected_state = st.selectbox("Select State / UT", state_list)
                 
-                # 2. Get standard regions from Config
-                valid_regions_config = config.COASTAL_DATA.get(selected_state, [])
-                
-                # 3. Get actual regions existing in Database
-                db_locations = df['Main_Location'].dropna().unique().tolist()
+                # 2. Regions of this state that exist in the database (standard regions and "State - Custom" names)
+                state_regions = {info.region: info for info in region_index.get(selected_state, [])}
                 
-                filtered_options = [
-                    loc for loc in db_locations 
-                    if loc in valid_regions_config or loc.startswith(f"{selected_state} -")
-                ]
-                
-                # 4. If data exists for this state, show Region Dropdown
-                if filtered_options:
-                    selected_region = st.selectbox("Select Coastal Region", filtered_options)
+                # 3. If data exists for this state, show Region Dropdown
+                if state_regions:
+                    selected_region = st.selectbox(
+                        "Select Coastal Region", list(state_regions),
+                        format_func=lambda r: f"{r} ({state_regions[r].count} records)",
+                    )
+                    info = state_regions[selected_region]
                     
-                    # 5. Show Data
-                    filtered_df = df[df['Main_Location'] == selected_region]
-                    st.info(f"📂 Found **{len(filtered_df)}** records under **{selected_region}**")
+                    # 4. Show Data (only this region's rows are fetched)
+                    filtered_df = db.query_marine_data(regions=[selected_region])
+                    st.info(f"📂 Found **{len(filtered_df)}** records under **{selected_region}**"
+                            + (f" ({info.first_date} to {info.last_date})" if info.first_date else ""))
                     st.dataframe(filtered_df, use_container_width=True) # FIXED WIDTH ERROR
                 else:
                     st.warning(f"No data found for any region in {selected_state}")
             else:
-                # View All Data
-                st.write(f"Total Records: **{len(df)}**")
-                st.dataframe(df, use_container_width=True) # FIXED WIDTH ERROR
+                # View All Data: one page at a time, sorted and filtered by the database
+                f1, f2, f3 = st.columns([2, 1, 1])
+                grid_regions = f1.multiselect("Filter by Region", sorted(region_counts))
+                use_dates = f2.checkbox("Filter by Date")
+                grid_dates = f3.date_input("Date Range", value=(date(2020, 1, 1), date.today()), disabled=not use_dates)
+                date_from = date_to = None
+                if use_dates and isinstance(grid_dates, (list, tuple)) and len(grid_dates) == 2:
+                    date_from, date_to = grid_dates
+
+                s1, s2, s3 = st.columns([2, 1, 1])
+                sort_col = s1.selectbox("Sort by", ["id", "Date", "Main_Location", "Water_Temp", "Salinity", "pH", "DO", "created_at"])
+                sort_desc = s2.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Descending"
+                page_size = s3.selectbox("Rows per page", config.GRID_PAGE_SIZES, index=1)
+
+                total = grid.total_rows(grid_regions, date_from, date_to)
+                page_total = grid.page_count(total, page_size)
+
+                # Any change to the filters or sort starts again from page 1
+                signature = (tuple(grid_regions), date_from, date_to, sort_col, sort_desc, page_size)
+                if st.session_state.get('grid_signature') != signature:
+                    st.session_state['grid_signature'] = signature
+                    st.session_state['grid_page'] = 1
+                page = min(st.session_state.get('grid_page', 1), page_total)
+
+                p1, p2, p3 = st.columns([1, 2, 1])
+                if p1.button("⬅️ Previous", disabled=page <= 1):
+                    st.session_state['grid_page'] = page - 1
+                    st.rerun()
+                p2.markdown(f"Page **{page}** of **{page_total}** · Total Records: **{total}**")
+                if p3.button("Next ➡️", disabled=page >= page_total):
+                    st.session_state['grid_page'] = page + 1
+                    st.rerun()
+
+                page_df = grid.fetch_page(page, page_size, sort=sort_col, desc=sort_desc,
+                                          regions=grid_regions, date_from=date_from, date_to=date_to, total=total)
+                st.dataframe(page_df, use_container_width=True, hide_index=True)
+        elif not counters.ready():
+            st.info("⏳ The region summary is being built in the background. Refresh in a moment.")
         else:
             st.warning("Database is empty or missing 'Main_Location' data.")
 
@@ -577,36 +652,30 @@ def main_app():
         
         if status == "Approved":
             st.success("✅ Access Granted: You can download data.")
-            raw_df = db.fetch_all_data()
-            if not raw_df.empty and 'Main_Location' in raw_df.columns:
+            # State -> regions present in the database, with counts and date extents, from the summary store
+            region_index = counters.get_region_index()
+            if region_index:
                 st.divider()
                 st.subheader("🛠️ Step 1: Select Region")
                 
-                # --- UPDATED: STATE -> REGION FILTER ---
-                available_locs = raw_df['Main_Location'].dropna().unique().tolist()
-                
                 d1, d2 = st.columns(2)
                 
                 # 1. State Selector
                 dl_state = d1.selectbox("Select State / UT", list(config.COASTAL_DATA.keys()))
                 
-                # 2. Filter Regions based on State
-                valid_state_regions = config.COASTAL_DATA.get(dl_state, [])
+                # 2. Regions of this state (precomputed)
+                state_regions = {info.region: info for info in region_index.get(dl_state, [])}
                 
-                filtered_regions = [
-                    loc for loc in available_locs 
-                    if loc in valid_state_regions or loc.startswith(f"{dl_state} -")
-                ]
-                
-                if not filtered_regions:
+                if not state_regions:
                     d2.warning(f"No data found for {dl_state}")
                     selected_loc = None
                 else:
-                    selected_loc = d2.selectbox("Select Specific Region", filtered_regions)
+                    selected_loc = d2.selectbox("Select Specific Region", list(state_regions))
 
                 if selected_loc:
-                    filtered_df = raw_df[raw_df['Main_Location'] == selected_loc].copy()
-                    st.info(f"Found {len(filtered_df)} records for {selected_loc}.")
+                    info = state_regions[selected_loc]
+                    span = f" collected {info.first_date} to {info.last_date}" if info.first_date else ""
+                    st.info(f"Found {info.count} records for {selected_loc}{span}.")
                     
                     st.divider()
                     st.subheader("🛠️ Step 2: Select Parameter Categories")
@@ -622,14 +691,15 @@ def main_app():
                     for cat in selected_cats:
                         final_cols.extend(cat_options[cat])
                     
-                    # Ensure columns exist in dataframe
-                    final_cols = [c for c in final_cols if c in filtered_df.columns]
-                    
-                    if st.button("Generate CSV"):
-                        export_df = filtered_df[final_cols].copy()
-                        export_df.rename(columns=config.COLUMN_CONFIG, inplace=True)
-                        csv = export_df.to_csv(index=False).encode('utf-8')
-                        st.download_button(label=f"📥 Download {selected_loc} Data (CSV)", data=csv, file_name=f"NCCR_{selected_loc}_Data.csv", mime="text/csv")
+                    export_fmt = st.radio("File Format", list(exports.FORMATS), format_func=lambda f: exports.FORMATS[f][0], horizontal=True)
+                    if st.button("Generate Export"):
+                        # Streamed from the database into a file; unchanged exports come from the disk cache
+                        with st.spinner("Preparing export..."):
+                            path = exports.build(selected_loc, final_cols, export_fmt)
+                        label, _, mime = exports.FORMATS[export_fmt]
+                        st.download_button(label=f"📥 Download {selected_loc} Data ({label})", data=lambda: exports.read(path), file_name=exports.file_name(selected_loc, export_fmt), mime=mime)
+            elif not counters.ready():
+                st.info("⏳ The region summary is being built in the background. Refresh in a moment.")
             else:
                 st.warning("Database is empty or missing 'Main_Location' data.")
         elif status == "Pending":
@@ -661,48 +731,132 @@ def main_app():
         st.header("🗑️ Data Management Console")
         st.warning("⚠️ Warning: Deleted data cannot be recovered.")
         
-        # Fetch Data
-        df = db.fetch_all_data()
+        # Id -> label index over the replica (rebuilt only when the table changes)
+        index = picker.load()
         
-        if not df.empty:
-            # Optional: Filter by Location to make finding rows easier
-            if 'Main_Location' in df.columns:
-                all_locs = df['Main_Location'].unique().tolist()
-                filter_loc = st.selectbox("Filter by Region (Optional)", ["All Regions"] + all_locs)
-                
-                if filter_loc != "All Regions":
-                    df_view = df[df['Main_Location'] == filter_loc]
-                else:
-                    df_view = df
+        if len(index):
+            # Filters: region, date range and search words over id / date / location
+            f1, f2, f3 = st.columns([2, 1, 1])
+            filter_loc = f1.selectbox("Filter by Region (Optional)", ["All Regions"] + list(counters.get_region_counts().keys()))
+            use_dates = f2.checkbox("Filter by Date", key="del_use_dates")
+            del_dates = f3.date_input("Date Range", value=(date(2020, 1, 1), date.today()), disabled=not use_dates, key="del_dates")
+            date_from = date_to = None
+            if use_dates and isinstance(del_dates, (list, tuple)) and len(del_dates) == 2:
+                date_from, date_to = del_dates
+            query = st.text_input("🔎 Search by ID, date or location", placeholder="e.g. 1042 or 2024-03 chennai")
+
+            matches = index.filter(query, None if filter_loc == "All Regions" else filter_loc, date_from, date_to)
+            selected = st.session_state.setdefault('delete_selection', set())
+
+            mode = st.radio("Selection", ["Pick records", "All records matching the filters"], horizontal=True)
+            if mode == "Pick records":
+                # Only one page of candidates becomes widget options
+                page_total = picker.page_count(len(matches))
+                signature = (query, filter_loc, date_from, date_to)
+                if st.session_state.get('delete_signature') != signature:
+                    st.session_state['delete_signature'] = signature
+                    st.session_state['delete_page'] = 1
+                page = min(st.session_state.get('delete_page', 1), page_total)
+
+                st.subheader(f"Select Records to Delete ({len(matches)} rows found)")
+                p1, p2, p3 = st.columns([1, 2, 1])
+                if p1.button("⬅️ Previous", disabled=page <= 1):
+                    st.session_state['delete_page'] = page - 1
+                    st.rerun()
+                p2.markdown(f"Page **{page}** of **{page_total}**")
+                if p3.button("Next ➡️", disabled=page >= page_total):
+                    st.session_state['delete_page'] = page + 1
+                    st.rerun()
+
+                page_ids, labels = index.page(matches, page, config.PICKER_PAGE_SIZE)
+                chosen = st.multiselect(
+                    "Search and Select Records to Delete:",
+                    options=page_ids,
+                    default=[i for i in page_ids if i in selected],
+                    format_func=lambda x: labels.get(x, f"ID {x}"),
+                    key=f"delete_pick_{hash(signature)}_{page}",
+                )
+                # Selections on other pages are kept
+                selected.difference_update(page_ids)
+                selected.update(chosen)
+                selected_ids = sorted(selected)
+                if selected_ids and st.button("Clear Selection"):
+                    selected.clear()
+                    st.rerun()
             else:
-                df_view = df
-            
-            # Show Data with Checkbox Selection
-            st.subheader(f"Select Records to Delete ({len(df_view)} rows found)")
-            
-            # Method: Multiselect by ID (Safest & Simplest)
-            date_col = 'Date' if 'Date' in df_view.columns else 'created_at'
-            loc_col = 'Main_Location' if 'Main_Location' in df_view.columns else 'id'
-            
-            df_view['display_label'] = df_view.apply(lambda x: f"ID {x['id']} | {x.get(date_col, 'N/A')} | {x.get(loc_col, 'N/A')}", axis=1)
-            
-            selected_ids = st.multiselect(
-                "Search and Select Records to Delete:",
-                options=df_view['id'],
-                format_func=lambda x: df_view[df_view['id'] == x]['display_label'].values[0] if x in df_view['id'].values else f"ID {x}"
-            )
+                # Deleted on the server by region / date range, so rows the replica has not
+                # synced yet are included; search words only narrow the picker
+                region = None if filter_loc == "All Regions" else filter_loc
+                delete_where = {'regions': [region] if region else None, 'date_from': date_from, 'date_to': date_to}
+                selected_ids = index.ids[index.filter("", region, date_from, date_to)].tolist()
+                if query:
+                    st.caption("Search words only narrow \"Pick records\"; this deletes by region and date range.")
+                if not (region or date_from):
+                    st.warning("Choose a region or date range first.")
+                    selected_ids = []
+                else:
+                    st.caption(f"Counts come from the local copy of the table (synced every {config.REPLICA_SYNC_INTERVAL} s). "
+                               "The delete runs on the server and removes every matching row, including any added since.")
             
             # Preview Selected
             if selected_ids:
                 st.error(f"You have selected {len(selected_ids)} records for DELETION.")
-                st.dataframe(df[df['id'].isin(selected_ids)], use_container_width=True) # FIXED WIDTH ERROR
+                preview_ids = selected_ids[:config.PICKER_PREVIEW_ROWS]
+                if len(selected_ids) > len(preview_ids):
+                    st.caption(f"Showing the first {len(preview_ids)}.")
+                st.dataframe(db.fetch_marine_by_ids(preview_ids), use_container_width=True) # FIXED WIDTH ERROR
                 
                 if st.button("🚨 CONFIRM PERMANENT DELETE"):
-                    success = db.delete_data(selected_ids)
+                    if mode == "Pick records":
+                        success = db.delete_data(selected_ids)
+                    else:
+                        success, _ = db.delete_marine_where(**delete_where)
                     if success:
+                        selected.clear()
                         st.success("✅ Records deleted successfully!")
                         st.rerun()
                     else:
                         st.error("❌ Deletion failed. Check console for details.")
         else:
-            st.info("No data available to delete.")
\ No newline at end of file
+            st.info("No data available to delete.")
+
+    # -----------------------------------------------------
+    # OPTION: PERFORMANCE (ADMIN)
+    # -----------------------------------------------------
+    elif menu == "⏱️ Performance" and st.session_state['user_role'] == 'Admin':
+        st.header("⏱️ Performance")
+        st.caption("Latency, rows and payload per database call and per page, since this server process started.")
+
+        perf = pd.DataFrame(metrics.snapshot())
+        if perf.empty:
+            st.info("No operations recorded yet.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Operations", len(perf))
+            c2.metric("Calls", int(perf['calls'].sum()))
+            c3.metric("Errors", int(perf['errors'].sum()))
+
+            kind = st.radio("Show", ["All", "Database calls", "Pages"], horizontal=True)
+            if kind == "Database calls":
+                perf = perf[perf['op'].str.startswith("db.")]
+            elif kind == "Pages":
+                perf = perf[perf['op'].str.startswith("page.")]
+
+            st.dataframe(
+                perf[['op', 'calls', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'rows', 'bytes', 'total_s']],
+                use_container_width=True, hide_index=True,
+                column_config={
+                    "op": "Operation",
+                    "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+                    "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                    "p99_ms": st.column_config.NumberColumn("p99 (ms)", format="%.1f"),
+                    "total_s": st.column_config.NumberColumn("Total (s)", format="%.2f"),
+                },
+            )
+
+        e1, e2, e3 = st.columns(3)
+        e1.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="nccr_metrics.prom", mime="text/plain")
+        e2.download_button("⬇️ JSON", metrics.to_json(), file_name="nccr_metrics.json", mime="application/json")
+        if e3.button("♻️ Reset"):
+            metrics.reset()
+            st.rerun()
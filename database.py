@@ -1,17 +1,61 @@
+import os
 import streamlit as st
 from supabase import create_client
 import pandas as pd
-import bcrypt
+import security
+import singleflight
+import result_cache
+import metrics
+import httpx
+from supabase import ClientOptions
+import schema
+import bulk_insert
+import local_engine
+import blobstore
+import config
 import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# --- STORAGE BACKEND ---
+def _storage_setting(key, default):
+    """Reads [storage] settings from env (NCCR_STORAGE_<KEY>) first, then st.secrets."""
+    value = os.environ.get(f"NCCR_STORAGE_{key.upper()}")
+    if value:
+        return value
+    try:
+        return st.secrets["storage"][key]
+    except Exception:
+        return default
+
+def _http_pool():
+    """One keep-alive connection pool shared by every session's Supabase requests."""
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        follow_redirects=True,
+    )
+
 # --- SUPABASE CONNECTION ---
 @st.cache_resource
 def init_connection():
+    """
+    Returns the storage client: Supabase by default, or the embedded SQLite engine
+    (local_engine.LocalClient) when the storage backend is set to "local".
+    Both expose the same query-builder interface.
+    """
     try:
+        if _storage_setting("backend", "supabase") == "local":
+            path = _storage_setting("path", os.path.join(config.CACHE_DIR, "local.db"))
+            return local_engine.LocalClient(path)
         url = st.secrets["supabase"]["url"]
         key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        return create_client(url, key, options=ClientOptions(httpx_client=_http_pool()))
     except Exception as e:
         print(f"Supabase Connect Error: {e}")
         return None
@@ -21,95 +65,75 @@ supabase = init_connection()
 # --- HELPER: MAP KEYS TO DB (LOWERCASE) ---
 def map_keys_to_db(data_dict):
     """
-    Maps Dashboard keys (TitleCase) to Database columns (lowercase).
-    This matches the renamed columns in your Supabase SQL.
+    Maps Dashboard keys (TitleCase) to Database columns (lowercase) for a single row.
+    The mapping itself lives in schema.py; bulk paths use schema.to_db_records instead.
     """
-    mapping = {
-        # Meta Data
-        'Main_Location': 'main_location', 
-        'Location': 'location', 
-        'Latitude': 'latitude', 
-        'Longitude': 'longitude',
-        'Date': 'date', 
-        'Time': 'time', 
-        'created_at': 'created_at',
-        
-        # Physical
-        'Water_Temp': 'water_temp', 
-        'Salinity': 'salinity', 
-        'pH': 'ph', 
-        'Turbidity': 'turbidity', 
-        'Transparency': 'transparency', 
-        'TSS': 'tss', 
-        'TDS': 'tds', 
-        'Color': 'color', 
-        'Odour': 'odour',
-        'Depth': 'depth',
-        
-        # Chemical
-        'DO': 'do', 
-        'BOD': 'bod', 
-        'COD': 'cod', 
-        'NH4_N': 'nh4_n', 
-        'NO3_N': 'no3_n', 
-        'NO2_N': 'no2_n', 
-        'PO4': 'po4', 
-        'SO4': 'so4',
-        
-        # Biological
-        'Chlorophyll': 'chlorophyll', 
-        'BGA': 'bga', 
-        'Fecal_Coliform': 'fecal_coliform', 
-        'Total_Coliform': 'total_coliform', 
-        'Productivity': 'productivity', 
-        'Phytoplankton': 'phytoplankton', 
-        'Zooplankton': 'zooplankton',
-        
-        # Meteorological & Geo
-        'Wind_Speed': 'wind_speed', 
-        'Wind_Direction': 'wind_direction', 
-        'Air_Temp': 'air_temp', 
-        'Humidity': 'humidity', 
-        'Precipitation': 'precipitation',
-        'Shoreline_Status': 'shoreline_status', 
-        'Population': 'population', 
-        'Tourist_Inflow': 'tourist_inflow', 
-        'Optimum_Season': 'optimum_season',
-        'Coastal_Villages': 'coastal_villages', 
-        'Panchayats': 'panchayats', 
-        'Fishermen': 'fishermen', 
-        'Landing_Centers': 'landing_centers', 
-        'Fish_Catch': 'fish_catch', 
-        'Water_Bodies': 'water_bodies', 
-        'Industrial_Est': 'industrial_est', 
-        'Tourism_Status': 'tourism_status',
-        
-        # Contributors
-        'Contributor': 'contributor', 
-        'Email': 'email', 
-        'Profession': 'profession', 
-        'Designation': 'designation'
-    }
-    
-    new_data = {}
-    for key, value in data_dict.items():
-        if key in mapping:
-            new_data[mapping[key]] = value
-        else:
-            # Fallback: lowercase everything else just in case
-            new_data[key.lower()] = value
-            
-    return new_data
+    return {schema.db_name(key): value for key, value in data_dict.items()}
+
+# --- HELPER: INVALIDATE SHARED READS AFTER A WRITE ---
+def _tables_written(*tables):
+    """Bumps the tables' cache versions and detaches in-flight reads that began before the write."""
+    result_cache.bump(*tables)
+    singleflight.forget()
+
+# --- HELPER: KEEP LOCAL READ MODELS IN STEP WITH WRITES ---
+def _after_marine_write(inserted=None, deleted_ids=None, deleted_rows=None, updated=None):
+    """
+    Called after every successful marine_data write made through this module.
+    inserted: the DB-keyed rows just inserted, as returned by the database (with ids).
+    deleted_rows: the deleted rows (Dashboard columns), as returned by the delete, so the
+    counters and duplicate index can be decremented.
+    updated: the ids and changed columns of the rows updated in place (Dashboard columns),
+    as returned by the update; they are patched into the replica's copies, whose old
+    values are taken out of the counters and duplicate index.
+    """
+    _tables_written("marine_data")
+    try:
+        # Imported here because both modules import this one
+        import replica
+        import counters
+        import validation
+        # A rebuild of the counters / duplicate index sees all of a write's effects or none
+        with replica.models_lock:
+            if inserted:
+                counters.apply_delta(pd.DataFrame({
+                    'id': [r.get('id') for r in inserted],
+                    'created_at': [r.get('created_at') for r in inserted],
+                    'Main_Location': [r.get('main_location') for r in inserted],
+                    'Date': [r.get('date') for r in inserted],
+                }))
+                validation.apply_delta(schema.from_db_frame(pd.DataFrame(inserted)))
+            if deleted_ids:
+                replica.apply_deletes(deleted_ids)
+                if deleted_rows is None:
+                    validation.invalidate()
+            if deleted_rows is not None:
+                counters.apply_delta(deleted_rows, sign=-1)
+                validation.apply_delta(deleted_rows, sign=-1)
+            if updated is not None and not updated.empty:
+                patched = replica.apply_patch(updated)
+                if patched is None:
+                    validation.invalidate()  # No replica yet; the first rebuild counts the new values
+                elif not patched[0].empty:
+                    previous, current = patched
+                    counters.apply_delta(previous, sign=-1)
+                    counters.apply_delta(current.drop(columns=['id']))  # Ids are under the watermark
+                    validation.apply_delta(previous, sign=-1)
+                    validation.apply_delta(current.drop(columns=['id']))
+        replica.mark_stale()
+    except Exception as e:
+        print(f"Local Read Model Error: {e}")
 
 # ==========================================
 # 🔐 AUTHENTICATION FUNCTIONS
 # ==========================================
 
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # Hashing runs on security's dedicated bcrypt pool at the configured cost
+    return security.hash_password(password)
 
 def check_password(password, hashed_password):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return security.check_password(password, hashed_password)
 
 def register_user(email, name, password, role="User"):
     try:
@@ -123,20 +147,33 @@ def register_user(email, name, password, role="User"):
         supabase.table("users").insert(user_data).execute()
         return True, "Registration successful!"
     except Exception as e:
+        metrics.error()
         return False, f"Error: {str(e)}"
 
+USER_LOGIN_COLUMNS = "id,email,name,role,password"
+
 def login_user(email, password):
+    """
+    Returns (user, message). user holds id, email, name and role (never the hash).
+    A hash made with an outdated cost factor is replaced after a successful check.
+    """
     try:
         if not supabase: return None, "DB Connection Failed"
-        response = supabase.table("users").select("*").eq("email", email).execute()
+        response = supabase.table("users").select(USER_LOGIN_COLUMNS).eq("email", email).limit(1).execute()
         if not response.data: return None, "User not found."
         
         user = response.data[0]
-        if check_password(password, user['password']):
-            return user, "Success"
-        else:
+        hashed = user.pop('password')
+        if not check_password(password, hashed):
             return None, "Incorrect password."
+        if security.needs_rehash(hashed):
+            try:
+                supabase.table("users").update({"password": hash_password(password)}).eq("id", user['id']).execute()
+            except Exception as e:
+                print(f"Password Rehash Error: {e}")
+        return user, "Success"
     except Exception as e:
+        metrics.error()
         return None, f"Login Error: {str(e)}"
 
 # ==========================================
@@ -148,72 +185,276 @@ def save_marine_data(data_dict):
         if supabase:
             # MAP KEYS TO LOWERCASE BEFORE SAVING
             clean_data = map_keys_to_db(data_dict)
-            supabase.table("marine_data").insert(clean_data).execute()
+            stored = supabase.table("marine_data").insert(clean_data).execute().data
+            _after_marine_write(inserted=stored or [clean_data])
             return True
         return False
     except Exception as e:
+        metrics.error()
         print(f"Save Error: {e}")
         return False
 
-def save_bulk_data(data_list):
+def save_bulk_data(data_list, upload_id=None, progress=None):
+    """
+    data_list: list of Dashboard-keyed dicts, or a DataFrame with Dashboard columns.
+    upload_id: makes the upload resumable (see bulk_insert.upload_id_for).
+    progress:  progress(done_rows, total_rows) callback for the dashboard progress bar.
+    """
     try:
         if supabase:
-            # MAP KEYS FOR ALL ROWS
-            clean_list = [map_keys_to_db(row) for row in data_list]
+            # MAP KEYS FOR ALL ROWS (one cast per column, rows zipped from the columns)
+            frame = data_list if isinstance(data_list, pd.DataFrame) else pd.DataFrame(data_list)
+            clean_list = schema.to_db_records(frame)
             
-            # CHUNKING: Insert in batches of 1000 to prevent timeouts
-            batch_size = 1000
-            for i in range(0, len(clean_list), batch_size):
-                batch = clean_list[i : i + batch_size]
-                supabase.table("marine_data").insert(batch).execute()
-            
-            return True, "Success"
+            # Concurrent batches with retries; committed ranges are checkpointed per upload
+            ok, msg, _ = bulk_insert.insert_records(
+                clean_list,
+                lambda batch: supabase.table("marine_data").insert(batch).execute().data,
+                upload_id=upload_id,
+                progress=progress,
+                on_batch=lambda batch: _after_marine_write(inserted=batch),
+            )
+            return ok, msg
         return False, "No Connection"
     except Exception as e:
+        metrics.error()
         return False, str(e)
 
-def fetch_all_data():
+# --- STREAMING READER ---
+# PostgREST caps every response at 1000 rows by default, so pages never ask for more.
+MAX_PAGE_SIZE = 1000
+
+def _select_clause(columns):
+    """Builds the select() string. 'id' is always included because pagination is keyed on it."""
+    if not columns or columns == "*":
+        return "*"
+    cols = list(columns)
+    if 'id' not in cols:
+        cols.insert(0, 'id')
+    return ",".join(cols)
+
+def _apply_filters(query, where):
+    """
+    Pushes row filters down to the server.
+    where: {'regions': [...], 'date_from': 'YYYY-MM-DD', 'date_to': 'YYYY-MM-DD'} (all optional).
+    """
+    if not where:
+        return query
+    regions = where.get('regions')
+    if regions:
+        regions = [regions] if isinstance(regions, str) else list(regions)
+        query = query.eq("main_location", regions[0]) if len(regions) == 1 else query.in_("main_location", regions)
+    if where.get('date_from'):
+        query = query.gte("date", str(where['date_from']))
+    if where.get('date_to'):
+        query = query.lte("date", str(where['date_to']))
+    return query
+
+def _keyset_pages(select_clause, page_size, after_id=None, before_id=None, where=None):
+    """
+    Yields raw row lists from marine_data in ascending id order.
+    Each page continues from the last id seen (keyset pagination), so deep pages
+    cost the same as the first one, unlike OFFSET based .range() calls.
+    """
+    last_id = after_id
+    while True:
+        query = _apply_filters(supabase.table("marine_data").select(select_clause), where)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        if before_id is not None:
+            query = query.lt("id", before_id)
+        rows = query.order("id").limit(page_size).execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+def _fetch_id_window(select_clause, page_size, lo, hi, where=None):
+    """Fetches every row with lo <= id < hi (used by the concurrent reader)."""
+    rows = []
+    for page in _keyset_pages(select_clause, page_size, after_id=lo - 1, before_id=hi, where=where):
+        rows.extend(page)
+    return rows
+
+def _max_marine_id():
+    res = supabase.table("marine_data").select("id").order("id", desc=True).limit(1).execute()
+    return res.data[0]['id'] if res.data else None
+
+def _to_chunk(rows):
+    # REVERSE MAPPING (Database lowercase -> Dashboard TitleCase) plus dtype casts
+    return schema.from_db_frame(pd.DataFrame(rows))
+
+def iter_marine_data(columns="*", page_size=MAX_PAGE_SIZE, workers=1, after_id=None, where=None):
+    """
+    Streams marine_data as DataFrame chunks (Dashboard TitleCase columns), in id order.
+
+    columns:  DB column names to fetch ('*' for all). 'id' is always returned.
+    workers:  >1 splits the id space into windows of page_size ids and fetches
+              that many windows concurrently. Chunks are still yielded in order.
+    after_id: only rows with a larger id are returned (incremental reads).
+    where:    server-side row filters, see _apply_filters.
+    Errors are raised to the caller.
+    """
+    if not supabase:
+        return
+    select_clause = _select_clause(columns)
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+    if workers <= 1:
+        for rows in _keyset_pages(select_clause, page_size, after_id=after_id, where=where):
+            yield _to_chunk(rows)
+        return
+
+    # CONCURRENT MODE: a window of page_size consecutive ids holds at most page_size rows
+    max_id = _max_marine_id()
+    if max_id is None:
+        return
+    start = (after_id + 1) if after_id is not None else 0
+    windows = ((lo, lo + page_size) for lo in range(start, max_id + 1, page_size))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for lo, hi in windows:
+            pending.append(pool.submit(_fetch_id_window, select_clause, page_size, lo, hi, where))
+            # Keep only a bounded number of windows in flight
+            if len(pending) >= workers:
+                rows = pending.popleft().result()
+                if rows:
+                    yield _to_chunk(rows)
+        while pending:
+            rows = pending.popleft().result()
+            if rows:
+                yield _to_chunk(rows)
+
+def fetch_marine_by_ids(record_ids, columns="*"):
+    """Fetches specific marine_data rows by id (in batches to keep URLs short)."""
+    if not supabase or not record_ids:
+        return pd.DataFrame()
+    select_clause = _select_clause(columns)
+    ids = [int(i) for i in record_ids]
+    rows = []
+    for i in range(0, len(ids), 500):
+        rows.extend(supabase.table("marine_data").select(select_clause).in_("id", ids[i : i + 500]).execute().data)
+    return _to_chunk(rows) if rows else pd.DataFrame()
+
+def fold_marine_data(func, initial, **kwargs):
+    """
+    Aggregates over marine_data without holding the whole table in memory.
+    func(acc, chunk_df) -> acc is called once per chunk. kwargs go to iter_marine_data.
+    """
+    acc = initial
+    for chunk in iter_marine_data(**kwargs):
+        acc = func(acc, chunk)
+    return acc
+
+@result_cache.cached("marine_data")
+@singleflight.coalesced
+def fetch_all_data(columns="*", workers=1):
     try:
         if supabase:
-            # Fetch up to 100,000 rows (default is 100)
-            response = supabase.table("marine_data").select("*").range(0, 99999).execute()
-            df = pd.DataFrame(response.data)
-            
-            if not df.empty:
-                # REVERSE MAPPING (Database lowercase -> Dashboard TitleCase)
-                # This ensures your Download button and Dashboard filters work correctly
-                reverse_mapping = {
-                    'main_location': 'Main_Location', 'location': 'Location', 
-                    'latitude': 'Latitude', 'longitude': 'Longitude',
-                    'water_temp': 'Water_Temp', 'salinity': 'Salinity', 'ph': 'pH', 
-                    'turbidity': 'Turbidity', 'transparency': 'Transparency', 
-                    'tss': 'TSS', 'tds': 'TDS', 'color': 'Color', 'odour': 'Odour',
-                    'do': 'DO', 'bod': 'BOD', 'cod': 'COD', 
-                    'nh4_n': 'NH4_N', 'no3_n': 'NO3_N', 'no2_n': 'NO2_N', 
-                    'po4': 'PO4', 'so4': 'SO4',
-                    'chlorophyll': 'Chlorophyll', 'bga': 'BGA', 
-                    'fecal_coliform': 'Fecal_Coliform', 'total_coliform': 'Total_Coliform', 
-                    'productivity': 'Productivity', 'phytoplankton': 'Phytoplankton', 
-                    'zooplankton': 'Zooplankton',
-                    'wind_speed': 'Wind_Speed', 'wind_direction': 'Wind_Direction', 
-                    'air_temp': 'Air_Temp', 'humidity': 'Humidity', 'precipitation': 'Precipitation',
-                    'shoreline_status': 'Shoreline_Status', 'population': 'Population', 
-                    'tourist_inflow': 'Tourist_Inflow', 'optimum_season': 'Optimum_Season',
-                    'coastal_villages': 'Coastal_Villages', 'panchayats': 'Panchayats', 
-                    'fishermen': 'Fishermen', 'landing_centers': 'Landing_Centers', 
-                    'fish_catch': 'Fish_Catch', 'water_bodies': 'Water_Bodies', 
-                    'industrial_est': 'Industrial_Est', 'tourism_status': 'Tourism_Status',
-                    'contributor': 'Contributor', 'email': 'Email', 
-                    'profession': 'Profession', 'designation': 'Designation',
-                    'date': 'Date', 'time': 'Time', 'created_at': 'created_at'
-                }
-                df.rename(columns=reverse_mapping, inplace=True)
-            return df
+            chunks = list(iter_marine_data(columns=columns, workers=workers))
+            if chunks:
+                return pd.concat(chunks, ignore_index=True)
         return pd.DataFrame()
     except Exception as e:
+        metrics.error()
         print(f"Fetch Error: {e}")
         return pd.DataFrame()
 
+def update_marine_data(values, regions=None, record_ids=None):
+    """
+    Set-based update: applies values (Dashboard keys) to every row of the given
+    regions and/or ids in one request per 500 ids. Returns (ok, rows_updated or error).
+    """
+    try:
+        if not supabase:
+            return False, "No Connection"
+        if not regions and not record_ids:
+            return False, "Refusing to update without a filter"
+        clean = map_keys_to_db(values)
+        ids = [int(i) for i in record_ids] if record_ids else [None]
+        # Only the ids and the changed columns come back, to patch the local read models
+        returned = ",".join(["id"] + [k for k in clean if k != "id"])
+        rows = []
+        for i in range(0, len(ids), 500):
+            query = _apply_filters(supabase.table("marine_data").update(clean).select(returned), {'regions': regions})
+            if record_ids:
+                query = query.in_("id", ids[i : i + 500])
+            rows.extend(query.execute().data or [])
+        _after_marine_write(updated=_to_chunk(rows) if rows else None)
+        return True, len(rows)
+    except Exception as e:
+        metrics.error()
+        print(f"Update Error: {e}")
+        return False, str(e)
+
+# --- QUERY API (projection + predicate pushdown) ---
+@result_cache.cached("marine_data")
+@singleflight.coalesced
+def query_marine_data(columns=None, regions=None, date_from=None, date_to=None,
+                      limit=None, offset=0, order=None, desc=False):
+    """
+    Fetches only the requested columns and rows of marine_data.
+
+    columns:   Dashboard column names (e.g. ['Date', 'Water_Temp']); None = all.
+    regions:   one Main_Location or a list of them.
+    date_from / date_to: inclusive bounds on the collection Date.
+    limit / offset / order / desc: server-side paging and sorting (order is a
+    Dashboard column name; missing values sort last). Without limit every matching
+    row is returned.
+    Returns a DataFrame with Dashboard column names, plus 'id'.
+    """
+    try:
+        if not supabase:
+            return pd.DataFrame()
+        db_columns = [schema.db_name(c) for c in columns] if columns else "*"
+        where = {'regions': regions, 'date_from': date_from, 'date_to': date_to}
+
+        # Unsorted full reads use the keyset reader (cheap deep pages)
+        if limit is None and not offset and order in (None, 'id'):
+            chunks = list(iter_marine_data(columns=db_columns, where=where))
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+            return df.iloc[::-1].reset_index(drop=True) if desc and not df.empty else df
+
+        select_clause = _select_clause(db_columns)
+        order_col = schema.db_name(order) if order else "id"
+        rows, start = [], int(offset)
+        while limit is None or len(rows) < limit:
+            page = MAX_PAGE_SIZE if limit is None else min(MAX_PAGE_SIZE, limit - len(rows))
+            query = _apply_filters(supabase.table("marine_data").select(select_clause), where)
+            query = query.order(order_col, desc=desc, nullsfirst=False)
+            if order_col != "id":
+                query = query.order("id", desc=desc)  # Stable tie-break between pages
+            data = query.range(start, start + page - 1).execute().data
+            rows.extend(data)
+            start += len(data)
+            if len(data) < page:
+                break
+        return _to_chunk(rows) if rows else pd.DataFrame()
+    except Exception as e:
+        metrics.error()
+        print(f"Query Error: {e}")
+        return pd.DataFrame()
+
+@result_cache.cached("marine_data")
+@singleflight.coalesced
+def count_marine_data(regions=None, date_from=None, date_to=None):
+    """Number of marine_data rows matching the filters (a head-only count request, no rows)."""
+    try:
+        if not supabase:
+            return 0
+        where = {'regions': regions, 'date_from': date_from, 'date_to': date_to}
+        query = _apply_filters(supabase.table("marine_data").select("id", count="exact", head=True), where)
+        return query.execute().count or 0
+    except Exception as e:
+        metrics.error()
+        print(f"Count Error: {e}")
+        return 0
+
+@result_cache.cached("marine_data")
+@singleflight.coalesced
 def get_contribution_count(email):
     try:
         if supabase:
@@ -222,6 +463,7 @@ def get_contribution_count(email):
             return response.count
         return 0
     except:
+        metrics.error()
         return 0
 
 # ==========================================
@@ -236,10 +478,14 @@ def submit_access_request(email, purpose):
             
         data = {"user_email": email, "purpose": purpose, "status": "Pending", "request_date": str(datetime.now())}
         supabase.table("access_requests").insert(data).execute()
+        _tables_written("access_requests")
         return True, "Request submitted."
     except Exception as e:
+        metrics.error()
         return False, str(e)
 
+@result_cache.cached("access_requests")
+@singleflight.coalesced
 def check_request_status(email):
     try:
         if not supabase: return "None"
@@ -247,8 +493,11 @@ def check_request_status(email):
         if res.data: return res.data[0]['status']
         return "None"
     except:
+        metrics.error()
         return "None"
 
+@result_cache.cached("access_requests")
+@singleflight.coalesced
 def fetch_pending_requests():
     try:
         if supabase:
@@ -256,60 +505,142 @@ def fetch_pending_requests():
             return pd.DataFrame(res.data)
         return pd.DataFrame()
     except:
+        metrics.error()
         return pd.DataFrame()
 
 def update_request_status(request_id, new_status):
     try:
         if supabase:
             supabase.table("access_requests").update({"status": new_status}).eq("id", request_id).execute()
+            _tables_written("access_requests")
             return True
         return False
     except:
+        metrics.error()
         return False
 
 def delete_data(record_ids):
     """Deletes records from marine_data based on ID list."""
     try:
         if supabase:
-            supabase.table("marine_data").delete().in_("id", record_ids).execute()
+            ids = [int(i) for i in record_ids]
+            rows = []
+            for i in range(0, len(ids), 500):  # Batches keep the request URLs short
+                # The deleted rows come back, so the counters and duplicate index can be decremented
+                rows.extend(supabase.table("marine_data").delete().in_("id", ids[i : i + 500]).execute().data or [])
+            _after_marine_write(deleted_ids=ids, deleted_rows=_to_chunk(rows) if rows else pd.DataFrame())
             return True
         return False
     except Exception as e:
+        metrics.error()
         print(f"Delete Error: {e}")
         return False
 
+def delete_marine_where(regions=None, date_from=None, date_to=None):
+    """
+    Set-based delete of every row of the given regions and/or collection-date range,
+    run on the server in one request. Returns (ok, rows_deleted or error).
+    """
+    try:
+        if not supabase:
+            return False, "No Connection"
+        if not regions and not date_from and not date_to:
+            return False, "Refusing to delete without a filter"
+        where = {'regions': regions, 'date_from': date_from, 'date_to': date_to}
+        rows = _apply_filters(supabase.table("marine_data").delete(), where).execute().data or []
+        removed = _to_chunk(rows) if rows else pd.DataFrame()
+        _after_marine_write(deleted_ids=removed['id'].tolist() if rows else [], deleted_rows=removed)
+        return True, len(rows)
+    except Exception as e:
+        metrics.error()
+        print(f"Delete Error: {e}")
+        return False, str(e)
+
 # ==========================================
 # 📰 RESEARCH PAPERS
 # ==========================================
 
+# Attachments live in the blob store (blobstore.py); rows only carry file_hash / file_size.
+# Supabase migration: alter table research_papers add column file_hash text, add column file_size bigint;
+# Older rows still hold base64 in file_data and are served by fetch_paper_file as before.
+PAPER_LIST_COLUMNS = "id,title,summary,author,role,file_name,file_hash,file_size,created_at"
+
 def save_paper(title, summary, author, role, file_obj):
     try:
+        if not supabase:
+            return False, "Database Error"
         if file_obj:
-            file_bytes = file_obj.read()
-            base64_file = base64.b64encode(file_bytes).decode('utf-8')
+            file_hash, file_size = blobstore.put(supabase, file_obj.read())
             file_name = file_obj.name
         else:
-            base64_file = None; file_name = None
+            file_hash = None; file_size = None; file_name = None
 
         data = {
             "title": title, "summary": summary, "author": author, "role": role, 
-            "file_name": file_name, "file_data": base64_file, "created_at": str(datetime.now())
+            "file_name": file_name, "file_hash": file_hash, "file_size": file_size,
+            "created_at": str(datetime.now())
         }
-        if supabase:
-            supabase.table("research_papers").insert(data).execute()
-            return True, "Published!"
-        return False, "Database Error"
+        supabase.table("research_papers").insert(data).execute()
+        _tables_written("research_papers")
+        return True, "Published!"
     except Exception as e:
+        metrics.error()
         return False, str(e)
 
-def fetch_papers():
+@result_cache.cached("research_papers")
+@singleflight.coalesced
+def fetch_papers(offset=0, limit=None):
+    """
+    Lists paper metadata only (no attachment bytes), Admin posts first, newest first.
+    offset / limit page through the feed.
+    """
     try:
         if supabase:
-            response = supabase.table("research_papers").select("*").order("created_at", desc=True).execute()
-            data = response.data
-            sorted_data = sorted(data, key=lambda x: 0 if x.get('role') == 'Admin' else 1)
-            return sorted_data
+            # 'Admin' sorts before 'User', so ordering by role puts official posts first
+            query = supabase.table("research_papers").select(PAPER_LIST_COLUMNS).order("role").order("created_at", desc=True)
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
+            return query.execute().data
         return []
     except Exception as e:
+        metrics.error()
         print(f"Error: {e}")
-        return []
\ No newline at end of file
+        return []
+
+@result_cache.cached("research_papers")
+@singleflight.coalesced
+def count_papers():
+    try:
+        if supabase:
+            return supabase.table("research_papers").select("id", count="exact", head=True).execute().count or 0
+        return 0
+    except Exception as e:
+        metrics.error()
+        print(f"Error: {e}")
+        return 0
+
+def fetch_paper_file(paper_id):
+    """Returns (file_name, bytes) for one paper's attachment, or (None, None)."""
+    try:
+        if not supabase:
+            return None, None
+        res = supabase.table("research_papers").select("file_name,file_hash").eq("id", paper_id).execute()
+        if not res.data or not res.data[0].get('file_name'):
+            return None, None
+        row = res.data[0]
+        if row.get('file_hash'):
+            return row['file_name'], blobstore.get(supabase, row['file_hash'])
+        # Legacy row: attachment stored inline as base64
+        legacy = supabase.table("research_papers").select("file_data").eq("id", paper_id).execute()
+        b64 = legacy.data[0].get('file_data') if legacy.data else None
+        return (row['file_name'], base64.b64decode(b64)) if b64 else (None, None)
+    except Exception as e:
+        metrics.error()
+        print(f"Attachment Error: {e}")
+        return None, None
+
+# ==========================================
+# ⏱️ INSTRUMENTATION
+# ==========================================
+# Every public function above records latency, rows, bytes and errors (metrics.py)
+metrics.instrument(globals(), "db")
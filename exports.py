@@ -0,0 +1,156 @@
+# exports.py
+"""
+Download Center exports, streamed from the database straight into a file.
+
+Rows are read in keyset pages (database.iter_marine_data), gathered into blocks of
+WRITE_ROWS and appended to a gzip CSV, Parquet or Excel file, so memory holds one
+block rather than the whole export. Finished files are kept under config.CACHE_DIR,
+named by (region, columns, format, marine_data version from result_cache), so a
+repeated download of the same region and categories is served from disk until the
+table is next written. The oldest files are evicted beyond config.EXPORT_CACHE_MAX_BYTES.
+"""
+import os
+import gzip
+import time
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import config
+import schema
+import result_cache
+import singleflight
+import database as db
+
+EXPORT_DIR = os.path.join(config.CACHE_DIR, "exports")
+
+WRITE_ROWS = 50_000          # Rows gathered before each write
+EXCEL_MAX_ROWS = 1_048_575   # Data rows per worksheet (Excel's limit, less the header)
+
+# label, file extension, mime type
+FORMATS = {
+    "csv": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# --- BLOCKS ---
+def _blocks(columns, region):
+    """DataFrame blocks of about WRITE_ROWS rows with exactly the requested columns."""
+    db_columns = [schema.db_name(c) for c in columns]
+    pending, size = [], 0
+    for chunk in db.iter_marine_data(columns=db_columns, where={'regions': [region]}):
+        pending.append(chunk.reindex(columns=columns))
+        size += len(chunk)
+        if size >= WRITE_ROWS:
+            yield pd.concat(pending, ignore_index=True)
+            pending, size = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+def _arrow_schema(columns):
+    """Fixed Parquet schema from schema.py, so every block is written with the same types."""
+    types = {"float": pa.float64(), "int": pa.int64()}
+    return pa.schema([
+        (schema.export_label(c), types.get(getattr(schema.BY_DISPLAY.get(c), "dtype", None), pa.string()))
+        for c in columns
+    ])
+
+def _text(block, columns):
+    """Non-numeric columns as str (None where missing), matching the Parquet string columns."""
+    for c in columns:
+        col = schema.BY_DISPLAY.get(c)
+        if col is None or col.dtype not in schema.NUMERIC_TYPES:
+            block[c] = block[c].astype(object).where(block[c].notna(), None).map(lambda v: v if v is None else str(v))
+    return block
+
+# --- WRITERS ---
+def _write_csv(path, columns, region):
+    with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6) as f:
+        header = True
+        for block in _blocks(columns, region):
+            block.rename(columns=schema.export_label).to_csv(f, index=False, header=header)
+            header = False
+        if header:
+            pd.DataFrame(columns=[schema.export_label(c) for c in columns]).to_csv(f, index=False)
+
+def _write_parquet(path, columns, region):
+    arrow_schema = _arrow_schema(columns)
+    with pq.ParquetWriter(path, arrow_schema, compression="zstd") as writer:
+        for block in _blocks(columns, region):
+            block = _text(block, columns).rename(columns=schema.export_label)
+            writer.write_table(pa.Table.from_pandas(block, schema=arrow_schema, preserve_index=False))
+
+def _write_excel(path, columns, region):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    header = [schema.export_label(c) for c in columns]
+    ws, rows_in_sheet = wb.create_sheet("Data"), 0
+    ws.append(header)
+    for block in _blocks(columns, region):
+        block = block.astype(object).where(block.notna(), None)
+        for row in block.itertuples(index=False, name=None):
+            if rows_in_sheet == EXCEL_MAX_ROWS:
+                ws, rows_in_sheet = wb.create_sheet(f"Data {len(wb.worksheets) + 1}"), 0
+                ws.append(header)
+            ws.append(row)
+            rows_in_sheet += 1
+    wb.save(path)
+
+_WRITERS = {"csv": _write_csv, "parquet": _write_parquet, "xlsx": _write_excel}
+
+# --- DISK CACHE ---
+def _path(region, columns, fmt):
+    version = result_cache.version("marine_data")
+    raw = repr((region, list(columns), fmt, version))
+    return os.path.join(EXPORT_DIR, f"{hashlib.sha256(raw.encode('utf-8')).hexdigest()}.{FORMATS[fmt][1]}")
+
+def _fresh(path):
+    try:
+        return time.time() - os.path.getmtime(path) < config.EXPORT_CACHE_MAX_AGE
+    except OSError:
+        return False
+
+def _evict(keep):
+    """Deletes the least recently used files beyond config.EXPORT_CACHE_MAX_BYTES."""
+    try:
+        files = [os.path.join(EXPORT_DIR, f) for f in os.listdir(EXPORT_DIR) if not f.endswith(".tmp")]
+        files = sorted(((os.stat(p).st_atime, os.path.getsize(p), p) for p in files), reverse=True)
+    except OSError:
+        return
+    used = 0
+    for _, size, path in files:
+        used += size
+        if used > config.EXPORT_CACHE_MAX_BYTES and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+@singleflight.coalesced
+def build(region, columns, fmt="csv"):
+    """
+    Path of the export file for one region's columns (Dashboard names) in fmt
+    ('csv', 'parquet' or 'xlsx'). Reuses the cached file when the table is unchanged.
+    """
+    path = _path(region, columns, fmt)
+    if _fresh(path):
+        os.utime(path, (time.time(), os.path.getmtime(path)))  # Recently used (atime); age stays mtime
+        return path
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        _WRITERS[fmt](tmp, list(columns), region)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _evict(keep=path)
+    return path
+
+def file_name(region, fmt):
+    return f"NCCR_{region}_Data.{FORMATS[fmt][1]}"
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
@@ -1,60 +1,92 @@
-
+import argparse
 import pandas as pd
 import database as db
-import config
-
-print("🚀 Starting Data Coordinate Correction...")
-
-# 1. Fetch All Data (Raw DB Column Names are lowercase)
-df = db.fetch_all_data()
-
-if df.empty:
-    print("❌ No data found to update.")
-    exit()
-
-print(f"📊 Found {len(df)} records.")
-
-# 2. Iterate and Update
-updated_count = 0
-
-for index, row in df.iterrows():
-    record_id = row['id']
-    
-    # "Main_Location" comes from fetch_all_data's renaming logic.
-    # It might be simple "Chennai Coast" or composite "Tamil Nadu - Chennai Coast" if logic varied.
-    # Let's try to match it against config.REGION_COORDS keys.
-    
-    current_loc = row.get('Main_Location')
-    
-    if not current_loc:
-        continue
-        
-    found_coords = None
-    
-    # Direct Match
-    if current_loc in config.REGION_COORDS:
-        found_coords = config.REGION_COORDS[current_loc]
-    else:
-        # Partial Match (e.g. "Tamil Nadu - Chennai Coast")
-        for key in config.REGION_COORDS.keys():
-            if key in current_loc:
-                found_coords = config.REGION_COORDS[key]
-                break
-    
-    if found_coords:
-        lat, lon = found_coords
-        
-        # Only update if the current values are the Default Chennai values (approx)
-        # 13.0827, 80.2707. Let's send updates regardless to be sure?
-        # Better to update all to be consistent with the map view request.
-        
-        try:
-            # Need to update using RAW DB column names (lowercase)
-            data = {"latitude": lat, "longitude": lon}
-            db.supabase.table("marine_data").update(data).eq("id", record_id).execute()
-            updated_count += 1
-            print(f"✅ Updated ID {record_id}: {current_loc} -> {lat}, {lon}")
-        except Exception as e:
-            print(f"❌ Failed to update ID {record_id}: {e}")
-
-print(f"🎉 Process Complete. Updated {updated_count} records.")
+import regions
+
+# Set-based coordinate correction:
+#   python fix_data_coords.py                 -> update every row, one request per region
+#   python fix_data_coords.py --changed-only  -> only rows whose coordinates differ
+#   python fix_data_coords.py --dry-run       -> print the diff, write nothing
+
+TOLERANCE = 1e-6 # Degrees; closer than this counts as already correct
+
+def build_plan(df):
+    """One row per distinct Main_Location: target coords, row count and rows needing a change."""
+    # Each distinct location is resolved once by the precompiled region matcher
+    matches = regions.resolve_series(df['Main_Location'])
+    has_coords = matches['latitude'].notna()
+    resolved = df[has_coords].copy()
+    resolved['target_lat'] = matches.loc[has_coords, 'latitude'].astype(float)
+    resolved['target_lon'] = matches.loc[has_coords, 'longitude'].astype(float)
+    lat = pd.to_numeric(resolved['Latitude'], errors='coerce')
+    lon = pd.to_numeric(resolved['Longitude'], errors='coerce')
+    resolved['changed'] = ~(((lat - resolved['target_lat']).abs() < TOLERANCE) & ((lon - resolved['target_lon']).abs() < TOLERANCE))
+
+    plan = resolved.groupby('Main_Location').agg(
+        target_lat=('target_lat', 'first'),
+        target_lon=('target_lon', 'first'),
+        rows=('id', 'size'),
+        changed=('changed', 'sum'),
+    ).reset_index()
+    unresolved = sorted(df.loc[~has_coords, 'Main_Location'].dropna().unique())
+    return plan, resolved, unresolved
+
+def main():
+    parser = argparse.ArgumentParser(description="Correct marine_data coordinates from config.REGION_COORDS.")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change without writing.")
+    parser.add_argument("--changed-only", action="store_true", help="Only update rows whose coordinates differ.")
+    args = parser.parse_args()
+
+    print("🚀 Starting Data Coordinate Correction...")
+
+    # 1. Fetch only the columns needed for the correction
+    df = db.fetch_all_data(columns=["main_location", "latitude", "longitude"])
+
+    if df.empty:
+        print("❌ No data found to update.")
+        return
+
+    print(f"📊 Found {len(df)} records.")
+
+    # 2. Resolve each distinct region once and diff against the current coordinates
+    plan, resolved, unresolved = build_plan(df)
+
+    print(f"🗺️ {len(plan)} regions resolved, {len(unresolved)} unresolved.")
+    if not plan.empty:
+        print(plan.to_string(index=False))
+    for loc in unresolved:
+        print(f"⚠️ No coordinates for: {loc}")
+
+    if args.dry_run:
+        print(f"🔎 Dry run: {int(plan['changed'].sum()) if not plan.empty else 0} records would change. Nothing written.")
+        return
+
+    # 3. One filtered update per region (or per 500 changed ids in --changed-only mode)
+    updated_count = 0
+    updated_regions = 0
+    failed_regions = []
+    for _, region in plan.iterrows():
+        loc = region['Main_Location']
+        if args.changed_only and region['changed'] == 0:
+            continue
+        data = {"Latitude": float(region['target_lat']), "Longitude": float(region['target_lon'])}
+        if args.changed_only:
+            ids = resolved.loc[(resolved['Main_Location'] == loc) & resolved['changed'], 'id'].tolist()
+            ok, result = db.update_marine_data(data, regions=[loc], record_ids=ids)
+        else:
+            ok, result = db.update_marine_data(data, regions=[loc])
+        if ok:
+            updated_count += result
+            updated_regions += 1
+            print(f"✅ {loc}: {result} records -> {data['Latitude']}, {data['Longitude']}")
+        else:
+            failed_regions.append(loc)
+            print(f"❌ Failed to update {loc}: {result}")
+
+    # 4. Summary Report
+    print(f"🎉 Process Complete. Updated {updated_count} records across {updated_regions} regions.")
+    if failed_regions:
+        print(f"❌ {len(failed_regions)} regions failed: {', '.join(failed_regions)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# grid.py
+"""
+Paginated, server-side sorted and filtered view of marine_data for the Master Data
+Repository.
+
+Each page is one database.query_marine_data call (limit/offset/order pushed down to
+the database), so only the visible rows are fetched and sent to the browser. After a
+page is served the next one is requested on a background thread: the result lands
+in the shared result cache, and a click on "Next" that arrives while it is still in
+flight joins the same request through singleflight. Totals come from a head-only
+count query on the same table, cached and coalesced like the pages, so a row that
+was just written is counted as soon as it can be paged to.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import config
+import database as db
+
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=config.GRID_PREFETCH_WORKERS, thread_name_prefix="grid-prefetch")
+
+def total_rows(regions=None, date_from=None, date_to=None):
+    """Row count for the filters, without reading any rows."""
+    return db.count_marine_data(regions=regions or None, date_from=date_from, date_to=date_to)
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+def _query(page, page_size, sort, desc, regions, date_from, date_to):
+    return db.query_marine_data(
+        regions=regions or None, date_from=date_from, date_to=date_to,
+        limit=page_size, offset=(page - 1) * page_size, order=sort, desc=desc,
+    )
+
+def _warm(*args):
+    try:
+        _query(*args)
+    except Exception as e:
+        print(f"Grid Prefetch Error: {e}")
+
+def fetch_page(page, page_size, sort=None, desc=False, regions=None, date_from=None, date_to=None, total=None):
+    """
+    Rows of one page (1-based), sorted by the Dashboard column sort. When total is
+    given and a next page exists, that page is prefetched in the background.
+    """
+    df = _query(page, page_size, sort, desc, regions, date_from, date_to)
+    if total is not None and page < page_count(total, page_size):
+        _PREFETCH_POOL.submit(_warm, page + 1, page_size, sort, desc, regions, date_from, date_to)
+    return df
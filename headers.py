@@ -0,0 +1,252 @@
+# headers.py
+"""
+Header-alias registry for bulk uploads.
+
+Maps the headers of an uploaded sheet to Dashboard parameters using
+config.HEADER_ALIASES plus each parameter's Dashboard name and export label.
+Headers are compared in normalized form (case, punctuation, units' symbols). A header
+that matches no alias outright is split into its name and its unit (the bracketed or
+trailing unit part): a name equal to an alias's name, or above
+config.HEADER_FUZZY_CUTOFF similar to one, is only considered when the unit agrees
+with the parameter's unit and no statistic (Max, Mean, ...) qualifies it. Exact-name
+matches are used directly; similar-name matches are suggestions that the uploader
+confirms one by one (confirm). A sheet's header set is resolved once into a
+ColumnPlan, cached by its header signature, so the cost is per file rather than per row.
+"""
+import re
+import hashlib
+import difflib
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+import config
+import schema
+
+TIMESTAMP = "Date and Time"
+
+# Filled from the upload form or derived, never taken from the sheet
+RESERVED = {"id", "created_at", "Date", "Time", "Main_Location", "Location", "Latitude", "Longitude",
+            "Contributor", "Email", "Profession", "Designation"}
+
+# One matched header: how it was matched and how confident the match is
+Match = namedtuple("Match", ["header", "target", "method", "score"])
+
+# A header whose name points at a parameter but whose unit or qualifier does not fit
+Rejected = namedtuple("Rejected", ["header", "target", "reason"])
+
+# columns: {target: [sheet headers in priority order]}; the first non-empty one wins per row
+# suggested: fuzzy matches not used until confirmed; rejected: see Rejected
+ColumnPlan = namedtuple("ColumnPlan", ["signature", "columns", "timestamp", "matches", "unmatched",
+                                       "suggested", "rejected"])
+
+# --- NORMALIZATION ---
+_SYMBOLS = {"°": " deg ", "µ": "u", "μ": "u", "%": " pct "}
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_BRACKETS = re.compile(r"[\(\[]([^\)\]]*)[\)\]]")
+
+# Statistics that change what a column measures ('Max Wind Speed' is not 'Wind Speed')
+QUALIFIERS = {"max", "maximum", "min", "minimum", "mean", "avg", "average", "median",
+              "std", "stdev", "sd", "peak", "cumulative"}
+
+# Units instruments use besides the ones in schema.py / the aliases, so they are
+# recognised as units (and rejected) rather than read as part of the name
+OTHER_UNITS = ["°F", "F", "K", "FNU", "NTU", "FTU", "ppt", "ppm", "ppb", "mg/m3", "ft", "in",
+               "mph", "knots", "kn", "km/h", "mS/cm", "uS/cm", "hPa", "mbar", "RFU"]
+
+def normalize(header):
+    """'WQ Temp (°C)' -> 'wq temp deg c'."""
+    text = str(header)
+    for symbol, word in _SYMBOLS.items():
+        text = text.replace(symbol, word)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+def _compact(norm):
+    return norm.replace(" ", "")
+
+def _unit_key(unit):
+    return _compact(normalize(unit)) if unit is not None else None
+
+def _known_units():
+    units = {c.unit for c in schema.COLUMNS if c.unit} | set(OTHER_UNITS)
+    for aliases in config.HEADER_ALIASES.values():
+        for alias in aliases:
+            units.update(_BRACKETS.findall(alias))
+    units.update(u for label in config.COLUMN_CONFIG.values() for u in _BRACKETS.findall(label))
+    return {_unit_key(u) for u in units} - {""}
+
+_UNITS = _known_units()
+
+def split(header):
+    """
+    (name, unit) of a header in normalized form: 'WQ Temp (°F)' -> ('wq temp', 'degf'),
+    'Sal psu' -> ('sal', 'psu'). unit is None when the header carries none.
+    """
+    text = str(header)
+    brackets = _BRACKETS.findall(text)
+    name = normalize(_BRACKETS.sub(" ", text))
+    if brackets:
+        return name, _unit_key(brackets[-1]) or None
+    # A trailing unit without brackets ('ODO mg/L'): up to three words from the end
+    words = name.split()
+    for n in (3, 2, 1):
+        if len(words) > n and "".join(words[-n:]) in _UNITS:
+            return " ".join(words[:-n]), "".join(words[-n:])
+    return name, None
+
+def _unit_text(header):
+    """The unit as written in the header, for messages."""
+    brackets = _BRACKETS.findall(str(header))
+    if brackets:
+        return brackets[-1].strip()
+    unit, words = split(header)[1], str(header).split()
+    for n in (1, 2, 3):
+        if _unit_key(" ".join(words[-n:])) == unit:
+            return " ".join(words[-n:])
+    return unit
+
+# --- REGISTRY ---
+def _aliases():
+    """(alias, target, priority) for every accepted spelling; earlier aliases of a target rank first."""
+    for target, aliases in config.HEADER_ALIASES.items():
+        for priority, alias in enumerate(aliases):
+            yield alias, target, priority
+    for col in schema.COLUMNS:
+        if col.display in RESERVED:
+            continue
+        base = len(config.HEADER_ALIASES.get(col.display, []))
+        yield col.display, col.display, base
+        yield schema.export_label(col.display), col.display, base + 1
+        yield col.db, col.display, base + 2
+
+def _build_registry():
+    """{normalized alias: (target, priority)} and {compact alias name: (target, priority)}."""
+    registry, names = {}, {}
+    for alias, target, priority in _aliases():
+        registry.setdefault(normalize(alias), (target, priority))
+        name = _compact(split(alias)[0])
+        if name:
+            names.setdefault(name, (target, priority))
+    return registry, names
+
+_REGISTRY, _NAMES = _build_registry()
+_COMPACT = {_compact(alias): alias for alias in _REGISTRY}
+
+def target_unit(target):
+    """Unit of a parameter in schema.py ('°C'), or ''."""
+    col = schema.BY_DISPLAY.get(target)
+    return col.unit if col is not None and col.unit else ""
+
+def _check(header, unit, target):
+    """
+    Reason a name match cannot be used because of its unit, or None. Only the schema
+    unit is accepted: other spellings of a unit are listed as aliases in config.
+    """
+    expected = target_unit(target)
+    if unit and expected and unit != _unit_key(expected):
+        return f"unit {_unit_text(header)} differs from {expected}"
+    return None
+
+def _match(header):
+    """Match, Rejected or None for one header."""
+    norm = normalize(header)
+    if norm in _REGISTRY:
+        target, _ = _REGISTRY[norm]
+        return Match(header, target, "exact", 1.0)
+    compact = _compact(norm)
+    if compact in _COMPACT:
+        target, _ = _REGISTRY[_COMPACT[compact]]
+        return Match(header, target, "normalized", 1.0)
+
+    name, unit = split(header)
+    words = name.split()
+    qualifiers = [w for w in words if w in QUALIFIERS]
+    key = _compact(" ".join(w for w in words if w not in QUALIFIERS))
+    if key in _NAMES:
+        target, score, method = _NAMES[key][0], 1.0, "name"
+    # Very short names ('pH', 'DO') are too ambiguous to guess
+    elif len(key) >= 4:
+        close = difflib.get_close_matches(key, _NAMES, n=1, cutoff=config.HEADER_FUZZY_CUTOFF)
+        if not close:
+            return None
+        target, _ = _NAMES[close[0]]
+        score, method = round(difflib.SequenceMatcher(None, key, close[0]).ratio(), 3), "fuzzy"
+    else:
+        return None
+
+    if qualifiers:
+        return Rejected(header, target, f"'{' '.join(qualifiers)}' is a different statistic")
+    reason = _check(header, unit, target)
+    if reason:
+        return Rejected(header, target, reason)
+    return Match(header, target, method, score)
+
+_RANK = {"exact": 0, "normalized": 0, "name": 1, "fuzzy": 2}
+
+def _priority(match):
+    """Sort key within one target: exact before name-only before fuzzy, then registry order."""
+    norm = normalize(match.header)
+    entry = _REGISTRY.get(norm) or _REGISTRY.get(_COMPACT.get(_compact(norm)), (None, 99))
+    return (_RANK[match.method], entry[1], -match.score)
+
+# --- COLUMN PLANS ---
+def signature(headers):
+    """Short stable id of a header set (order included)."""
+    return hashlib.sha1("\x00".join(map(str, headers)).encode("utf-8")).hexdigest()[:12]
+
+def _columns(matches):
+    columns = {}
+    for m in sorted(matches, key=_priority):
+        columns.setdefault(m.target, []).append(m.header)
+    timestamp = columns.pop(TIMESTAMP, [None])[0]
+    return columns, timestamp
+
+@lru_cache(maxsize=256)
+def _plan(headers):
+    matches, suggested, rejected, unmatched = [], [], [], []
+    for header in headers:
+        m = _match(header)
+        if m is None:
+            unmatched.append(header)
+        elif isinstance(m, Rejected):
+            rejected.append(m)
+        elif m.method == "fuzzy":
+            suggested.append(m)
+        else:
+            matches.append(m)
+    columns, timestamp = _columns(matches)
+    return ColumnPlan(signature(headers), columns, timestamp, matches, unmatched, suggested, rejected)
+
+def resolve(headers):
+    """ColumnPlan for a sheet's headers (cached per header signature). Fuzzy matches are only suggested."""
+    return _plan(tuple(str(h) for h in headers))
+
+def confirm(plan, headers):
+    """The plan with the suggested (fuzzy) matches of the given sheet headers put to use."""
+    accepted = set(headers)
+    chosen = [m for m in plan.suggested if m.header in accepted]
+    if not chosen:
+        return plan
+    matches = plan.matches + chosen
+    columns, timestamp = _columns(matches)
+    # A new signature, so anything keyed on the plan (the dashboard's confirmation) resets
+    return plan._replace(signature=f"{plan.signature}-{signature(sorted(m.header for m in chosen))}",
+                         columns=columns, timestamp=timestamp, matches=matches,
+                         suggested=[m for m in plan.suggested if m.header not in accepted])
+
+def target_label(target):
+    """How a parameter is shown to users (its export label)."""
+    return "Date & Time" if target == TIMESTAMP else schema.export_label(target)
+
+def plan_table(plan):
+    """Rows for showing a plan: one per sheet header."""
+    methods = {"name": "same name and unit"}
+    rows = [{"Sheet Header": m.header, "Maps To": target_label(m.target),
+             "Match": methods.get(m.method, m.method) if m.method != "fuzzy" else f"fuzzy ({m.score:.0%}), confirmed"}
+            for m in plan.matches]
+    rows.extend({"Sheet Header": m.header, "Maps To": "— ignored —",
+                 "Match": f"close to {target_label(m.target)} ({m.score:.0%}), not confirmed"} for m in plan.suggested)
+    rows.extend({"Sheet Header": r.header, "Maps To": "— ignored —",
+                 "Match": f"not {target_label(r.target)}: {r.reason}"} for r in plan.rejected)
+    rows.extend({"Sheet Header": h, "Maps To": "— ignored —", "Match": "none"} for h in plan.unmatched)
+    return rows
@@ -0,0 +1,283 @@
+# ingest.py
+"""
+Streaming, columnar ingestion of uploaded sheets (Contribute Data -> Bulk Upload).
+
+A CSV upload is parsed in fixed-size chunks (config.INGEST_CHUNK_ROWS). Each chunk is
+turned into a Dashboard-keyed DataFrame in one pass over whole columns: headers are
+resolved once per file into a column plan (headers.py), 'Date and Time' is parsed once
+per column, alias headers are coalesced, the batch fields are constant columns, and
+NaN / "None" become None. The chunk is checked by validation.py (ranges,
+coordinates, duplicates) and then goes to database.save_bulk_data
+while a background thread parses the next one, so memory stays bounded by a couple of
+chunks whatever the file size. Progress is reported in bytes consumed.
+"""
+import queue
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import config
+import bulk_insert
+import headers
+import validation
+import database as db
+
+# Fields shared by every row of one upload (from the form above the uploader)
+BATCH_FIELDS = ["Contributor", "Email", "Main_Location", "Location", "Latitude", "Longitude", "Profession", "Designation"]
+
+# --- DATE & TIME ---
+def _iso_parts(parsed):
+    """
+    Parsed timestamps -> (Date 'YYYY-MM-DD', Time 'HH:MM:SS[.ffffff]') as str(date) /
+    str(time) would give them, cut from numpy ISO strings (strftime is far slower).
+    """
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_localize(None)
+    stamps = parsed.to_numpy(dtype="datetime64[us]")
+    chars = np.datetime_as_string(stamps, unit="s").astype("U19").view("U1").reshape(-1, 19)
+    dates = chars[:, :10].copy().view("U10").ravel().astype(object)
+    times = chars[:, 11:19].copy().view("U8").ravel().astype(object)
+    micro = stamps.astype("int64") % 1_000_000
+    micro[np.isnat(stamps)] = 0
+    for i in np.flatnonzero(micro):
+        times[i] = f"{times[i]}.{micro[i]:06d}"
+    return pd.Series(dates, index=parsed.index), pd.Series(times, index=parsed.index)
+
+def split_timestamps(values, now=None):
+    """
+    'Date and Time' column -> (Date, Time) string Series.
+    Empty cells get today's date and the current time; unparseable ones get today at 00:00:00.
+    """
+    now = now or datetime.now()
+    missing = values.isna()
+    parsed = pd.to_datetime(values, errors="coerce")
+    # Cells that do not follow the column's inferred format are parsed one by one
+    retry = parsed.isna() & ~missing
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    failed = parsed.isna() & ~missing
+
+    dates, times = _iso_parts(parsed)
+    dates[missing | failed] = str(now.date())
+    times[missing] = str(now.time())
+    times[failed] = "00:00:00"
+    return dates, times
+
+# --- HEADERS ---
+def _coalesce(sheet, sources):
+    """First non-empty value across the alias columns present in the sheet."""
+    present = [h for h in sources if h in sheet.columns]
+    if not present:
+        return None
+    out = sheet[present[0]]
+    for header in present[1:]:
+        out = out.where(out.notna(), sheet[header])
+    return out
+
+def _clean(column):
+    """
+    NaN / NaT / "None" -> None for text columns. Numeric columns stay numeric with NaN,
+    which save_bulk_data turns into None when it builds the insert records.
+    """
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column
+    column = column.astype(object)
+    return column.where(column.notna() & (column != "None"), None)
+
+# --- TRANSFORM ---
+def transform_upload(sheet, batch, created_at=None, plan=None):
+    """
+    Uploaded sheet (raw headers) -> Dashboard-keyed DataFrame ready for save_bulk_data.
+    batch: dict with BATCH_FIELDS, applied to every row.
+    plan:  headers.ColumnPlan for the sheet; resolved (and cached) from its headers if None.
+    """
+    plan = plan or headers.resolve(sheet.columns)
+    n = len(sheet)
+    now = datetime.now()
+    index = pd.RangeIndex(n)
+    sheet = sheet.reset_index(drop=True)
+    out = {field: np.full(n, batch.get(field), dtype=object) for field in BATCH_FIELDS}
+
+    if plan.timestamp is not None and plan.timestamp in sheet.columns:
+        out["Date"], out["Time"] = split_timestamps(sheet[plan.timestamp], now)
+    else:
+        out["Date"] = np.full(n, str(now.date()), dtype=object)
+        out["Time"] = np.full(n, str(now.time()), dtype=object)
+
+    for field, sources in plan.columns.items():
+        column = _coalesce(sheet, sources)
+        if column is not None:
+            out[field] = _clean(column)
+
+    out["created_at"] = np.full(n, str(created_at or now), dtype=object)
+    frame = pd.DataFrame(out, index=index)
+    for field in BATCH_FIELDS:
+        frame[field] = _clean(frame[field])
+    return frame
+
+# --- READING ---
+class _CountingReader:
+    """File wrapper counting the bytes the CSV parser has consumed."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.raw)
+
+def _is_csv(name):
+    return name.lower().endswith(".csv")
+
+def file_size(file_obj):
+    position = file_obj.tell()
+    file_obj.seek(0, 2)
+    size = file_obj.tell()
+    file_obj.seek(position)
+    return size
+
+def preview_sheet(file_obj, name, rows=5):
+    """First rows of an upload (reads only those rows of a CSV) and rewinds the file."""
+    file_obj.seek(0)
+    head = pd.read_csv(file_obj, nrows=rows) if _is_csv(name) else pd.read_excel(file_obj, nrows=rows)
+    file_obj.seek(0)
+    return head
+
+def iter_sheet_chunks(file_obj, name, chunk_rows=None):
+    """
+    Yields (chunk, bytes_consumed, total_bytes) over an uploaded sheet.
+    CSV is parsed incrementally; Excel cannot be, so it is read once and sliced.
+    """
+    chunk_rows = chunk_rows or config.INGEST_CHUNK_ROWS
+    total = file_size(file_obj)
+    file_obj.seek(0)
+    if _is_csv(name):
+        reader = _CountingReader(file_obj)
+        with pd.read_csv(reader, chunksize=chunk_rows) as chunks:
+            for chunk in chunks:
+                yield chunk, min(reader.bytes_read, total), total
+    else:
+        sheet = pd.read_excel(file_obj)
+        for lo in range(0, len(sheet), chunk_rows):
+            hi = min(lo + chunk_rows, len(sheet))
+            yield sheet.iloc[lo:hi], total * hi // max(len(sheet), 1), total
+
+def read_sheet(file_obj, name, progress=None, chunk_rows=None):
+    """Whole upload as one DataFrame, parsed in chunks with progress(bytes_done, total_bytes)."""
+    parts = []
+    for chunk, consumed, total in iter_sheet_chunks(file_obj, name, chunk_rows):
+        parts.append(chunk)
+        if progress:
+            progress(consumed, total)
+    file_obj.seek(0)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+_DONE = object()
+
+def _prefetch(iterator, depth):
+    """Runs iterator on a background thread, keeping at most depth items ready."""
+    items = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item):
+        """Waits for room in the queue unless the consumer has stopped; False if it has."""
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (failed insert): let the parser thread exit, and wait
+        # for it so the source file is no longer being read when the caller reuses it
+        stop.set()
+        worker.join()
+
+# --- STREAMED UPLOAD ---
+def _covered(done, lo, hi):
+    return any(start <= lo and hi <= end for start, end in done)
+
+def stream_upload(file_obj, name, batch, upload_id=None, progress=None, chunk_rows=None, plan=None,
+                  report=None, duplicates="skip"):
+    """
+    Parses, transforms and saves an upload chunk by chunk; the next chunk is parsed
+    while the current one is inserted.
+
+    upload_id: makes the upload resumable. Finished chunks are checkpointed (row ranges,
+               keyed by file size) and skipped on a re-run; each chunk's own inserts are
+               resumable through save_bulk_data.
+    progress:  progress(bytes_done, total_bytes), called on the calling thread.
+    plan:      the confirmed headers.ColumnPlan; resolved from the first chunk if None.
+    report:    validation.QCReport filled in as chunks are validated (see validation.py).
+    duplicates: "skip" or "keep" rows already stored or repeated in the file.
+    Returns (ok, message, rows_saved).
+    """
+    chunk_rows = chunk_rows or config.INGEST_CHUNK_ROWS
+    report = report if report is not None else validation.QCReport()
+    total = file_size(file_obj)
+    done = bulk_insert.load_checkpoint(upload_id, total)
+    created_at = datetime.now()
+    saved = skipped = rows_seen = 0
+
+    file_obj.seek(0)
+    chunks = _prefetch(iter_sheet_chunks(file_obj, name, chunk_rows), config.INGEST_PREFETCH)
+    try:
+        for k, (chunk, consumed, total) in enumerate(chunks):
+            lo, hi = rows_seen, rows_seen + len(chunk)
+            rows_seen = hi
+            plan = plan or headers.resolve(chunk.columns)
+            if _covered(done, lo, hi):
+                skipped += len(chunk)
+            else:
+                frame = transform_upload(chunk, batch, created_at, plan)
+                frame = validation.validate(frame, report, first_row=lo + 1, duplicates=duplicates)
+                if frame.empty:
+                    ok, msg = True, "Nothing to save"
+                else:
+                    ok, msg = db.save_bulk_data(frame, upload_id=f"{upload_id}-{k}" if upload_id else None)
+                if not ok:
+                    msg = f"Stopped at rows {lo + 1}-{hi} after saving {saved}: {msg}"
+                    if upload_id and "Upload the same file again" not in msg:
+                        msg += " Upload the same file again to resume from here."
+                    return False, msg, saved
+                saved += len(frame)
+                done = bulk_insert.merge_ranges(done + [[lo, hi]])
+                bulk_insert.save_checkpoint(upload_id, total, done)
+            if progress:
+                progress(consumed, total)
+    finally:
+        # Stop the parser thread, then rewind so a retry (or preview) reads from the start
+        chunks.close()
+        file_obj.seek(0)
+
+    if upload_id:
+        bulk_insert.clear_checkpoint(upload_id)
+    if skipped:
+        return True, f"Resumed upload: {saved} remaining rows saved ({skipped} were already saved).", saved
+    return True, "Success", saved
@@ -0,0 +1,311 @@
+# local_engine.py
+"""
+Embedded SQLite storage backend, a drop-in for the Supabase client.
+
+database.py only talks to its backend through the Supabase query-builder subset below,
+so that subset *is* the storage interface:
+
+    client.table(name)
+        .select(columns="*", count=None, head=False)
+        .eq / .neq / .gt / .gte / .lt / .lte / .in_ / .is_ / .like / .ilike
+        .order(column, desc=False) / .limit(n) / .range(start, end)
+        .insert(rows) / .upsert(rows, on_conflict="id") / .update(values) / .delete()
+        (.select(columns) after .update / .delete picks the returned columns)
+        .execute()  -> response with .data (list of dicts) and .count
+
+LocalClient implements it for users, marine_data, access_requests and research_papers,
+with the same filter, ordering (NULLS LAST ascending) and range semantics as PostgREST,
+so the whole portal can run, be load-tested and profiled on one machine.
+Select it with [storage] backend = "local" in st.secrets or NCCR_STORAGE_BACKEND=local.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+import schema
+
+# --- TABLE DEFINITIONS ---
+_SQL_TYPES = {"int": "INTEGER", "float": "REAL"}
+
+TABLES = {
+    "users": {
+        "email": "TEXT UNIQUE", "name": "TEXT", "password": "TEXT", "role": "TEXT", "created_at": "TEXT",
+    },
+    "marine_data": {
+        c.db: _SQL_TYPES.get(c.dtype, "TEXT") for c in schema.COLUMNS if c.db != "id"
+    },
+    "access_requests": {
+        "user_email": "TEXT", "purpose": "TEXT", "status": "TEXT", "request_date": "TEXT", "created_at": "TEXT",
+    },
+    "research_papers": {
+        "title": "TEXT", "summary": "TEXT", "author": "TEXT", "role": "TEXT",
+        "file_name": "TEXT", "file_data": "TEXT", "file_hash": "TEXT", "file_size": "INTEGER", "created_at": "TEXT",
+    },
+}
+
+class LocalResponse:
+    """Mirrors postgrest's APIResponse (.data, .count)."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+def _py(value):
+    """numpy scalars -> Python scalars; dates -> ISO strings (sqlite3 binds neither)."""
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+_GLOB_WILDCARDS = {"%": "*", "_": "?"}
+
+def _like_to_glob(pattern):
+    """
+    LIKE pattern -> GLOB pattern. GLOB's own metacharacters are bracketed so they
+    match literally, and a backslash makes the next character literal (PostgreSQL's
+    default LIKE escape).
+    """
+    out, escaped = [], False
+    for ch in pattern:
+        if not escaped and ch == "\\":
+            escaped = True
+            continue
+        if not escaped and ch in _GLOB_WILDCARDS:
+            out.append(_GLOB_WILDCARDS[ch])
+        elif ch in "*?[":
+            out.append(f"[{ch}]")
+        else:
+            out.append(ch)
+        escaped = False
+    return "".join(out)
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# --- QUERY BUILDER ---
+class LocalQuery:
+    def __init__(self, client, table):
+        if table not in TABLES:
+            raise ValueError(f"relation \"{table}\" does not exist")
+        self._client = client
+        self._table = table
+        self._columns = ["id"] + list(TABLES[table])
+        self._op = "select"
+        self._select = "*"
+        self._count = None
+        self._head = False
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._payload = None
+        self._on_conflict = "id"
+        self._returning = "representation"
+
+    def _col(self, name):
+        name = name.strip()
+        if name not in self._columns:
+            raise ValueError(f"column {self._table}.{name} does not exist")
+        return _q(name)
+
+    def _filter(self, column, op, value):
+        self._where.append(f"{self._col(column)} {op} ?")
+        self._params.append(_py(value))
+        return self
+
+    # Projection / operations
+    def select(self, columns="*", count=None, head=False):
+        self._select = columns
+        if self._op in ("update", "delete"):
+            # Chained after a write: picks the returned columns, like PostgREST
+            self._returning = "representation"
+            return self
+        self._op = "select"
+        self._count = count
+        self._head = head
+        return self
+
+    def insert(self, rows, **_):
+        self._op = "insert"
+        self._payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict="id", **_):
+        self._op = "upsert"
+        self._payload = rows if isinstance(rows, list) else [rows]
+        self._on_conflict = on_conflict
+        return self
+
+    def update(self, values, count=None, returning="representation"):
+        self._op = "update"
+        self._payload = values
+        self._count = count
+        self._returning = str(getattr(returning, "value", returning))
+        return self
+
+    def delete(self, count=None, returning="representation"):
+        self._op = "delete"
+        self._count = count
+        self._returning = str(getattr(returning, "value", returning))
+        return self
+
+    # Filters
+    def eq(self, column, value): return self._filter(column, "=", value)
+    def neq(self, column, value): return self._filter(column, "!=", value)
+    def gt(self, column, value): return self._filter(column, ">", value)
+    def gte(self, column, value): return self._filter(column, ">=", value)
+    def lt(self, column, value): return self._filter(column, "<", value)
+    def lte(self, column, value): return self._filter(column, "<=", value)
+
+    def like(self, column, pattern):
+        # GLOB is case sensitive like PostgreSQL LIKE
+        return self._filter(column, "GLOB", _like_to_glob(pattern))
+
+    def ilike(self, column, pattern):
+        # A backslash makes the next character literal, as in PostgreSQL
+        self._where.append(f"{self._col(column)} LIKE ? ESCAPE '\\'")
+        self._params.append(pattern.replace("*", "%"))
+        return self
+
+    def in_(self, column, values):
+        values = [_py(v) for v in values]
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{self._col(column)} IN ({','.join('?' * len(values))})")
+        self._params.extend(values)
+        return self
+
+    def is_(self, column, value):
+        value = "NULL" if value in (None, "null") else ("1" if value in (True, "true") else "0")
+        self._where.append(f"{self._col(column)} IS {value}")
+        return self
+
+    # Ordering / ranges
+    def order(self, column, desc=False, nullsfirst=None):
+        col = self._col(column)
+        nulls_first = desc if nullsfirst is None else nullsfirst
+        self._order.append(f"{col} IS NULL {'DESC' if nulls_first else 'ASC'}, {col} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size):
+        self._limit = int(size)
+        return self
+
+    def range(self, start, end):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # Execution
+    def _where_sql(self):
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ""
+
+    def _projection(self):
+        if self._select in (None, "", "*"):
+            return "*"
+        return ", ".join(self._col(c) for c in self._select.split(","))
+
+    def execute(self):
+        with self._client._transaction(write=self._op != "select") as conn:
+            if self._op == "select":
+                return self._run_select(conn)
+            if self._op in ("insert", "upsert"):
+                return LocalResponse(self._run_insert(conn))
+            if self._op == "update":
+                values = {k: _py(v) for k, v in self._payload.items()}
+                sets = ", ".join(f"{self._col(k)} = ?" for k in values)
+                sql = f"UPDATE {_q(self._table)} SET {sets}{self._where_sql()} RETURNING {self._projection()}"
+                return self._written(_rows(conn.execute(sql, list(values.values()) + self._params)))
+            if self._op == "delete":
+                sql = f"DELETE FROM {_q(self._table)}{self._where_sql()} RETURNING {self._projection()}"
+                return self._written(_rows(conn.execute(sql, self._params)))
+        raise ValueError(f"Unsupported operation {self._op}")
+
+    def _written(self, rows):
+        """Response for update/delete, honouring count= and returning='minimal'."""
+        count = len(rows) if self._count else None
+        return LocalResponse([] if self._returning == "minimal" else rows, count)
+
+    def _run_select(self, conn):
+        where = self._where_sql()
+        count = None
+        if self._count:
+            count = conn.execute(f"SELECT COUNT(*) FROM {_q(self._table)}{where}", self._params).fetchone()[0]
+        if self._head:
+            return LocalResponse([], count)
+        sql = f"SELECT {self._projection()} FROM {_q(self._table)}{where}"
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None or self._offset:
+            sql += f" LIMIT {self._limit if self._limit is not None else -1} OFFSET {self._offset or 0}"
+        return LocalResponse(_rows(conn.execute(sql, self._params)), count)
+
+    def _run_insert(self, conn):
+        inserted = []
+        for row in self._payload:
+            row = {k: _py(v) for k, v in row.items()}
+            if "created_at" in self._columns and row.get("created_at") is None:
+                row["created_at"] = datetime.now().isoformat()
+            cols = ", ".join(self._col(k) for k in row)
+            sql = f"INSERT INTO {_q(self._table)} ({cols}) VALUES ({','.join('?' * len(row))})"
+            if self._op == "upsert":
+                updates = ", ".join(f"{_q(k)} = excluded.{_q(k)}" for k in row if k != self._on_conflict)
+                sql += f" ON CONFLICT({self._col(self._on_conflict)}) DO UPDATE SET {updates}" if updates else " ON CONFLICT DO NOTHING"
+            inserted.extend(_rows(conn.execute(sql + " RETURNING *", list(row.values()))))
+        return inserted
+
+def _rows(cursor):
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, r)) for r in cursor.fetchall()]
+
+# --- CLIENT ---
+class LocalClient:
+    """Supabase-compatible client backed by one SQLite file (one connection per thread)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._connection().execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as conn:
+            for table, columns in TABLES.items():
+                defs = ", ".join(f"{_q(c)} {t}" for c, t in columns.items())
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT, {defs})")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, write=True):
+        return _Transaction(self._connection(), write)
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    # supabase-py alias
+    def from_(self, name):
+        return self.table(name)
+
+class _Transaction:
+    """BEGIN ... COMMIT/ROLLBACK around one statement group (IMMEDIATE for writes)."""
+
+    def __init__(self, conn, write):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, *_):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,203 @@
+# metrics.py
+"""
+In-process metrics registry for database calls and dashboard pages.
+
+Every operation keeps call, error, row and byte counters plus a bounded window of
+recent latencies (config.METRICS_WINDOW) for p50/p95/p99. database.py instruments all
+of its public functions with instrument() and reports the errors it catches itself
+with error(); dashboard.py times each page render.
+snapshot() feeds the admin Performance page; to_prometheus() and to_json() export
+the same numbers. The registry lives in one process and resets on restart.
+"""
+import json
+import time
+import inspect
+import threading
+from collections import deque
+from functools import wraps
+import numpy as np
+import pandas as pd
+import config
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class _Op:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.window = deque(maxlen=config.METRICS_WINDOW)
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def observe(self, op, seconds, rows=None, nbytes=None, error=False):
+        with self._lock:
+            stats = self._ops.get(op)
+            if stats is None:
+                stats = self._ops[op] = _Op()
+            stats.calls += 1
+            stats.errors += bool(error)
+            stats.rows += rows or 0
+            stats.bytes += nbytes or 0
+            stats.seconds += seconds
+            stats.window.append(seconds)
+
+    def snapshot(self):
+        """One dict per operation, slowest p95 first."""
+        with self._lock:
+            items = [(op, s.calls, s.errors, s.rows, s.bytes, s.seconds, list(s.window)) for op, s in self._ops.items()]
+        out = []
+        for op, calls, errors, rows, nbytes, seconds, window in items:
+            p50, p95, p99 = np.quantile(window, QUANTILES) if window else (0.0, 0.0, 0.0)
+            out.append({
+                "op": op, "calls": calls, "errors": errors, "rows": rows, "bytes": nbytes,
+                "total_s": seconds, "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000,
+            })
+        return sorted(out, key=lambda r: r["p95_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+REGISTRY = Registry()
+
+def observe(op, seconds, rows=None, nbytes=None, error=False):
+    REGISTRY.observe(op, seconds, rows, nbytes, error)
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+def reset():
+    REGISTRY.reset()
+
+# --- RESULT SIZING ---
+def _measure(result):
+    """(rows, bytes) for a database result; None where it does not apply."""
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False).sum())
+    if isinstance(result, (bytes, bytearray)):
+        return None, len(result)
+    if isinstance(result, list):
+        return len(result), None
+    if isinstance(result, tuple):
+        # (ok, count) and (name, bytes) style returns
+        rows = nbytes = None
+        for item in result:
+            r, b = _measure(item)
+            rows = r if r is not None else rows
+            nbytes = b if b is not None else nbytes
+        return rows, nbytes
+    return None, None
+
+def _failed(result):
+    """Functions that report failure as (False, message) count as errors too."""
+    return isinstance(result, tuple) and len(result) >= 1 and result[0] is False
+
+# --- ERRORS CAUGHT INSIDE AN INSTRUMENTED CALL ---
+_calls = threading.local()
+
+def error():
+    """
+    Marks the instrumented call running on this thread as failed. For functions that
+    catch their own exceptions and return an empty result ([], 0, an empty DataFrame):
+    call it in the except block.
+    """
+    stack = getattr(_calls, "stack", None)
+    if stack:
+        stack[-1][0] = True
+
+# --- INSTRUMENTATION ---
+def timed(op):
+    """Decorator recording latency, rows, bytes and errors of each call under op."""
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                # The whole iteration is one call; rows/bytes are summed over yielded chunks
+                started, rows, nbytes, error = time.perf_counter(), 0, 0, False
+                try:
+                    for chunk in fn(*args, **kwargs):
+                        r, b = _measure(chunk)
+                        rows += r or 0
+                        nbytes += b or 0
+                        yield chunk
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    observe(op, time.perf_counter() - started, rows, nbytes, error)
+            return gen_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started, failed = time.perf_counter(), [False]
+            stack = _calls.__dict__.setdefault("stack", [])
+            stack.append(failed)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe(op, time.perf_counter() - started, error=True)
+                raise
+            finally:
+                stack.pop()
+            rows, nbytes = _measure(result)
+            observe(op, time.perf_counter() - started, rows, nbytes, failed[0] or _failed(result))
+            return result
+        return wrapper
+    return decorate
+
+def instrument(namespace, prefix):
+    """Wraps every public function defined in a module's namespace (pass globals())."""
+    module = namespace.get("__name__")
+    for name, fn in list(namespace.items()):
+        if name.startswith("_") or not inspect.isfunction(fn) or fn.__module__ != module:
+            continue
+        namespace[name] = timed(f"{prefix}.{name}")(fn)
+
+class PageTimer:
+    """
+    Times one page render, from when the page is chosen until stop(). Call stop() in a
+    finally block so renders cut short by st.rerun() / st.stop() are timed too.
+    """
+
+    def __init__(self, page):
+        self.op = f"page.{page}"
+        self.started = time.perf_counter()
+
+    def stop(self):
+        observe(self.op, time.perf_counter() - self.started)
+
+# --- EXPORT ---
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+def to_prometheus():
+    """Prometheus text exposition format."""
+    lines = [
+        "# HELP nccr_op_seconds Latency of portal operations.",
+        "# TYPE nccr_op_seconds summary",
+    ]
+    rows = snapshot()
+    for r in rows:
+        op = _label(r["op"])
+        for q, key in zip(QUANTILES, ("p50_ms", "p95_ms", "p99_ms")):
+            lines.append(f'nccr_op_seconds{{op="{op}",quantile="{q}"}} {r[key] / 1000:.6f}')
+        lines.append(f'nccr_op_seconds_sum{{op="{op}"}} {r["total_s"]:.6f}')
+        lines.append(f'nccr_op_seconds_count{{op="{op}"}} {r["calls"]}')
+    for metric, key, help_text in (
+        ("nccr_op_errors_total", "errors", "Failed operations."),
+        ("nccr_op_rows_total", "rows", "Rows returned by operations."),
+        ("nccr_op_bytes_total", "bytes", "Payload bytes returned by operations."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f'{metric}{{op="{_label(r["op"])}"}} {r[key]}' for r in rows)
+    return "\n".join(lines) + "\n"
+
+def to_json():
+    return json.dumps({"generated_at": time.time(), "operations": snapshot()}, indent=2)
@@ -0,0 +1,80 @@
+# payload.py
+"""
+Compact payloads for the map layers and charts sent to the browser.
+
+A layer's data is pruned to the fields its accessors and tooltip actually reference
+(plus any the page reads back from selections), numbers are downcast (float32,
+int32), and floats are written with float32's shortest decimal form, so the JSON
+spec carries about as many digits as the map can use. st.pydeck_chart transmits
+the deck as a JSON spec (pydeck's binary transport only exists in the Jupyter
+widget), while chart frames go to Streamlit's Arrow transport as they are.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+_TOOLTIP_FIELD = re.compile(r"\{(\w+)\}")
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+# --- FIELD DISCOVERY ---
+def referenced_fields(columns, accessors=(), tooltip=None):
+    """
+    Columns referenced by accessor expressions ('[lon, lat]', '6 + 4 * Math.log2(count)')
+    and by '{field}' placeholders in a tooltip (str, or pydeck dict with 'html' / 'text').
+    """
+    names = set()
+    for expr in accessors:
+        if isinstance(expr, str):
+            names.update(_IDENTIFIER.findall(expr))
+    if isinstance(tooltip, dict):
+        tooltip = " ".join(str(tooltip.get(k, "")) for k in ("html", "text"))
+    if tooltip:
+        names.update(_TOOLTIP_FIELD.findall(tooltip))
+    return [c for c in columns if c in names]
+
+# --- DOWNCASTING ---
+def compact_frame(frame, fields):
+    """frame restricted to fields, float64 -> float32 and int64 -> int32 where values fit."""
+    out = frame[list(fields)].copy()
+    for name in out.columns:
+        col = out[name]
+        if pd.api.types.is_float_dtype(col.dtype):
+            out[name] = col.astype("float32")
+        elif pd.api.types.is_integer_dtype(col.dtype) and not pd.api.types.is_extension_array_dtype(col.dtype):
+            info = np.iinfo("int32")
+            if col.empty or (col.min() >= info.min and col.max() <= info.max):
+                out[name] = col.astype("int32")
+    return out
+
+def chart_frame(frame, columns):
+    """Pruned, float32 frame for st.line_chart & co. (sent as Arrow)."""
+    return compact_frame(frame, [c for c in columns if c in frame.columns])
+
+# --- JSON RECORDS ---
+def _json_column(col):
+    """float32 -> shortest decimals that round-trip in float32 (e.g. 12.488811); NaN -> None."""
+    if col.dtype == np.float32:
+        values = col.to_numpy()
+        text = np.where(np.isnan(values), "nan", values.astype(str))
+        col = pd.Series(text.astype("float64"), index=col.index)
+    if pd.api.types.is_float_dtype(col.dtype) and col.isna().any():
+        col = col.astype(object).where(col.notna(), None)
+    return col
+
+def records(frame):
+    """Row records ready for json.dumps."""
+    if frame.empty:
+        return []
+    frame = frame.apply(_json_column)
+    return frame.to_dict(orient="records")
+
+def layer(layer_type, frame, tooltip=None, keep=(), **kwargs):
+    """
+    pydeck Layer over a compacted copy of frame. Accessor kwargs (get_*) and the tooltip
+    decide which columns are sent; keep adds columns read back from selection events.
+    """
+    import pydeck as pdk # Imported here like the map page, so other pages never load it
+    accessors = [v for k, v in kwargs.items() if k.startswith("get_")]
+    fields = referenced_fields(frame.columns, accessors, tooltip)
+    fields += [c for c in keep if c in frame.columns and c not in fields]
+    return pdk.Layer(layer_type, data=records(compact_frame(frame, fields)), **kwargs)
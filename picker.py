@@ -0,0 +1,76 @@
+# picker.py
+"""
+Record index behind the Manage & Delete console.
+
+The id, date and location columns of the replica are turned into an index once per
+table state (the marine_data version in result_cache plus the replica's own version,
+so in-place updates and deletes rebuild it too): ids sorted for binary search, 'ID 12 | 2024-01-05 | Region' labels and a
+lowercase search key, all built over whole columns. Searches, region and date
+filters are vectorized masks over the index, and pages of candidates are slices of
+the result, so the console never builds a widget option per row.
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import config
+import replica
+import result_cache
+
+INDEX_COLUMNS = ["id", "Date", "Main_Location"]
+
+class RecordIndex:
+    def __init__(self, df):
+        df = df.sort_values('id', kind="stable").reset_index(drop=True) if not df.empty else df
+        n = len(df)
+        self.ids = df['id'].to_numpy(dtype="int64") if n else np.zeros(0, dtype="int64")
+        self.dates = (df['Date'] if 'Date' in df else pd.Series([None] * n)).astype("string").fillna("")
+        self.regions = (df['Main_Location'] if 'Main_Location' in df else pd.Series([None] * n)).astype("string").fillna("")
+        self.labels = ("ID " + pd.Series(self.ids).astype(str) + " | " + self.dates.replace("", "N/A")
+                       + " | " + self.regions.replace("", "N/A"))
+        self._keys = self.labels.str.lower()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter(self, query="", region=None, date_from=None, date_to=None):
+        """Positions of the records matching every search word, the region and the date range."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if region:
+            mask &= (self.regions == region).to_numpy()
+        if date_from is not None:
+            mask &= (self.dates >= str(date_from)).to_numpy()
+        if date_to is not None:
+            mask &= ((self.dates <= str(date_to)) & (self.dates != "")).to_numpy()
+        for word in str(query or "").lower().split():
+            mask &= self._keys.str.contains(word, regex=False).to_numpy()
+        return np.flatnonzero(mask)
+
+    def page(self, positions, page, page_size):
+        """(ids, {id: label}) for one 1-based page of positions."""
+        chosen = positions[(page - 1) * page_size : page * page_size]
+        ids = self.ids[chosen].tolist()
+        return ids, dict(zip(ids, self.labels.iloc[chosen]))
+
+    def label(self, record_id):
+        pos = np.searchsorted(self.ids, record_id)
+        if pos < len(self.ids) and self.ids[pos] == record_id:
+            return self.labels.iloc[pos]
+        return f"ID {record_id}"
+
+# --- INDEX CACHE ---
+_INDEXES = OrderedDict()
+
+def load():
+    """The index for the replica's current rows (rebuilt only when they change)."""
+    if not replica.sync():
+        # Replica unusable: index the remote read, uncached
+        return RecordIndex(replica.read_marine_data(columns=INDEX_COLUMNS))
+    key = (result_cache.version("marine_data"), replica.version())
+    if key not in _INDEXES:
+        _INDEXES[key] = RecordIndex(replica.read_marine_data(columns=INDEX_COLUMNS, sync_first=False))
+        while len(_INDEXES) > 2:
+            _INDEXES.popitem(last=False)
+    return _INDEXES[key]
+
+def page_count(total, page_size=None):
+    return max(1, -(-total // (page_size or config.PICKER_PAGE_SIZE)))
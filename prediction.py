@@ -2,6 +2,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import ingest
+import payload
 
 # --- 1. DATA UPLOADING & PROCESSING ---
 def load_data():
@@ -12,10 +14,18 @@ def load_data():
     
     if uploaded_file is not None:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
+            # Parsed once per file (in chunks, with progress); reruns reuse the frame
+            cached = st.session_state.get('prediction_upload')
+            if cached and cached[0] == uploaded_file.file_id:
+                df = cached[1]
             else:
-                df = pd.read_excel(uploaded_file)
+                bar = st.progress(0.0, text="Reading file...")
+                df = ingest.read_sheet(
+                    uploaded_file, uploaded_file.name,
+                    progress=lambda done, total: bar.progress(min(done / total, 1.0), text=f"Reading {done / 1e6:.1f} / {total / 1e6:.1f} MB...") if total else None,
+                )
+                bar.empty()
+                st.session_state['prediction_upload'] = (uploaded_file.file_id, df)
             
             st.success("✅ File Uploaded Successfully!")
             st.write("### 📊 Dataset Preview")
@@ -78,7 +88,7 @@ def run_prediction_page():
                 m3.metric("Critical Zones", len(results[results['Status'] == 'Critical 🔴']))
                 
                 # Chart
-                st.line_chart(results['Predicted_Score'])
+                st.line_chart(payload.chart_frame(results, ['Predicted_Score']))
                 
                 # Data Table
                 st.dataframe(results[['Status', 'Predicted_Score']], use_container_width=True)
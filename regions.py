@@ -0,0 +1,125 @@
+# regions.py
+"""
+Region resolver for free-text Main_Location values.
+
+Maps strings such as "Tamil Nadu - Chennai Coast" or "kochi (ernakulam) coast" to a
+(state, region, coords) triple using config.COASTAL_DATA and config.REGION_COORDS.
+All state and region names are compiled once at import into an Aho-Corasick automaton
+over normalized text, so one scan finds every known name in a string in time linear
+in its length, whatever the number of regions. Whole Series are resolved once per
+distinct value.
+"""
+import re
+from collections import deque, namedtuple
+from functools import lru_cache
+import pandas as pd
+import config
+
+Resolution = namedtuple("Resolution", ["state", "region", "coords"])
+
+# --- NORMALIZATION ---
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+def normalize(text):
+    """Lowercase, punctuation -> single spaces, padded so matches fall on word boundaries."""
+    return f" {_NON_WORD.sub(' ', str(text).lower()).strip()} "
+
+# --- AHO-CORASICK AUTOMATON ---
+class _Automaton:
+    def __init__(self, patterns):
+        """patterns: {normalized pattern: payload}."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern, payload in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(pattern), payload))
+
+        # Breadth-first failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Yields (length, payload) for every pattern occurring in text."""
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            yield from self.out[node]
+
+def _build():
+    patterns = {}
+    region_state = {}
+    for state, coasts in config.COASTAL_DATA.items():
+        patterns[normalize(state)] = ("state", state)
+        for region in coasts:
+            if region != "Other":
+                region_state.setdefault(region, state)
+    for region in list(config.REGION_COORDS) + list(region_state):
+        patterns[normalize(region)] = ("region", region)
+    return _Automaton(patterns), region_state
+
+_AUTOMATON, _REGION_STATE = _build()
+
+# --- RESOLUTION ---
+@lru_cache(maxsize=4096)
+def resolve(location):
+    """
+    Returns Resolution(state, region, coords) for a location string.
+    The longest matching region wins; "Other" only applies when nothing more specific
+    matches. The state comes from an explicit state name, else from the region.
+    Unknown parts are None.
+    """
+    if location is None or (isinstance(location, float) and pd.isna(location)):
+        return Resolution(None, None, None)
+    states, found = [], []
+    for length, (kind, name) in _AUTOMATON.find(normalize(location)):
+        (states if kind == "state" else found).append((length, name))
+    specific = [m for m in found if m[1] != "Other"]
+    region = max(specific)[1] if specific else ("Other" if found else None)
+    state = max(states)[1] if states else _REGION_STATE.get(region)
+    return Resolution(state, region, config.REGION_COORDS.get(region))
+
+def resolve_series(series):
+    """
+    Resolves a whole Series at once (each distinct value once).
+    Returns a DataFrame aligned to series.index with state, region, latitude, longitude.
+    """
+    codes, uniques = pd.factorize(series)
+    table = [resolve(u) for u in uniques]
+    lookup = pd.DataFrame({
+        'state': [r.state for r in table] + [None],
+        'region': [r.region for r in table] + [None],
+        'latitude': [r.coords[0] if r.coords else None for r in table] + [None],
+        'longitude': [r.coords[1] if r.coords else None for r in table] + [None],
+    })
+    # factorize marks missing values as -1, which indexes the trailing all-None row
+    out = lookup.iloc[codes].reset_index(drop=True)
+    out.index = series.index
+    return out
+
+def locations_in_state(locations, state):
+    """Filters location strings down to those that resolve to the given state."""
+    return [loc for loc in locations if resolve(loc).state == state]
+
+def coords_for(location, default=None):
+    """(lat, lon) for a location string, or default."""
+    return resolve(location).coords or default
@@ -0,0 +1,319 @@
+# replica.py
+"""
+Local columnar replica of the marine_data table.
+
+Rows are stored as uncompressed Arrow IPC files under config.CACHE_DIR so they can be
+memory-mapped: a page render scans local files instead of downloading the table again.
+The replica syncs incrementally past an id high-water mark, deletes made through
+database.delete_data are recorded as tombstones until the next compaction, and rows
+updated in place through database.update_marine_data are patched into upsert parts
+whose copies supersede the older ones.
+"""
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import config
+import database as db
+
+REPLICA_DIR = os.path.join(config.CACHE_DIR, "replica", "marine_data")
+STATE_FILE = os.path.join(REPLICA_DIR, "state.json")
+
+ROWS_PER_PART = 200_000   # Rows buffered before a part file is written during sync
+MAX_PARTS = 32            # More parts than this triggers a compaction
+TOMBSTONE_RATIO = 0.1     # Compact when this fraction of local rows is deleted
+
+_lock = threading.RLock()
+_last_sync = 0.0
+
+# Held by the read models rebuilt from the replica (counters.py, validation.py) across
+# snapshot + swap, and by database.py while it applies a write's deltas, so that in this
+# process a delta lands wholly before or wholly after a rebuild.
+models_lock = threading.RLock()
+
+# --- STATE HELPERS ---
+def _empty_state():
+    return {"max_id": None, "max_created_at": None, "reconciled_at": 0, "deleted": [], "revision": 0}
+
+def _load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty_state()
+
+def _save_state(state):
+    os.makedirs(REPLICA_DIR, exist_ok=True)
+    tmp = f"{STATE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_FILE)
+
+def _revision(name):
+    """Upsert parts end in -r<revision>; synced parts are revision 0."""
+    stem = name[: -len(".arrow")]
+    tail = stem.rsplit("-", 1)[-1]
+    return int(tail[1:]) if tail.startswith("r") else 0
+
+def _part_files():
+    """Part files, oldest revision first (later copies of an id supersede earlier ones)."""
+    if not os.path.isdir(REPLICA_DIR):
+        return []
+    names = [
+        name for name in os.listdir(REPLICA_DIR)
+        if name.startswith("part-") and name.endswith(".arrow")
+    ]
+    return [os.path.join(REPLICA_DIR, name) for name in sorted(names, key=lambda n: (_revision(n), n))]
+
+def _write_part(table, revision=0):
+    """Writes one Arrow IPC part named after its id range and revision (atomic rename)."""
+    os.makedirs(REPLICA_DIR, exist_ok=True)
+    ids = table.column("id")
+    lo, hi = pc.min(ids).as_py(), pc.max(ids).as_py()
+    suffix = f"-r{revision:06d}" if revision else ""
+    path = os.path.join(REPLICA_DIR, f"part-{lo:012d}-{hi:012d}{suffix}.arrow")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+def _read_part(path, columns=None):
+    """Memory-maps a part file; only the requested columns are touched."""
+    # The table keeps the mapping alive; it is released when the table is dropped
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if columns:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table
+
+def _concat(tables):
+    tables = [t for t in tables if t.num_rows]
+    if not tables:
+        return None
+    return pa.concat_tables(tables, promote_options="permissive")
+
+def _to_table(chunks):
+    df = pd.concat(chunks, ignore_index=True)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+# --- SYNC ---
+def _pull_new_rows(state):
+    """Appends every remote row past the id watermark as new part files."""
+    buffer, buffered = [], 0
+    for chunk in db.iter_marine_data(after_id=state["max_id"]):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        state["max_id"] = int(chunk['id'].max())
+        if 'created_at' in chunk.columns:
+            latest = chunk['created_at'].dropna().astype(str).max()
+            if isinstance(latest, str) and (state["max_created_at"] or "") < latest:
+                state["max_created_at"] = latest
+        if buffered >= ROWS_PER_PART:
+            _write_part(_to_table(buffer))
+            buffer, buffered = [], 0
+    if buffer:
+        _write_part(_to_table(buffer))
+
+def _local_ids():
+    table = _concat([_read_part(p, ["id"]) for p in _part_files()])
+    if table is None:
+        return np.array([], dtype=np.int64)
+    return np.unique(table.column("id").to_numpy())
+
+def _reconcile(state):
+    """
+    Compares local and remote ids. Ids gone remotely become tombstones (deletes made
+    outside this process); ids below the watermark that are missing locally (late
+    commits) are fetched by id.
+    """
+    remote = [chunk['id'].to_numpy() for chunk in db.iter_marine_data(columns=["id"])]
+    remote_ids = np.unique(np.concatenate(remote)) if remote else np.array([], dtype=np.int64)
+    local_ids = np.setdiff1d(_local_ids(), np.array(state["deleted"], dtype=np.int64))
+
+    gone = np.setdiff1d(local_ids, remote_ids)
+    if len(gone):
+        state["deleted"] = sorted(set(state["deleted"]) | set(gone.tolist()))
+
+    missing = np.setdiff1d(remote_ids, local_ids)
+    if state["max_id"] is not None:
+        missing = missing[missing <= state["max_id"]]
+    if len(missing):
+        # Missing ids may have been tombstoned earlier; they exist again remotely
+        state["deleted"] = sorted(set(state["deleted"]) - set(missing.tolist()))
+        late = db.fetch_marine_by_ids(missing.tolist())
+        if not late.empty:
+            _write_part(pa.Table.from_pandas(late, preserve_index=False))
+    state["reconciled_at"] = time.time()
+
+def _needs_compaction(state):
+    parts = _part_files()
+    if len(parts) > MAX_PARTS:
+        return True
+    if not state["deleted"]:
+        return False
+    total = sum(_read_part(p, ["id"]).num_rows for p in parts)
+    return total and len(state["deleted"]) / total >= TOMBSTONE_RATIO
+
+def _compact(state):
+    """Rewrites all parts into one, dropping tombstoned and superseded rows."""
+    parts = _part_files()
+    table = _filter_table(_concat([_read_part(p) for p in parts]), state)
+    for p in parts:
+        os.remove(p)
+    if table is not None and table.num_rows:
+        _write_part(table)
+    state["deleted"] = []
+    state["revision"] = 0
+
+def sync(force=False, reconcile=False):
+    """
+    Brings the replica up to date. Calls within REPLICA_SYNC_INTERVAL of the last one
+    are skipped unless force=True. Returns True if the replica is usable.
+    """
+    global _last_sync
+    with _lock:
+        if not force and time.time() - _last_sync < config.REPLICA_SYNC_INTERVAL:
+            return True
+        try:
+            state = _load_state()
+            _pull_new_rows(state)
+            if reconcile or time.time() - state["reconciled_at"] >= config.REPLICA_RECONCILE_INTERVAL:
+                _reconcile(state)
+            if _needs_compaction(state):
+                _compact(state)
+            _save_state(state)
+            _last_sync = time.time()
+            return True
+        except Exception as e:
+            print(f"Replica Sync Error: {e}")
+            return False
+
+def mark_stale():
+    """Forces the next read to sync (called after inserts through database.py)."""
+    global _last_sync
+    _last_sync = 0.0
+
+def apply_deletes(record_ids):
+    """Records deleted ids as tombstones so reads hide them immediately."""
+    with _lock:
+        state = _load_state()
+        state["deleted"] = sorted(set(state["deleted"]) | {int(i) for i in record_ids})
+        _save_state(state)
+
+def _part_range(path):
+    """(lo, hi) id range of a part, from its name."""
+    _, lo, hi = os.path.basename(path)[: -len(".arrow")].split("-")[:3]
+    return int(lo), int(hi)
+
+def apply_patch(changes):
+    """
+    Applies columns changed in place (Dashboard columns, with id, e.g. as returned by
+    database.update_marine_data) to the replica's copies of those ids and writes the
+    patched rows as an upsert part, so reads see the new values without a re-download.
+    Only parts whose id range holds a changed id are read, and only the matching rows
+    are copied. Ids the replica does not hold yet arrive with the next sync.
+    Returns (previous rows, patched rows), or None if the replica has not been built yet.
+    """
+    if changes is None or changes.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    with _lock:
+        state = _load_state()
+        if state["max_id"] is None:
+            return None
+        changed = np.unique(changes['id'].astype("int64").to_numpy())
+        ids = pa.array(changed)
+        matches = []
+        for p in _part_files():
+            lo, hi = _part_range(p)
+            if changed[np.searchsorted(changed, lo):np.searchsorted(changed, hi, side="right")].size:
+                part = _read_part(p)
+                matches.append(part.filter(pc.is_in(part.column("id"), value_set=ids)))
+        old = _filter_table(_concat(matches), state)
+        if old is None or not old.num_rows:
+            return pd.DataFrame(), pd.DataFrame()
+        previous = old.to_pandas()
+        patched = previous.copy()
+        updates = changes.drop_duplicates("id", keep="last").set_index("id")
+        for col in updates.columns:
+            patched[col] = patched['id'].map(updates[col])
+        try:
+            new = pa.Table.from_pandas(patched, schema=old.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            new = pa.Table.from_pandas(patched, preserve_index=False)  # New values changed a column's type
+        state["revision"] = state.get("revision", 0) + 1
+        _write_part(new, revision=state["revision"])
+        _save_state(state)
+    return previous, patched
+
+def invalidate():
+    """Drops the local files; the next read pulls the whole table again."""
+    global _last_sync
+    with _lock:
+        for p in _part_files():
+            os.remove(p)
+        _save_state(_empty_state())
+        _last_sync = 0.0
+
+def rebuild():
+    """Drops the local files and pulls the whole table again."""
+    invalidate()
+    return sync(force=True)
+
+def version():
+    """Token that changes whenever the local files or tombstones change (keys caches built from reads)."""
+    with _lock:
+        state = _load_state()
+        parts = tuple(os.path.basename(p) for p in _part_files())
+        return parts, state["max_id"], hash(tuple(state["deleted"])), state.get("revision", 0)
+
+# --- READ ---
+def _filter_table(table, state):
+    if table is None:
+        return None
+    if state["deleted"]:
+        deleted = pa.array(state["deleted"], type=table.schema.field("id").type)
+        table = table.filter(pc.invert(pc.is_in(table.column("id"), value_set=deleted)))
+    # Upsert parts and two processes syncing at once leave several copies of an id;
+    # keep the one from the latest part
+    ids = table.column("id")
+    if pc.count_distinct(ids).as_py() != table.num_rows:
+        _, last = np.unique(ids.to_numpy()[::-1], return_index=True)
+        table = table.take(pa.array(np.sort(table.num_rows - 1 - last)))
+    return table
+
+def read_marine_data(columns=None, sync_first=True):
+    """
+    Returns marine_data (Dashboard TitleCase columns) from the local replica.
+    columns limits which columns are materialised. Falls back to a remote fetch
+    if the replica cannot be synced.
+    """
+    if sync_first and not sync():
+        df = db.fetch_all_data()
+        return df[[c for c in columns if c in df.columns]] if columns and not df.empty else df
+    with _lock:
+        state = _load_state()
+        wanted = None if not columns else ["id"] + [c for c in columns if c != "id"]
+        table = _filter_table(_concat([_read_part(p, wanted) for p in _part_files()]), state)
+    if table is None:
+        return pd.DataFrame()
+    df = table.to_pandas()
+    if columns and "id" not in columns:
+        df = df.drop(columns=["id"])
+    return df
+
+def snapshot(columns):
+    """
+    (DataFrame, max id) of the replica after an incremental sync, for rebuilding a read
+    model; every row with a smaller id committed before the sync is included.
+    Raises if the replica cannot be synced.
+    """
+    if not sync(force=True):
+        raise RuntimeError("Replica sync failed")
+    df = read_marine_data(columns=["id"] + [c for c in columns if c != "id"], sync_first=False)
+    max_id = int(df['id'].max()) if not df.empty else 0
+    return df, max_id
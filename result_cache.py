@@ -0,0 +1,145 @@
+# result_cache.py
+"""
+Disk-backed result cache for database reads, shared by all Streamlit worker processes.
+
+Each table has a version number in a small SQLite store under config.CACHE_DIR.
+A cached result is stored with the versions of the tables it was read from, and is
+only served while those versions are unchanged. database.py bumps a table's version
+after every write, so readers refetch exactly when the data changed and never serve a
+stale result after an upload, delete or approval. RESULT_CACHE_MAX_AGE bounds how
+long a result can miss writes made outside the portal.
+"""
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+import config
+
+RESULT_DB = os.path.join(config.CACHE_DIR, "results.db")
+
+@contextmanager
+def _connect():
+    """Opens the cache store; commits on success and always closes."""
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(RESULT_DB, timeout=30)
+    try:
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS versions (tbl TEXT PRIMARY KEY, version INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY, versions TEXT NOT NULL, payload BLOB NOT NULL,
+                    size INTEGER NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_used ON results (used_at);
+            """)
+            yield conn
+    finally:
+        conn.close()
+
+# --- TABLE VERSIONS ---
+def _versions(conn, tables):
+    rows = dict(conn.execute(
+        f"SELECT tbl, version FROM versions WHERE tbl IN ({','.join('?' * len(tables))})", tables
+    ).fetchall())
+    return ",".join(f"{t}:{rows.get(t, 0)}" for t in tables)
+
+def version(table):
+    """Current version of a table (0 until its first write)."""
+    with _connect() as conn:
+        row = conn.execute("SELECT version FROM versions WHERE tbl = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+def bump(*tables):
+    """Marks tables as written: every cached result read from them becomes stale."""
+    try:
+        with _connect() as conn:
+            conn.executemany(
+                "INSERT INTO versions (tbl, version) VALUES (?, 1) "
+                "ON CONFLICT(tbl) DO UPDATE SET version = version + 1",
+                [(t,) for t in tables],
+            )
+    except Exception as e:
+        print(f"Result Cache Bump Error: {e}")
+
+def clear():
+    with _connect() as conn:
+        conn.execute("DELETE FROM results")
+
+# --- ENTRIES ---
+def _cacheable(value):
+    """Empty results are not stored: database.py returns them on connection errors too."""
+    if value is None:
+        return False
+    if isinstance(value, (pd.DataFrame, list, dict)):
+        return len(value) > 0
+    return True
+
+def _lookup(key, tables):
+    """Returns (hit, value, versions) where versions is the tag for a fresh entry."""
+    with _connect() as conn:
+        current = _versions(conn, tables)
+        row = conn.execute("SELECT versions, payload, created_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None, current
+        if row[0] != current or time.time() - row[2] > config.RESULT_CACHE_MAX_AGE:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return False, None, current
+        conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (time.time(), key))
+    return True, pickle.loads(row[1]), current
+
+def _store(key, versions, value):
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(payload) > config.RESULT_CACHE_MAX_ENTRY:
+        return
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, versions, payload, size, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, versions, payload, len(payload), now, now),
+        )
+        # Evict least recently used entries beyond the size budget
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > config.RESULT_CACHE_MAX_BYTES:
+            freed = 0
+            for old_key, size in conn.execute("SELECT key, size FROM results ORDER BY used_at").fetchall():
+                if total - freed <= config.RESULT_CACHE_MAX_BYTES:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                freed += size
+
+def _key(fn, args, kwargs):
+    raw = repr((fn.__module__, fn.__qualname__, args, sorted(kwargs.items())))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def cached(*tables):
+    """
+    Decorator for a read that depends on the given tables.
+    The versions are read before the query runs, so a write that lands during the
+    query leaves the new entry already stale.
+    """
+    tables = tuple(sorted(tables))
+
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _key(fn, args, kwargs)
+            try:
+                hit, value, versions = _lookup(key, tables)
+            except Exception as e:
+                print(f"Result Cache Read Error: {e}")
+                return fn(*args, **kwargs)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            if _cacheable(value):
+                try:
+                    _store(key, versions, value)
+                except Exception as e:
+                    print(f"Result Cache Write Error: {e}")
+            return value
+        return wrapper
+    return decorate
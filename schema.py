@@ -0,0 +1,182 @@
+# schema.py
+"""
+Declarative schema of the marine_data table.
+
+Every column is declared once with its DB name (lowercase, as in Supabase), its
+Dashboard name (TitleCase, as used in pages and exports), dtype, unit and category.
+Both mapping directions and the dtype casts are derived from this list and applied
+to whole DataFrames at once, so bulk paths never loop over rows.
+"""
+from collections import namedtuple
+import datetime
+import pandas as pd
+import config
+
+Column = namedtuple("Column", ["db", "display", "dtype", "unit", "category"])
+
+# dtype: 'int' / 'float' are cast to numbers, 'text' / 'date' / 'time' / 'timestamp' stay ISO strings
+COLUMNS = [
+    # Meta Data
+    Column("id", "id", "int", None, "Meta"),
+    Column("created_at", "created_at", "timestamp", None, "Meta"),
+    Column("date", "Date", "date", None, "Meta"),
+    Column("time", "Time", "time", None, "Meta"),
+    Column("main_location", "Main_Location", "text", None, "Meta"),
+    Column("location", "Location", "text", None, "Meta"),
+    Column("latitude", "Latitude", "float", "°", "Meta"),
+    Column("longitude", "Longitude", "float", "°", "Meta"),
+
+    # Physical
+    Column("water_temp", "Water_Temp", "float", "°C", "Physical"),
+    Column("salinity", "Salinity", "float", "psu", "Physical"),
+    Column("ph", "pH", "float", None, "Physical"),
+    Column("turbidity", "Turbidity", "float", "NTU", "Physical"),
+    Column("transparency", "Transparency", "float", "cm", "Physical"),
+    Column("tss", "TSS", "float", "mg/L", "Physical"),
+    Column("tds", "TDS", "float", "g/L", "Physical"),
+    Column("color", "Color", "text", None, "Physical"),
+    Column("odour", "Odour", "text", None, "Physical"),
+    Column("depth", "Depth", "float", "m", "Physical"),
+
+    # Chemical
+    Column("do", "DO", "float", "mg/L", "Chemical"),
+    Column("bod", "BOD", "float", "mg/L", "Chemical"),
+    Column("cod", "COD", "float", "mg/L", "Chemical"),
+    Column("nh4_n", "NH4_N", "float", "µmol/L", "Chemical"),
+    Column("no3_n", "NO3_N", "float", "µmol/L", "Chemical"),
+    Column("no2_n", "NO2_N", "float", "µmol/L", "Chemical"),
+    Column("po4", "PO4", "float", "µmol/L", "Chemical"),
+    Column("so4", "SO4", "float", "mg/L", "Chemical"),
+
+    # Biological
+    Column("chlorophyll", "Chlorophyll", "float", "ug/l", "Biological"),
+    Column("bga", "BGA", "float", "mg/l", "Biological"),
+    Column("fecal_coliform", "Fecal_Coliform", "int", "MPN/100ml", "Biological"),
+    Column("total_coliform", "Total_Coliform", "int", "MPN/100ml", "Biological"),
+    Column("productivity", "Productivity", "float", "mgC/m3/hr", "Biological"),
+    Column("phytoplankton", "Phytoplankton", "text", None, "Biological"),
+    Column("zooplankton", "Zooplankton", "text", None, "Biological"),
+
+    # Meteorological & Geo
+    Column("wind_speed", "Wind_Speed", "float", "m/s", "Meteorological & Geo"),
+    Column("wind_direction", "Wind_Direction", "float", "Deg", "Meteorological & Geo"),
+    Column("air_temp", "Air_Temp", "float", "°C", "Meteorological & Geo"),
+    Column("humidity", "Humidity", "float", "%", "Meteorological & Geo"),
+    Column("precipitation", "Precipitation", "float", "mm", "Meteorological & Geo"),
+    Column("shoreline_status", "Shoreline_Status", "text", None, "Meteorological & Geo"),
+    Column("population", "Population", "int", None, "Meteorological & Geo"),
+
+    # Socio-Economic
+    Column("tourist_inflow", "Tourist_Inflow", "int", None, "Socio-Economic"),
+    Column("optimum_season", "Optimum_Season", "text", None, "Socio-Economic"),
+    Column("coastal_villages", "Coastal_Villages", "int", None, "Socio-Economic"),
+    Column("panchayats", "Panchayats", "int", None, "Socio-Economic"),
+    Column("fishermen", "Fishermen", "int", None, "Socio-Economic"),
+    Column("landing_centers", "Landing_Centers", "int", None, "Socio-Economic"),
+    Column("fish_catch", "Fish_Catch", "text", None, "Socio-Economic"),
+    Column("water_bodies", "Water_Bodies", "int", None, "Socio-Economic"),
+    Column("industrial_est", "Industrial_Est", "int", None, "Socio-Economic"),
+    Column("tourism_status", "Tourism_Status", "text", None, "Socio-Economic"),
+
+    # Contributors
+    Column("contributor", "Contributor", "text", None, "Contributor"),
+    Column("email", "Email", "text", None, "Contributor"),
+    Column("profession", "Profession", "text", None, "Contributor"),
+    Column("designation", "Designation", "text", None, "Contributor"),
+]
+
+# --- DERIVED LOOKUPS (built once at import) ---
+TO_DB = {c.display: c.db for c in COLUMNS}
+FROM_DB = {c.db: c.display for c in COLUMNS}
+BY_DB = {c.db: c for c in COLUMNS}
+BY_DISPLAY = {c.display: c for c in COLUMNS}
+NUMERIC_TYPES = ("int", "float")
+
+def db_name(display_name):
+    """Dashboard name -> DB column. Unknown names are lowercased, like the old per-row fallback."""
+    return TO_DB.get(display_name, display_name.lower())
+
+def display_name(db_column):
+    return FROM_DB.get(db_column, db_column)
+
+def export_label(display):
+    """Header used in CSV exports (config.COLUMN_CONFIG), e.g. 'Water Temperature (°C)'."""
+    return config.COLUMN_CONFIG.get(display, display)
+
+def columns_in(category):
+    """Dashboard names of all columns in a category, in declaration order."""
+    return [c.display for c in COLUMNS if c.category == category]
+
+# --- VECTORIZED CASTS ---
+def _cast_numeric(series, dtype):
+    values = pd.to_numeric(series, errors="coerce")
+    if dtype == "int":
+        present = values.dropna()
+        if (present % 1 == 0).all():
+            return values.astype("Int64")
+    return values.astype("float64")
+
+def _cast_frame(df, lookup):
+    """Casts every known numeric column of df in place. lookup maps df column -> Column."""
+    for name in df.columns:
+        col = lookup.get(name)
+        if col is None or col.dtype not in NUMERIC_TYPES:
+            continue
+        # Columns that are already the right kind of number are left untouched
+        if pd.api.types.is_integer_dtype(df[name].dtype) or (col.dtype == "float" and pd.api.types.is_float_dtype(df[name].dtype)):
+            continue
+        df[name] = _cast_numeric(df[name], col.dtype)
+    return df
+
+# --- FRAME LEVEL MAPPING ---
+def from_db_frame(df):
+    """DB rows -> Dashboard frame: one rename plus one cast per numeric column."""
+    df = df.rename(columns=FROM_DB)
+    return _cast_frame(df, BY_DISPLAY)
+
+def to_db_frame(df):
+    """Dashboard frame -> DB frame. Unknown columns are lowercased."""
+    df = df.rename(columns={name: db_name(name) for name in df.columns})
+    return _cast_frame(df, BY_DB)
+
+# strftime formats for parsed datetime columns, per schema dtype (the rest use full ISO)
+ISO_FORMATS = {"date": "%Y-%m-%d", "time": "%H:%M:%S"}
+_TEMPORAL = (datetime.date, datetime.time)  # datetime and pd.Timestamp are date subclasses
+
+def _iso_series(series, col):
+    """Datetime-like column -> ISO strings (NaT stays missing)."""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        fmt = ISO_FORMATS.get(col.dtype) if col is not None else None
+        return series.dt.strftime(fmt) if fmt else series.map(lambda v: v.isoformat(), na_action="ignore")
+    if pd.api.types.is_timedelta64_dtype(series.dtype):  # time of day parsed as an offset from midnight
+        return (pd.Timestamp(0) + series).dt.strftime(ISO_FORMATS["time"])
+    if series.dtype == object and series.map(lambda v: isinstance(v, _TEMPORAL)).any():
+        return series.map(lambda v: v.isoformat() if isinstance(v, _TEMPORAL) else v)
+    return series
+
+def _json_values(series, col):
+    """One column -> array of JSON-safe Python values (numbers cast per schema, dates as ISO strings, None where missing)."""
+    if col is not None and col.dtype in NUMERIC_TYPES:
+        series = _cast_numeric(series, col.dtype)
+        if col.dtype == "int" and series.dtype == "Int64":
+            return series.to_numpy(dtype=object, na_value=None)
+    else:
+        series = _iso_series(series, col)
+    missing = series.isna().to_numpy()
+    values = series.to_numpy(dtype=object)
+    if missing.any():
+        values = values.copy()  # Object columns come back as read-only views of the frame
+        values[missing] = None
+    return values
+
+def to_db_records(df):
+    """
+    Dashboard (or DB) frame -> list of JSON-safe dicts for insert(), DB-keyed and cast;
+    parsed dates/times become ISO strings and NaN/NaT/NA become None. Each column is cast and converted once as an array and
+    the rows are zipped from those arrays, without building a cast copy of the frame.
+    """
+    if df.empty:
+        return []
+    keys = [db_name(name) for name in df.columns]
+    columns = [_json_values(df.iloc[:, i], BY_DB.get(key)) for i, key in enumerate(keys)]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
@@ -0,0 +1,144 @@
+# security.py
+"""
+Password hashing and signed session tokens for the login flow.
+
+bcrypt runs on a small dedicated thread pool (config.AUTH_HASH_WORKERS), so a burst of
+logins queues there instead of tying up the server's script threads; bcrypt releases
+the GIL while hashing. The cost factor is config.BCRYPT_ROUNDS, or is calibrated once
+per process to about config.BCRYPT_TARGET_SECONDS per hash, never below
+config.BCRYPT_MIN_ROUNDS. Hashes made with a lower cost are upgraded on the next
+successful login (needs_rehash); stronger ones are left alone.
+
+After login the browser keeps an opaque random session token in a cookie. The server
+stores only its hash, the user's email and the expiry (sessions.db under
+config.CACHE_DIR), so a session can be revoked, and the user's name and role are
+read again from the users table when it is restored.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import secrets
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import bcrypt
+import config
+
+SESSION_DB = os.path.join(config.CACHE_DIR, "sessions.db")
+
+_HASH_POOL = ThreadPoolExecutor(max_workers=config.AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# --- COST POLICY ---
+@lru_cache(maxsize=1)
+def target_rounds():
+    """bcrypt cost factor for new hashes: configured, or measured on this machine."""
+    if config.BCRYPT_ROUNDS:
+        return max(int(config.BCRYPT_ROUNDS), config.BCRYPT_MIN_ROUNDS)
+    # Each extra round doubles the work, so one timed hash predicts the rest
+    probe = config.BCRYPT_MIN_ROUNDS
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(probe))
+    elapsed = max(time.perf_counter() - started, 1e-4)
+    rounds = probe
+    while rounds < config.BCRYPT_MAX_ROUNDS and elapsed * 2 <= config.BCRYPT_TARGET_SECONDS:
+        rounds += 1
+        elapsed *= 2
+    return rounds
+
+def hash_rounds(hashed):
+    """Cost factor stored in a bcrypt hash ("$2b$12$..." -> 12), or None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed):
+    """True when the hash is weaker than the current policy (never downgrades)."""
+    return (hash_rounds(hashed) or 0) < target_rounds()
+
+# --- HASHING (DEDICATED POOL) ---
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        return False  # Malformed stored hash
+
+def hash_password(password):
+    return _HASH_POOL.submit(_hash, password, target_rounds()).result()
+
+def check_password(password, hashed_password):
+    return _HASH_POOL.submit(_check, password, hashed_password).result()
+
+# --- SESSIONS (SERVER-SIDE) ---
+SESSION_COLUMNS = {"name": "TEXT", "role": "TEXT"}  # Added after the first release of the store
+
+@contextmanager
+def _sessions():
+    """Opens the session store; commits on success and always closes."""
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(SESSION_DB, timeout=30)
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (token_hash TEXT PRIMARY KEY, email TEXT NOT NULL,
+                                                     name TEXT, role TEXT, expires_at REAL NOT NULL)
+            """)
+            present = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            for column, kind in SESSION_COLUMNS.items():
+                if column not in present:
+                    conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {kind}")
+            yield conn
+    finally:
+        conn.close()
+
+def _token_hash(token):
+    # Only the hash is stored, so a copy of the store cannot be replayed as cookies
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def issue_token(user, ttl=None):
+    """
+    Opens a session for a user dict (email, name, role) and returns its opaque token
+    (random, carries no user data). The name and role are kept with the session so a
+    returning browser is restored without a users-table lookup.
+    """
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    with _sessions() as conn:
+        conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        conn.execute(
+            "INSERT INTO sessions (token_hash, email, name, role, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (_token_hash(token), user['email'], user.get('name'), user['role'], now + (ttl or config.SESSION_TTL)),
+        )
+    return token
+
+def verify_token(token):
+    """Returns the user (email, name, role) of a live (unexpired, unrevoked) session token, else None."""
+    if not token:
+        return None
+    try:
+        with _sessions() as conn:
+            row = conn.execute(
+                "SELECT email, name, role FROM sessions WHERE token_hash = ? AND expires_at >= ?",
+                (_token_hash(token), time.time()),
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Session Store Error: {e}")
+        return None
+    # Sessions opened before roles were stored cannot be restored; they log in again
+    if not row or row[2] is None:
+        return None
+    return {"email": row[0], "name": row[1], "role": row[2]}
+
+def revoke_token(token):
+    """Ends one session (logout)."""
+    if not token:
+        return
+    try:
+        with _sessions() as conn:
+            conn.execute("DELETE FROM sessions WHERE token_hash = ?", (_token_hash(token),))
+    except sqlite3.Error as e:
+        print(f"Session Store Error: {e}")
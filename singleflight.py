@@ -0,0 +1,100 @@
+# singleflight.py
+"""
+Request coalescing for database reads shared by many sessions.
+
+When several sessions ask for the same thing at the same moment (the same function
+with the same arguments), only the first caller, the leader, runs the query. The
+others wait for the leader's result instead of sending their own. Each follower gets
+its own copy of the result, so one session mutating a DataFrame cannot affect another.
+Errors are re-raised in every waiting caller. Nothing is cached: once the call
+finishes the next caller starts a new one.
+"""
+import copy
+import threading
+from functools import wraps
+import pandas as pd
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class Group:
+    """Collapses concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once per key at a time. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                # Remove before waking followers so later callers start a fresh call
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+            if call.error is not None:
+                raise call.error
+            return call.result, call.followers > 0
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return _copy(call.result), True
+
+    def forget(self):
+        """Detaches every in-flight call: callers arriving after a write start fresh ones."""
+        with self._lock:
+            self._calls.clear()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+def _copy(value):
+    """Private copy for a follower (DataFrames copied by pandas, others deep-copied)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return copy.deepcopy(value)
+
+_DEFAULT = Group()
+
+def _key(fn, args, kwargs):
+    try:
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        hash(key)
+        return key
+    except TypeError:
+        # Unhashable arguments (lists of columns / regions): fall back to their repr
+        return (fn.__module__, fn.__qualname__, repr(args), repr(sorted(kwargs.items())))
+
+def forget():
+    """Called after writes, so no later reader joins a call that started before the write."""
+    _DEFAULT.forget()
+
+def coalesced(fn):
+    """Decorator: concurrent calls with equal arguments share one execution."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        result, _ = _DEFAULT.do(_key(fn, args, kwargs), fn, *args, **kwargs)
+        return result
+    return wrapper
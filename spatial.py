@@ -0,0 +1,167 @@
+# spatial.py
+"""
+Grid aggregation for the Global Data Map.
+
+Readings are binned into square lat/lon cells whose size follows the zoom level, so
+a cell covers about config.MAP_CELL_PIXELS on screen at any zoom. Each cell carries
+its reading count, latest timestamp, mean water temperature and salinity, and most
+frequent location; the browser gets one row per cell instead of one per reading.
+Individual readings are only sent once a drilled-into area holds at most
+config.MAP_POINT_LIMIT of them. The points and views are memoised per table state
+(the marine_data version in result_cache plus the replica's own version, as in
+picker.py), so any insert, update or delete recomputes them.
+"""
+import math
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import config
+import replica
+import result_cache
+
+# Columns the map needs from marine_data (Dashboard names)
+MAP_COLUMNS = ["Latitude", "Longitude", "Main_Location", "created_at", "Date", "Time",
+               "Water_Temp", "Salinity", "Contributor"]
+
+VIEWPORT_PIXELS = (800, 500)  # Approximate width / height of the map element
+
+# --- ZOOM ---
+def cell_degrees(zoom):
+    """Cell edge in degrees at a zoom level (256-pixel Web Mercator tiles)."""
+    return config.MAP_CELL_PIXELS * 360.0 / (256 * 2 ** zoom)
+
+def zoom_for(bbox):
+    """Deepest zoom at which bbox (south, west, north, east) fits the viewport."""
+    south, west, north, east = bbox
+    width, height = VIEWPORT_PIXELS
+    span = max((east - west) / width, (north - south) / height, 1e-9)
+    zoom = math.log2(360.0 / (256 * span))
+    return int(min(max(zoom, 1), config.MAP_MAX_ZOOM))
+
+def center(bbox):
+    south, west, north, east = bbox
+    return (south + north) / 2, (west + east) / 2
+
+# --- POINTS ---
+def points_frame(df):
+    """Rows with numeric coordinates, restricted to MAP_COLUMNS."""
+    if df.empty or 'Latitude' not in df.columns or 'Longitude' not in df.columns:
+        return pd.DataFrame(columns=MAP_COLUMNS)
+    out = df[[c for c in MAP_COLUMNS if c in df.columns]].copy()
+    out['Latitude'] = pd.to_numeric(out['Latitude'], errors='coerce')
+    out['Longitude'] = pd.to_numeric(out['Longitude'], errors='coerce')
+    return out.dropna(subset=['Latitude', 'Longitude']).reset_index(drop=True)
+
+def within(points, bbox):
+    """Readings inside bbox (south, west, north, east); all of them when bbox is None."""
+    if bbox is None:
+        return points
+    south, west, north, east = bbox
+    lat, lon = points['Latitude'], points['Longitude']
+    return points[lat.between(south, north) & lon.between(west, east)]
+
+def _fmt(values, unit):
+    """Means as tooltip text: '28.41 °C', or '–' where there were no readings."""
+    return np.where(pd.isna(values), "–", pd.Series(values).round(2).astype(str) + f" {unit}")
+
+def point_layer_frame(points):
+    """Individual readings with the same tooltip fields as the cells."""
+    out = pd.DataFrame({
+        'lat': points['Latitude'].to_numpy(),
+        'lon': points['Longitude'].to_numpy(),
+        'count': 1,
+        'location': points.get('Main_Location', pd.Series("", index=points.index)).fillna("").to_numpy(),
+        'latest': (points['Date'].astype(str) + " " + points['Time'].astype(str)).to_numpy()
+                  if 'Date' in points and 'Time' in points else "",
+        'water_temp': _fmt(pd.to_numeric(points.get('Water_Temp'), errors='coerce'), "°C"),
+        'salinity': _fmt(pd.to_numeric(points.get('Salinity'), errors='coerce'), "psu"),
+        'contributor': points.get('Contributor', pd.Series("", index=points.index)).fillna("").to_numpy(),
+    })
+    return out
+
+# --- GRID AGGREGATION ---
+def aggregate(points, zoom):
+    """
+    One row per occupied grid cell at this zoom: lat/lon (mean position of its readings),
+    count, latest, water_temp, salinity, location, and the cell bounds south/west/north/east.
+    """
+    if points.empty:
+        return pd.DataFrame(columns=['lat', 'lon', 'count', 'latest', 'water_temp', 'salinity',
+                                     'location', 'south', 'west', 'north', 'east'])
+    size = cell_degrees(zoom)
+    frame = pd.DataFrame({
+        'iy': np.floor(points['Latitude'].to_numpy() / size).astype("int64"),
+        'ix': np.floor(points['Longitude'].to_numpy() / size).astype("int64"),
+        'lat': points['Latitude'].to_numpy(),
+        'lon': points['Longitude'].to_numpy(),
+        'latest': points['created_at'].astype("string").to_numpy() if 'created_at' in points else None,
+        'water_temp': pd.to_numeric(points.get('Water_Temp'), errors='coerce'),
+        'salinity': pd.to_numeric(points.get('Salinity'), errors='coerce'),
+        'location': points['Main_Location'].to_numpy() if 'Main_Location' in points else None,
+    })
+    grouped = frame.groupby(['iy', 'ix'], sort=False)
+    cells = grouped.agg(
+        lat=('lat', 'mean'), lon=('lon', 'mean'), count=('lat', 'size'),
+        latest=('latest', 'max'), water_temp=('water_temp', 'mean'), salinity=('salinity', 'mean'),
+    ).reset_index()
+    # Most frequent location per cell: count (cell, location) pairs once, keep each cell's top one
+    top = (frame.groupby(['iy', 'ix', 'location'], sort=False).size()
+                .sort_values(ascending=False).reset_index()
+                .drop_duplicates(['iy', 'ix'])[['iy', 'ix', 'location']])
+    cells = cells.merge(top, on=['iy', 'ix'], how='left')
+    cells['location'] = cells['location'].fillna("")
+    cells['latest'] = cells['latest'].fillna("").astype(str).str[:16].str.replace("T", " ")
+    cells['water_temp'] = _fmt(cells['water_temp'], "°C")
+    cells['salinity'] = _fmt(cells['salinity'], "psu")
+    cells['south'], cells['west'] = cells['iy'] * size, cells['ix'] * size
+    cells['north'], cells['east'] = cells['south'] + size, cells['west'] + size
+    return cells.drop(columns=['iy', 'ix'])
+
+# --- LOAD ---
+_POINTS = OrderedDict()
+
+def load_points():
+    """
+    (points, version) for the map: the replica's readings with numeric coordinates, read
+    once per table state. version keys view(); it is None when the replica cannot sync
+    and the points come from an uncached remote read.
+    """
+    if not replica.sync():
+        return points_frame(replica.read_marine_data(columns=MAP_COLUMNS)), None
+    version = (result_cache.version("marine_data"), replica.version())
+    if version not in _POINTS:
+        _POINTS[version] = points_frame(replica.read_marine_data(columns=MAP_COLUMNS, sync_first=False))
+        while len(_POINTS) > 2:
+            _POINTS.popitem(last=False)
+    return _POINTS[version], version
+
+# --- VIEW ---
+_MEMO = OrderedDict()
+_MEMO_SIZE = 32
+
+def _compute(points, bbox):
+    area = within(points, bbox)
+    zoom = zoom_for(bbox) if bbox is not None else config.MAP_DEFAULT_ZOOM
+    if bbox is not None and len(area) <= config.MAP_POINT_LIMIT:
+        return "points", point_layer_frame(area), zoom
+    return "cells", aggregate(area, zoom), zoom
+
+def view(points, bbox=None, version=None):
+    """
+    What the map should draw for an area (None = everything).
+    Returns (kind, frame, zoom): kind is "points" when the area holds at most
+    config.MAP_POINT_LIMIT readings, else "cells" aggregated at the area's zoom.
+    With the version from load_points() results are memoised per table state and
+    area; without one they are computed every time.
+    """
+    if version is None:
+        return _compute(points, bbox)
+    key = (version, bbox)
+    if key in _MEMO:
+        _MEMO.move_to_end(key)
+        return _MEMO[key]
+    result = _compute(points, bbox)
+    _MEMO[key] = result
+    if len(_MEMO) > _MEMO_SIZE:
+        _MEMO.popitem(last=False)
+    return result
@@ -0,0 +1,34 @@
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+
+def test_to_db_records_serializes_parsed_dates():
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-05", None, "2024-03-01"]),
+        "Time": [datetime.time(10, 30), None, datetime.time(7, 5, 9)],
+        "created_at": pd.to_datetime(["2024-01-05 10:30:00", "2024-02-01 08:00:00", None], utc=True),
+        "Location": ["Marina", "Adyar", None],
+        "Water_Temp": [28.5, np.nan, "29"],
+        "Population": [1200.0, np.nan, 5.0],
+    })
+
+    records = schema.to_db_records(df)
+    json.dumps(records)
+
+    assert [r["date"] for r in records] == ["2024-01-05", None, "2024-03-01"]
+    assert [r["time"] for r in records] == ["10:30:00", None, "07:05:09"]
+    assert [r["created_at"] for r in records] == ["2024-01-05T10:30:00+00:00", "2024-02-01T08:00:00+00:00", None]
+    assert [r["location"] for r in records] == ["Marina", "Adyar", None]
+    assert [r["water_temp"] for r in records] == [28.5, None, 29.0]
+    assert [r["population"] for r in records] == [1200, None, 5]
+
+
+def test_to_db_records_formats_timedelta_times():
+    df = pd.DataFrame({"Time": pd.to_timedelta(["10:30:00", None])})
+
+    assert schema.to_db_records(df) == [{"time": "10:30:00"}, {"time": None}]
@@ -0,0 +1,325 @@
+# validation.py
+"""
+Validation and duplicate detection for bulk uploads, run on each chunk before insert.
+
+Range rules are evaluated over whole columns. A value outside its physical range is
+removed ("null") or kept and counted ("flag"); rows whose coordinates fall outside the
+bounding box of India's EEZ are rejected. Each row is then hashed over its location,
+date, time and parameter values, and checked against duplicates inside the file and
+against a SQLite index of the hashes of every stored row (config.CACHE_DIR). Like
+counters.py, the index is updated by database.py on every write and rebuilt in the
+background from the local replica, under replica.models_lock and with the same id
+watermark. While a build is pending (the first one, or one after a write the index
+could not be patched for), stored-row duplicates are not checked and the report says so. Results accumulate in a QCReport shown after the upload.
+"""
+import os
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import config
+import schema
+import metrics
+import replica
+import database as db
+
+ROW_INDEX_DB = os.path.join(config.CACHE_DIR, "row_hashes.db")
+
+# --- RULES ---
+# action: "null" removes the value and keeps the row; "flag" keeps it and reports it
+Rule = namedtuple("Rule", ["column", "low", "high", "action"])
+
+RULES = [
+    Rule("pH", 0, 14, "null"),
+    Rule("DO", 0, None, "null"),
+    Rule("Salinity", 0, 45, "null"),
+    Rule("Water_Temp", -2, 40, "null"),
+    Rule("Air_Temp", -10, 55, "null"),
+    Rule("Humidity", 0, 100, "null"),
+    Rule("Wind_Speed", 0, 75, "null"),
+    Rule("Wind_Direction", 0, 360, "null"),
+    Rule("Precipitation", 0, None, "null"),
+    Rule("TSS", 0, None, "null"),
+    Rule("TDS", 0, None, "null"),
+    Rule("Chlorophyll", 0, None, "null"),
+    Rule("BGA", 0, None, "null"),
+    # Small negative readings are a known optical-sensor offset: kept, but reported
+    Rule("Turbidity", 0, None, "flag"),
+]
+
+def _rule_label(rule):
+    if rule.high is None:
+        return f"{rule.column} ≥ {rule.low}"
+    return f"{rule.low} ≤ {rule.column} ≤ {rule.high}"
+
+# --- ROW HASHES ---
+LOCATION_COLUMNS = ["Main_Location", "Location", "Date", "Time"]
+VALUE_COLUMNS = [c.display for c in schema.COLUMNS
+                 if c.category in ("Physical", "Chemical", "Biological", "Meteorological & Geo")]
+HASH_COLUMNS = LOCATION_COLUMNS + VALUE_COLUMNS
+
+def row_hashes(frame):
+    """
+    int64 hash per row over location, date, time and values. Uploads and stored rows
+    hash alike: numbers are compared at 6 decimals, missing columns count as empty.
+    """
+    parts = {}
+    for name in HASH_COLUMNS:
+        column = frame[name] if name in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+        col = schema.BY_DISPLAY.get(name)
+        if col is not None and col.dtype in schema.NUMERIC_TYPES:
+            parts[name] = pd.to_numeric(column, errors="coerce").astype("float64").round(6) + 0.0
+        else:
+            parts[name] = column.astype(object).where(column.notna(), "").astype(str)
+    hashed = pd.util.hash_pandas_object(pd.DataFrame(parts, index=frame.index), index=False)
+    return hashed.to_numpy().view("int64")
+
+# --- DUPLICATE INDEX ---
+_reconcile_lock = threading.Lock()
+_stale = False  # Set when a write could not be recorded; the index is bypassed until rebuilt
+
+@contextmanager
+def _connect():
+    """Opens the hash index; commits on success and always closes."""
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(ROW_INDEX_DB, timeout=30)
+    try:
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS hashes (hash INTEGER PRIMARY KEY, n INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL);
+            """)
+            yield conn
+    finally:
+        conn.close()
+
+def _add(conn, hashes, sign):
+    values, counts = np.unique(hashes, return_counts=True)
+    conn.executemany(
+        "INSERT INTO hashes (hash, n) VALUES (?, ?) ON CONFLICT(hash) DO UPDATE SET n = n + excluded.n",
+        [(int(h), sign * int(n)) for h, n in zip(values, counts)],
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM hashes WHERE n <= 0")
+
+def _watermark(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+    return row[0] if row else None
+
+@metrics.timed("row_index.apply_delta")
+def apply_delta(frame, sign=1):
+    """
+    Adds (sign=1) or removes (sign=-1) the rows of a Dashboard frame from the index.
+    With an 'id' column, inserted rows already hashed by the last rebuild are skipped.
+    If the delta cannot be applied the index is invalidated.
+    """
+    if frame is None or frame.empty:
+        return
+    try:
+        with replica.models_lock, _connect() as conn:
+            watermark = _watermark(conn)
+            if sign > 0 and watermark is not None and 'id' in frame.columns:
+                frame = frame[pd.to_numeric(frame['id'], errors='coerce').fillna(float("inf")) > watermark]
+                if frame.empty:
+                    return
+            _add(conn, row_hashes(frame), sign)
+    except Exception:
+        metrics.error()
+        invalidate()
+
+@metrics.timed("row_index.invalidate")
+def invalidate():
+    """
+    The index cannot be patched for a write: duplicate checks bypass it (existing()
+    returns None) until a rebuild that started after the write has finished.
+    """
+    global _stale
+    with replica.models_lock:
+        _stale = True  # Holds in this process even if the flag below cannot be stored
+        try:
+            with _connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pending', 1)")
+        except Exception:
+            metrics.error()
+    _reconcile_in_background()
+
+def _fold_remote():
+    """Fallback when the replica cannot sync: streams the hashed columns from marine_data."""
+    db_columns = [schema.db_name(c) for c in HASH_COLUMNS]
+    parts, max_id = db.fold_marine_data(
+        lambda acc, chunk: (acc[0] + [row_hashes(chunk)], max(acc[1], int(chunk['id'].max()))),
+        ([], 0), columns=db_columns,
+    )
+    return (np.concatenate(parts) if parts else np.array([], dtype="int64")), max_id
+
+def reconcile():
+    """
+    Rebuilds the index from the local replica (or, failing that, from marine_data) and
+    clears a pending invalidation; writes are held off from snapshot to swap.
+    """
+    global _stale
+    replica.sync(force=True)  # The bulk of the download happens outside the lock
+    with replica.models_lock:
+        try:
+            df, watermark = replica.snapshot(HASH_COLUMNS)
+            hashes = row_hashes(df)
+        except Exception as e:
+            print(f"Row Index Replica Error: {e}")
+            hashes, watermark = _fold_remote()
+        with _connect() as conn:
+            conn.execute("DELETE FROM hashes")
+            _add(conn, hashes, 1)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('reconciled_at', ?)", (time.time(),))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (watermark,))
+            conn.execute("DELETE FROM meta WHERE key = 'pending'")
+        _stale = False
+
+def _reconcile_in_background():
+    if not _reconcile_lock.acquire(blocking=False):
+        return  # Already running
+    def run():
+        try:
+            reconcile()
+        except Exception as e:
+            print(f"Row Index Reconcile Error: {e}")
+        finally:
+            _reconcile_lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+def _ensure_fresh():
+    """
+    Starts a background rebuild when the index is stale, invalidated or was never built.
+    Returns False while it cannot answer: no build has finished yet, or a write was not
+    recorded in it and the rebuild that picks it up is still pending.
+    """
+    with _connect() as conn:
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('reconciled_at', 'pending')").fetchall())
+    reconciled_at = meta.get('reconciled_at', 0)
+    pending = _stale or 'pending' in meta
+    if pending or not reconciled_at or time.time() - reconciled_at >= config.ROW_INDEX_RECONCILE_INTERVAL:
+        _reconcile_in_background()
+    return bool(reconciled_at) and not pending
+
+def existing(hashes):
+    """
+    Boolean array: which hashes are already stored, or None while the index is
+    being built (for the first time, or again after an invalidation).
+    """
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=bool)
+    if not _ensure_fresh():
+        return None
+    with _connect() as conn:
+        conn.execute("CREATE TEMP TABLE probe (hash INTEGER)")
+        conn.executemany("INSERT INTO probe (hash) VALUES (?)", ((int(h),) for h in np.unique(hashes)))
+        found = conn.execute("SELECT hash FROM probe JOIN hashes USING (hash)").fetchall()
+    return np.isin(hashes, np.fromiter((h for (h,) in found), dtype="int64", count=len(found)))
+
+# --- QC REPORT ---
+class QCReport:
+    """Per-file counts, accumulated chunk by chunk."""
+
+    SAMPLE = 5  # Row numbers kept per issue
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_accepted = 0
+        self.rows_outside_eez = 0
+        self.duplicates_in_file = 0
+        self.duplicates_existing = 0
+        self.duplicates_kept = 0
+        self.stored_unchecked = 0  # Rows not checked against stored rows (index building or rebuilding)
+        self.issues = {}  # label -> [action, count, sample row numbers]
+        self._seen = np.zeros(0, dtype="int64")  # Hashes of earlier chunks, sorted
+
+    def _issue(self, label, action, rows):
+        entry = self.issues.setdefault(label, [action, 0, []])
+        entry[1] += len(rows)
+        entry[2].extend(int(r) for r in rows[: self.SAMPLE - len(entry[2])])
+
+    def summary(self):
+        return {
+            "rows_read": self.rows_read,
+            "rows_accepted": self.rows_accepted,
+            "rows_outside_eez": self.rows_outside_eez,
+            "duplicates_in_file": self.duplicates_in_file,
+            "duplicates_existing": self.duplicates_existing,
+            "duplicates_kept": self.duplicates_kept,
+            "stored_unchecked": self.stored_unchecked,
+            "values_removed": sum(n for action, n, _ in self.issues.values() if action == "null"),
+            "values_flagged": sum(n for action, n, _ in self.issues.values() if action == "flag"),
+        }
+
+    def table(self):
+        """One row per issue, for st.dataframe / CSV download."""
+        return pd.DataFrame(
+            [{"Check": label, "Action": action, "Rows": n, "Example Rows": ", ".join(map(str, sample))}
+             for label, (action, n, sample) in self.issues.items()],
+            columns=["Check", "Action", "Rows", "Example Rows"],
+        )
+
+# --- VALIDATION ---
+def validate(frame, report, first_row=1, duplicates="skip"):
+    """
+    Applies the rules and duplicate checks to one transformed chunk (Dashboard columns).
+    first_row: file row number of the chunk's first row (for the report).
+    duplicates: "skip" drops rows already stored or repeated in the file; "keep" only reports them.
+    Returns the rows to insert.
+    """
+    n = len(frame)
+    report.rows_read += n
+    row_numbers = np.arange(first_row, first_row + n)
+    frame = frame.reset_index(drop=True)
+    keep = np.ones(n, dtype=bool)
+
+    # Row level: coordinates inside India's EEZ
+    lat = pd.to_numeric(frame.get("Latitude"), errors="coerce") if "Latitude" in frame else pd.Series(np.nan, index=frame.index)
+    lon = pd.to_numeric(frame.get("Longitude"), errors="coerce") if "Longitude" in frame else pd.Series(np.nan, index=frame.index)
+    (lat_lo, lat_hi), (lon_lo, lon_hi) = config.INDIA_EEZ_BBOX["lat"], config.INDIA_EEZ_BBOX["lon"]
+    outside = ~(lat.between(lat_lo, lat_hi) & lon.between(lon_lo, lon_hi)).to_numpy()
+    if outside.any():
+        report.rows_outside_eez += int(outside.sum())
+        report._issue("Coordinates inside India EEZ", "reject", row_numbers[outside])
+        keep &= ~outside
+
+    # Value level: physical ranges
+    for rule in RULES:
+        if rule.column not in frame.columns:
+            continue
+        values = pd.to_numeric(frame[rule.column], errors="coerce")
+        bad = values.notna() & (values < rule.low)
+        if rule.high is not None:
+            bad |= values > rule.high
+        bad = bad.to_numpy() & keep
+        if not bad.any():
+            continue
+        report._issue(_rule_label(rule), rule.action, row_numbers[bad])
+        if rule.action == "null":
+            column = frame[rule.column].astype(object)
+            column[bad] = None
+            frame[rule.column] = column
+
+    # Duplicates: inside the file, then against stored rows
+    hashes = row_hashes(frame)
+    repeated = (pd.Series(hashes).duplicated().to_numpy() | np.isin(hashes, report._seen)) & keep
+    report._seen = np.union1d(report._seen, hashes[keep])
+    found = existing(hashes)
+    if found is None:
+        report.stored_unchecked += int(keep.sum())
+        found = np.zeros(n, dtype=bool)
+    stored = found & keep & ~repeated
+    for mask, label in ((repeated, "Duplicate row within file"), (stored, "Duplicate of stored row")):
+        if mask.any():
+            report._issue(label, "reject" if duplicates == "skip" else "keep", row_numbers[mask])
+    report.duplicates_in_file += int(repeated.sum())
+    report.duplicates_existing += int(stored.sum())
+    if duplicates == "skip":
+        keep &= ~(repeated | stored)
+    else:
+        report.duplicates_kept += int((repeated | stored).sum())
+
+    report.rows_accepted += int(keep.sum())
+    return frame[keep].reset_index(drop=True)